@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+'''The benchmarks of MoSQL. The suites which need no database are runnable by
+``python -m``, e.g., ``python -m benchmarks.micro``.'''
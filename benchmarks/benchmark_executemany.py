@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It compares the inserts and updates run by mosql.db.executemany with the
+ones rendered row by row. It uses an in-memory SQLite.'''
+
+from __future__ import print_function
+
+import sys
+import sqlite3
+from timeit import default_timer
+
+import mosql.sqlite
+from mosql.query import insert, update
+from mosql.util import ___
+from mosql.db import Database
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+n = 100000
+
+dialect = mosql.sqlite.dialect
+insert_d = insert.bind(dialect)
+update_d = update.bind(dialect)
+
+def make_db():
+    db = Database(sqlite3, ':memory:')
+    db.to_keep_conn = True
+    db.dialect = dialect
+    with db as cur:
+        cur.execute('create table person (id integer primary key, name text, age integer)')
+    return db
+
+def make_rows():
+    return ({'id': i, 'name': 'Person %d' % i, 'age': i % 100} for i in range(n))
+
+def insert_per_row(db):
+    with db as cur:
+        for row in make_rows():
+            cur.execute(insert_d('person', set=row))
+
+def insert_per_row_param(db):
+    insert_p = insert_d.parameterize()
+    with db as cur:
+        for row in make_rows():
+            cur.execute(*insert_p('person', set=row))
+
+def insert_many(db):
+    db.executemany(insert, make_rows(), table='person')
+
+def update_per_row(db):
+    with db as cur:
+        for row in make_rows():
+            cur.execute(update_d('person', {'id': row['id']}, {'name': row['name']}))
+
+def update_many(db):
+    db.executemany(update, make_rows(), table='person', where={'id': ___}, set={'name': ___})
+
+def measure(f, prepare=None):
+    db = make_db()
+    if prepare:
+        prepare(db)
+    started_at = default_timer()
+    f(db)
+    return default_timer() - started_at
+
+if __name__ == '__main__':
+
+    info('* The benchmark for executemany (n={})'.format(n))
+    info('')
+
+    for name, f, prepare in (
+        ('insert per row', insert_per_row, None),
+        ('insert per row param', insert_per_row_param, None),
+        ('insert many', insert_many, None),
+        ('update per row', update_per_row, insert_many),
+        ('update many', update_many, insert_many),
+    ):
+        sec = measure(f, prepare)
+        print('{:<22} {:.3f}s  {:.0f} rows/s'.format(name, sec, n / sec))
+
+    info('')
+    info('* Done.')
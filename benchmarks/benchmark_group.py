@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It compares the group in mosql 0.12 with the current one on 1M rows. No
+database is needed.'''
+
+from __future__ import print_function
+
+import sys
+import random
+from itertools import groupby
+from timeit import repeat
+
+from mosql.compat import izip
+from mosql.db import group
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+def legacy_group(by_col_names, rows, col_names):
+    # the group in mosql 0.12
+    name_index_map = dict((name, idx) for idx, name in enumerate(col_names))
+    key_indexes = tuple(name_index_map.get(name) for name in by_col_names)
+    key_func = lambda row: tuple(row[i] for i in key_indexes)
+    for key_values, rows_islice in groupby(rows, key_func):
+        row = [list(col) for col in izip(*rows_islice)]
+        for key_index, key_value in izip(key_indexes, key_values):
+            row[key_index] = key_value
+        yield tuple(row)
+
+height = 1000000
+group_size = 10
+
+col_names = ['id', 'seq', 'email', 'score']
+rows = [
+    (i // group_size, i, 'user%d@example.com' % i, i * 0.5)
+    for i in range(height)
+]
+shuffled = rows[:]
+random.seed(0)
+random.shuffle(shuffled)
+
+cases = [
+    ('0.12 sorted', lambda: list(legacy_group(['id'], rows, col_names))),
+    ('sorted', lambda: list(group(['id'], rows=rows, col_names=col_names))),
+    ('unsorted hash', lambda: list(group(
+        ['id'], rows=shuffled, col_names=col_names, presorted=False
+    ))),
+    ('unsorted sort', lambda: list(group(
+        ['id'], rows=sorted(shuffled, key=lambda row: row[0]), col_names=col_names
+    ))),
+    ('hash count', lambda: list(group(
+        ['id'], rows=shuffled, col_names=col_names, presorted=False,
+        aggregators={'seq': 'count', 'email': 'first', 'score': 'sum'}
+    ))),
+]
+
+if __name__ == '__main__':
+
+    info('* The benchmark for group (height={}, group_size={})'.format(height, group_size))
+    info('')
+
+    for name, f in cases:
+        sec = min(repeat(f, number=1, repeat=3))
+        print('{:<14} {:.4f}s'.format(name, sec))
+
+    info('')
+    info('* Done.')
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It compares the memoized identifier functions with the plain ones on wide
+selects and large where dicts. No database is needed.'''
+
+from __future__ import print_function
+
+import sys
+from timeit import repeat
+
+import mosql.util
+from mosql.util import qualifier, build_where
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+def unwrap(f):
+    while hasattr(f, '__wrapped__'):
+        f = f.__wrapped__
+    return f
+
+memoized = dict(
+    (name, getattr(mosql.util, name))
+    for name in ('identifier', 'identifier_as', 'identifier_dir')
+)
+
+plain = dict(
+    (name, qualifier(unwrap(f)))
+    for name, f in memoized.items()
+)
+
+def use(functions):
+    for name, f in functions.items():
+        setattr(mosql.util, name, f)
+
+width = 200
+
+columns = ['person.column_%d as c%d' % (i, i) for i in range(width)]
+order_by = ['column_%d desc' % i for i in range(width)]
+where = dict(('column_%d' % i, i) for i in range(width))
+
+# the chains in mosql.chain hold the functions, so call them via this module
+def wide_select():
+    return (
+        mosql.util.identifier_as(columns),
+        mosql.util.identifier_dir(order_by),
+    )
+
+def large_where():
+    return build_where(where)
+
+if __name__ == '__main__':
+
+    n = 1000
+
+    info('* The benchmark for the memoized identifiers (width={}, n={})'.format(width, n))
+    info('')
+
+    for name, f in (('wide select', wide_select), ('large where', large_where)):
+
+        use(plain)
+        plain_sec = min(repeat(f, number=n, repeat=5))
+
+        use(memoized)
+        assert f() == (use(plain) or f())
+        use(memoized)
+        memoized_sec = min(repeat(f, number=n, repeat=5))
+
+        print('{:<12} plain: {:.4f}s  memoized: {:.4f}s  speedup: {:.2f}x'.format(
+            name, plain_sec, memoized_sec, plain_sec / memoized_sec
+        ))
+
+    info('')
+    info('* Done.')
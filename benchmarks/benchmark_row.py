@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It compares the rows made by all_to_dicts with and without the as_row on a
+wide result set. No database is needed.'''
+
+from __future__ import print_function
+
+import sys
+import gc
+from timeit import repeat
+
+from mosql.db import all_to_dicts
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+width = 50
+height = 10000
+
+col_names = ['column_%d' % i for i in range(width)]
+rows = [tuple(range(i, i+width)) for i in range(height)]
+
+def make_dicts():
+    return all_to_dicts(rows=rows, col_names=col_names)
+
+def make_rows():
+    return all_to_dicts(rows=rows, col_names=col_names, as_row=True)
+
+def read_all(made):
+    for row in made:
+        for name in col_names:
+            row[name]
+
+def measure_memory(f):
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    made = f()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del made
+    return size
+
+if __name__ == '__main__':
+
+    n = 10
+
+    info('* The benchmark for the rows (width={}, height={}, n={})'.format(width, height, n))
+    info('')
+
+    for name, f in (('dict', make_dicts), ('Row', make_rows)):
+
+        make_sec = min(repeat(f, number=n, repeat=3))
+        made = f()
+        read_sec = min(repeat(lambda: read_all(made), number=n, repeat=3))
+        size = measure_memory(f)
+
+        print('{:<5} make: {:.4f}s  read: {:.4f}s  memory: {}'.format(
+            name, make_sec, read_sec,
+            'n/a' if size is None else '{:.1f} MB'.format(size / 1024.0 / 1024.0)
+        ))
+
+    info('')
+    info('* Done.')
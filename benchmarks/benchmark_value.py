@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It compares the type-dispatched value with the isinstance chain in mosql
+0.12 on the common scalars. No database is needed.'''
+
+from __future__ import print_function
+
+import sys
+from decimal import Decimal
+from datetime import datetime, date, time
+from timeit import repeat
+
+from mosql import compat
+from mosql.util import value, qualifier, param, escape, format_param, stringify_bool
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+@qualifier
+def legacy_value(x):
+    # the value in mosql 0.12
+    if x is None:
+        return 'NULL'
+    elif isinstance(x, param):
+        return format_param(x)
+    elif isinstance(x, compat.string_types):
+        return "'%s'" % escape(x)
+    elif isinstance(x, (datetime, date, time)):
+        return "'%s'" % x
+    elif isinstance(x, bool):
+        return stringify_bool(x)
+    else:
+        return compat.text_type(x)
+
+n = 1000
+
+cases = [
+    ('int', list(range(n))),
+    ('float', [i / 3.0 for i in range(n)]),
+    ('str', ['name %d' % i for i in range(n)]),
+    ('None', [None] * n),
+    ('bool', [i % 2 == 0 for i in range(n)]),
+    ('date', [date(2015, 1, 1 + i % 28) for i in range(n)]),
+    ('Decimal', [Decimal(i) / 4 for i in range(n)]),
+]
+
+def scalars(f, xs):
+    return lambda: [f(x) for x in xs]
+
+if __name__ == '__main__':
+
+    info('* The benchmark for value (n={})'.format(n))
+    info('')
+
+    for name, xs in cases:
+        legacy_sec = min(repeat(scalars(legacy_value, xs), number=100, repeat=5))
+        sec = min(repeat(scalars(value, xs), number=100, repeat=5))
+        print('{:<8} 0.12: {:.4f}s  dispatch: {:.4f}s  speedup: {:.2f}x'.format(
+            name, legacy_sec, sec, legacy_sec / sec
+        ))
+
+    info('')
+    info('* Done.')
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''The end-to-end benchmarks on SQLite. They run the same workloads through
+MoSQL with :class:`mosql.db.Database`, through the hand-written SQL, and
+through SQLAlchemy Core if it is installed, and report the latency
+percentiles and the throughput of every operation.
+
+::
+
+    python -m benchmarks.e2e
+    python -m benchmarks.e2e --database /tmp/e2e.sqlite3 --iterations 5000
+    python -m benchmarks.e2e --json > e2e.json
+
+The workloads:
+
+- `point_select` -- select a person by the primary key
+- `in_select` -- select the persons by an IN list
+- `bulk_insert` -- insert a batch of rows
+- `update_by_key` -- update a person by the primary key
+- `join` -- select a person joined with the details
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from collections import OrderedDict
+
+import mosql.sqlite
+from mosql import query
+from mosql.db import Database
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SCHEMA = [
+    'create table person (id integer primary key, name text, age integer)',
+    'create table detail (id integer primary key, person_id integer, key text, val text)',
+    'create table log (person_id integer, msg text)',
+    'create index detail_person_id on detail (person_id)',
+]
+
+WORKLOADS = ['point_select', 'in_select', 'bulk_insert', 'update_by_key', 'join']
+
+class Options(object):
+
+    def __init__(self, persons, in_size, batch_size):
+        self.persons = persons
+        self.in_size = in_size
+        self.batch_size = batch_size
+
+    def person_id(self, i):
+        return i * 7919 % self.persons
+
+    def person_ids(self, i):
+        return [self.person_id(i + j) for j in range(self.in_size)]
+
+    def log_rows(self, i):
+        return [(self.person_id(i + j), 'msg %d' % j) for j in range(self.batch_size)]
+
+def seed(conn, opts):
+    for sql in SCHEMA:
+        conn.execute(sql)
+    conn.executemany('insert into person values (?, ?, ?)', (
+        (i, 'person %d' % i, i % 100) for i in range(opts.persons)
+    ))
+    conn.executemany('insert into detail (person_id, key, val) values (?, ?, ?)', (
+        (i, 'email', 'person%d@example.com' % i) for i in range(opts.persons)
+    ))
+    conn.commit()
+
+# the runners; each one returns a dict of the workload names and the functions
+# which take the iteration number
+
+def raw_runner(path, opts):
+
+    conn = sqlite3.connect(path)
+
+    def run(sql, params=()):
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+        conn.commit()
+        return rows
+
+    def in_select(i):
+        ids = opts.person_ids(i)
+        return run(
+            'select * from person where id in (%s)' % ', '.join('?' * len(ids)),
+            ids
+        )
+
+    def bulk_insert(i):
+        conn.executemany('insert into log values (?, ?)', opts.log_rows(i))
+        conn.commit()
+
+    return {
+        'point_select': lambda i: run(
+            'select * from person where id = ?', (opts.person_id(i),)
+        ),
+        'in_select': in_select,
+        'bulk_insert': bulk_insert,
+        'update_by_key': lambda i: run(
+            'update person set age = ? where id = ?', (i % 100, opts.person_id(i))
+        ),
+        'join': lambda i: run(
+            'select person.name, detail.val from person'
+            ' inner join detail on person.id = detail.person_id'
+            ' where person.id = ?', (opts.person_id(i),)
+        ),
+    }
+
+def mosql_runner(path, opts, parameterize=False):
+
+    db = Database(sqlite3, path)
+    db.to_keep_conn = True
+
+    dialect = mosql.sqlite.dialect
+    select = query.select.bind(dialect)
+    update = query.update.bind(dialect)
+    # the join is nested in the select, so it is never parameterized
+    join = query.join.bind(dialect)
+    if parameterize:
+        select = select.parameterize()
+        update = update.parameterize()
+
+    if parameterize:
+        def run(built):
+            with db as cur:
+                cur.execute(*built)
+                return cur.fetchall()
+    else:
+        def run(sql):
+            with db as cur:
+                cur.execute(sql)
+                return cur.fetchall()
+
+    def bulk_insert(i):
+        with db as cur:
+            for chunk in query.bulk_insert(
+                'log', opts.log_rows(i), max_params=999,
+                parameterize=parameterize, dialect=dialect
+            ):
+                if parameterize:
+                    cur.execute(*chunk)
+                else:
+                    cur.execute(chunk)
+
+    return {
+        'point_select': lambda i: run(select('person', {'id': opts.person_id(i)})),
+        'in_select': lambda i: run(select('person', {'id': opts.person_ids(i)})),
+        'bulk_insert': bulk_insert,
+        'update_by_key': lambda i: run(
+            update('person', {'id': opts.person_id(i)}, {'age': i % 100})
+        ),
+        'join': lambda i: run(select(
+            'person',
+            {'person.id': opts.person_id(i)},
+            select=('person.name', 'detail.val'),
+            joins=join('detail', on={'person.id': 'detail.person_id'}),
+        )),
+    }
+
+def sqlalchemy_runner(path, opts):
+
+    from sqlalchemy import (
+        create_engine, MetaData, Table, Column, Integer, Text, select
+    )
+
+    engine = create_engine('sqlite:///%s' % path)
+    metadata = MetaData()
+    person = Table(
+        'person', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('name', Text),
+        Column('age', Integer),
+    )
+    detail = Table(
+        'detail', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('person_id', Integer),
+        Column('key', Text),
+        Column('val', Text),
+    )
+    log = Table(
+        'log', metadata,
+        Column('person_id', Integer),
+        Column('msg', Text),
+    )
+
+    def run(stmt):
+        with engine.begin() as conn:
+            return conn.execute(stmt).fetchall()
+
+    def update_by_key(i):
+        with engine.begin() as conn:
+            conn.execute(
+                person.update()
+                .where(person.c.id == opts.person_id(i))
+                .values(age=i % 100)
+            )
+
+    def bulk_insert(i):
+        with engine.begin() as conn:
+            conn.execute(log.insert(), [
+                {'person_id': person_id, 'msg': msg}
+                for person_id, msg in opts.log_rows(i)
+            ])
+
+    return {
+        'point_select': lambda i: run(
+            select(person).where(person.c.id == opts.person_id(i))
+        ),
+        'in_select': lambda i: run(
+            select(person).where(person.c.id.in_(opts.person_ids(i)))
+        ),
+        'bulk_insert': bulk_insert,
+        'update_by_key': update_by_key,
+        'join': lambda i: run(
+            select(person.c.name, detail.c.val)
+            .select_from(person.join(detail, person.c.id == detail.c.person_id))
+            .where(person.c.id == opts.person_id(i))
+        ),
+    }
+
+RUNNERS = OrderedDict([
+    ('raw', raw_runner),
+    ('mosql', mosql_runner),
+    ('mosql-param', lambda path, opts: mosql_runner(path, opts, parameterize=True)),
+    ('sqlalchemy', sqlalchemy_runner),
+])
+
+# the measuring
+
+def percentile(sorted_values, p):
+    # the nearest-rank method
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+def measure(f, iterations, warmup):
+
+    for i in range(warmup):
+        f(i)
+
+    latencies = []
+    started_at = timer()
+    for i in range(warmup, warmup + iterations):
+        t = timer()
+        f(i)
+        latencies.append(timer() - t)
+    total = timer() - started_at
+
+    latencies.sort()
+    return OrderedDict([
+        ('iterations', iterations),
+        ('p50', percentile(latencies, 50)),
+        ('p90', percentile(latencies, 90)),
+        ('p99', percentile(latencies, 99)),
+        ('max', latencies[-1]),
+        ('ops_per_sec', iterations / total if total else 0.0),
+    ])
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='The end-to-end benchmarks on SQLite.')
+    parser.add_argument('--runners', default=','.join(RUNNERS), help='the runners, separated by comma')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS), help='the workloads, separated by comma')
+    parser.add_argument('--database', help='a file-backed database; a temporary file by default')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--persons', type=int, default=10000)
+    parser.add_argument('--in-size', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args(argv)
+
+    opts = Options(args.persons, args.in_size, args.batch_size)
+    runners = args.runners.split(',')
+    workloads = args.workloads.split(',')
+
+    if 'sqlalchemy' in runners and sqlalchemy is None:
+        info('* SQLAlchemy is not installed, skip it.')
+        runners.remove('sqlalchemy')
+
+    results = OrderedDict()
+
+    for runner_name in runners:
+
+        # every runner starts from a fresh database
+        if args.database:
+            path = args.database
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            fd, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+
+        try:
+
+            conn = sqlite3.connect(path)
+            seed(conn, opts)
+            conn.close()
+
+            functions = RUNNERS[runner_name](path, opts)
+            results[runner_name] = OrderedDict(
+                (workload, measure(functions[workload], args.iterations, args.warmup))
+                for workload in workloads
+            )
+
+        finally:
+            if not args.database:
+                os.remove(path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print('%-12s %-14s %10s %10s %10s %10s %10s' % (
+        'runner', 'workload', 'p50 us', 'p90 us', 'p99 us', 'max us', 'ops/s'
+    ))
+    for workload in workloads:
+        for runner_name, result in results.items():
+            r = result[workload]
+            print('%-12s %-14s %10.1f %10.1f %10.1f %10.1f %10.0f' % (
+                runner_name, workload,
+                r['p50'] * 1e6, r['p90'] * 1e6, r['p99'] * 1e6, r['max'] * 1e6,
+                r['ops_per_sec'],
+            ))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
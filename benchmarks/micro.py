@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''The micro benchmarks of the rendering hot paths in mosql.util. No database
+is needed.
+
+Run it and store the result as a baseline:
+
+::
+
+    python -m benchmarks.micro --output baseline.json
+
+Then compare a later run with it. It exits with 1 if any case is slower than
+the baseline by more than the tolerance:
+
+::
+
+    python -m benchmarks.micro --baseline baseline.json
+
+The result is a JSON, and the report goes to stderr.
+'''
+
+from __future__ import print_function
+
+import sys
+import json
+import platform
+import argparse
+from datetime import date
+from timeit import Timer
+from collections import OrderedDict
+
+import mosql
+import mosql.util
+# importing the dialect modules patches mosql.util, so restore it
+import mosql.mysql
+import mosql.sqlite
+import mosql.std
+mosql.std.patch()
+
+from mosql.util import (
+    value, identifier, identifier_as, build_where, build_set,
+    build_values_list, param
+)
+from mosql.query import select, insert, update
+
+stream = sys.stderr
+
+def info(s):
+    stream.write(s)
+    stream.write('\n')
+
+# the cases
+
+cases = OrderedDict()
+
+def case(f):
+    '''It registers a function which takes a size and returns the function to
+    time.'''
+    cases[f.__name__] = f
+    return f
+
+def _strings(n):
+    return ["it's string %d" % i for i in range(n)]
+
+@case
+def value_mixed(n):
+    x = [(i, 'name %d' % i, None, True, date(2015, 1, 1), i / 2.0)[i % 6] for i in range(n)]
+    return lambda: value(x)
+
+@case
+def identifier_plain(n):
+    x = ['person.column_%d' % i for i in range(n)]
+    return lambda: identifier(x)
+
+@case
+def identifier_as_alias(n):
+    x = ['person.column_%d as c%d' % (i, i) for i in range(n)]
+    return lambda: identifier_as(x)
+
+@case
+def build_where_eq(n):
+    x = OrderedDict(('column_%d' % i, 'v%d' % i) for i in range(n))
+    return lambda: build_where(x)
+
+@case
+def build_where_in(n):
+    x = {'id': list(range(n))}
+    return lambda: build_where(x)
+
+@case
+def build_where_operators(n):
+    ops = ['>', '<', '>=', '<=', 'like', '!=']
+    x = OrderedDict(
+        (('column_%d' % i, ops[i % len(ops)]), i) for i in range(n)
+    )
+    return lambda: build_where(x)
+
+@case
+def build_where_params(n):
+    x = OrderedDict(('column_%d' % i, param('p%d' % i)) for i in range(n))
+    return lambda: build_where(x)
+
+@case
+def build_set_pairs(n):
+    x = OrderedDict(('column_%d' % i, i) for i in range(n))
+    return lambda: build_set(x)
+
+@case
+def build_values_list_rows(n):
+    x = [(i, 'name %d' % i, None) for i in range(n)]
+    return lambda: build_values_list(x)
+
+@case
+def statement_format(n):
+    statement = select.statement
+    clause_args = {
+        'table': 'person',
+        'where': OrderedDict(('column_%d' % i, i) for i in range(n)),
+        'order_by': ['column_%d desc' % i for i in range(min(n, 10))],
+        'limit': 10,
+    }
+    return lambda: statement.format(clause_args)
+
+@case
+def query_select(n):
+    where = OrderedDict(('column_%d' % i, i) for i in range(n))
+    return lambda: select('person', where)
+
+@case
+def query_insert(n):
+    values = [(i, 'name %d' % i) for i in range(n)]
+    return lambda: insert('person', columns=('id', 'name'), values=values)
+
+@case
+def query_update(n):
+    set_ = OrderedDict(('column_%d' % i, i) for i in range(n))
+    return lambda: update('person', {'id': 1}, set_)
+
+@case
+def query_breed(n):
+    args = [{'table': 'person_%d' % i} for i in range(n)]
+    def breed_all():
+        for x in args:
+            select.breed(x)
+    return breed_all
+
+@case
+def mysql_escape(n):
+    x = _strings(n)
+    escape = mosql.mysql.escape
+    return lambda: [escape(s) for s in x]
+
+@case
+def mysql_fast_escape(n):
+    x = _strings(n)
+    escape = mosql.mysql.fast_escape
+    return lambda: [escape(s) for s in x]
+
+@case
+def std_escape(n):
+    x = _strings(n)
+    escape = mosql.util.std_escape
+    return lambda: [escape(s) for s in x]
+
+@case
+def mysql_select(n):
+    query = select.bind(mosql.mysql.dialect)
+    where = OrderedDict(('column_%d' % i, "it's %d" % i) for i in range(n))
+    return lambda: query('person', where)
+
+@case
+def sqlite_select(n):
+    query = select.bind(mosql.sqlite.dialect)
+    where = OrderedDict(('column_%d' % i, i % 2 == 0) for i in range(n))
+    return lambda: query('person', where)
+
+# the runner
+
+def measure(f, repeat, min_time):
+    timer = Timer(f)
+    # find the number which takes min_time at least
+    number = 1
+    while True:
+        sec = timer.timeit(number)
+        if sec >= min_time:
+            break
+        number *= 10 if sec < min_time / 10 else 2
+    best = min([sec] + timer.repeat(repeat - 1, number))
+    return best / number, number
+
+def run(names, sizes, repeat, min_time):
+
+    results = OrderedDict()
+
+    for name in names:
+        for size in sizes:
+            key = '%s[%d]' % (name, size)
+            seconds, number = measure(cases[name](size), repeat, min_time)
+            results[key] = {
+                'case': name,
+                'size': size,
+                'seconds': seconds,
+                'number': number,
+            }
+            info('%-36s %12.3f us' % (key, seconds * 1e6))
+
+    return results
+
+def compare(results, baseline, tolerance):
+
+    regressions = []
+
+    info('')
+    info('%-36s %12s %12s %8s' % ('case', 'baseline', 'current', 'ratio'))
+
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = ' !'
+            regressions.append(key)
+        info('%-36s %10.3fus %10.3fus %7.2fx%s' % (
+            key, base['seconds'] * 1e6, result['seconds'] * 1e6, ratio, flag
+        ))
+
+    return regressions
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='The micro benchmarks of mosql.util.')
+    parser.add_argument('cases', nargs='*', help='the cases to run; all by default')
+    parser.add_argument('--sizes', default='1,10,100', help='the input sizes, separated by comma')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='the seconds a timing takes at least')
+    parser.add_argument('--output', help='write the JSON to it instead of stdout')
+    parser.add_argument('--baseline', help='the JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='the allowed slowdown, 0.2 means 20%%')
+    parser.add_argument('--list', action='store_true', help='list the cases')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in cases:
+            print(name)
+        return 0
+
+    names = args.cases or list(cases)
+    unknown = [name for name in names if name not in cases]
+    if unknown:
+        parser.error('unknown cases: %s' % ', '.join(unknown))
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    results = run(names, sizes, args.repeat, args.min_time)
+
+    output = OrderedDict([
+        ('meta', OrderedDict([
+            ('mosql', mosql.__version__),
+            ('python', platform.python_version()),
+            ('implementation', platform.python_implementation()),
+            ('platform', platform.platform()),
+        ])),
+        ('results', results),
+    ])
+
+    dumped = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(dumped)
+            f.write('\n')
+    else:
+        print(dumped)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            info('')
+            info('* %d regression(s): %s' % (len(regressions), ', '.join(regressions)))
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
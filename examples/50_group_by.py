@@ -41,3 +41,17 @@ with db as cur:
     print 'Group the rows by MoSQL:'
     for row in group(['person_id'], cur):
         print row
+    print
+
+    ## Or let MoSQL sort the rows in bounded memory:
+
+    cur.execute(select(
+        'person',
+        joins = left_join('detail', using='person_id'),
+        where = {'key': 'email'},
+        select = ('person_id', 'val'),
+    ))
+
+    print 'Sort and group the rows by MoSQL:'
+    for row in group(['person_id'], cur, presorted=False, sort_buffer=10000):
+        print row
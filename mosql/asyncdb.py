@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''It is the asyncio counterpart of :mod:`mosql.db`. It needs Python 3.6+.
+
+The async context manager for both connection and cursor:
+
+.. autosummary::
+    AsyncDatabase
+
+The async functions designed for cursor:
+
+.. autosummary::
+    one_to_dict
+    all_to_dicts
+    group
+
+.. versionadded:: 0.13
+'''
+
+import asyncio
+import inspect
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import db as _db
+from .db import extract_col_names
+
+
+__all__ = ['AsyncDatabase', 'extract_col_names', 'one_to_dict', 'all_to_dicts', 'group']
+
+
+async def _maybe_await(x):
+    if inspect.isawaitable(x):
+        return await x
+    return x
+
+
+def _current_task():
+    current_task = getattr(asyncio, 'current_task', None)
+    if current_task is None:
+        current_task = asyncio.Task.current_task
+    return current_task()
+
+
+class _Workers(object):
+    '''It runs the calls of the sync drivers. Each connection is pinned to one
+    single-thread worker for its life, so the drivers which check the thread,
+    like :mod:`sqlite3`, work.'''
+
+    def __init__(self, max_workers):
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1) for _ in range(max_workers)
+        ]
+        self._next = itertools.cycle(self._executors)
+
+    def pick(self):
+        return next(self._next)
+
+    def shutdown(self, wait=True):
+        for executor in self._executors:
+            executor.shutdown(wait=wait)
+
+
+class _AsyncCursor(object):
+    '''It wraps a cursor of a sync driver. The methods which may block are
+    coroutines which run in the worker of the connection.'''
+
+    def __init__(self, cur, executor):
+        self._cur = cur
+        self._executor = executor
+
+    def _run(self, f, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, partial(f, *args))
+
+    def __getattr__(self, name):
+        # description, rowcount, lastrowid, arraysize, ...
+        return getattr(self._cur, name)
+
+    def execute(self, *args):
+        return self._run(self._cur.execute, *args)
+
+    def executemany(self, *args):
+        return self._run(self._cur.executemany, *args)
+
+    def fetchone(self):
+        return self._run(self._cur.fetchone)
+
+    def fetchmany(self, *args):
+        return self._run(self._cur.fetchmany, *args)
+
+    def fetchall(self):
+        return self._run(self._cur.fetchall)
+
+    def close(self):
+        return self._run(self._cur.close)
+
+    async def __aiter__(self):
+        while True:
+            rows = await self.fetchmany(self._cur.arraysize)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+
+class _AsyncConnection(object):
+    '''It wraps a connection of a sync driver.'''
+
+    def __init__(self, conn, executor):
+        self._conn = conn
+        self._executor = executor
+
+    def _run(self, f, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, partial(f, *args))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def cursor(self, *args):
+        cur = await self._run(self._conn.cursor, *args)
+        return _AsyncCursor(cur, self._executor)
+
+    def commit(self):
+        return self._run(self._conn.commit)
+
+    def rollback(self):
+        return self._run(self._conn.rollback)
+
+    def close(self):
+        return self._run(self._conn.close)
+
+
+class _TaskState(object):
+
+    __slots__ = ('conn', 'cur_stack')
+
+    def __init__(self):
+        self.conn = None
+        self.cur_stack = []
+
+
+class AsyncDatabase(object):
+    '''It is the async version of :class:`mosql.db.Database`.
+
+    :param module: a module which conforms Python DB API 2.0, or an async
+                   driver in the same style
+    :param is_async: whether the `module` is an async driver; if it is `None`,
+                     it is true only if ``module.connect`` is a coroutine
+                     function
+    :param max_workers: the number of the threads for a sync driver
+
+    With a sync driver, the connections and cursors run in a bounded thread
+    executor, and each connection stays in one thread:
+
+    ::
+
+        import sqlite3
+        db = AsyncDatabase(sqlite3, 'db.sqlite3')
+
+        async def count():
+            async with db as cur:
+                await cur.execute('select count(*) from person')
+                return (await cur.fetchone())[0]
+
+    With an async driver, which returns awaitables from the ``connect``,
+    ``cursor``, ``execute``, ``commit`` and so on, the connections and cursors
+    are the original ones:
+
+    ::
+
+        import aiosqlite
+        db = AsyncDatabase(aiosqlite, 'db.sqlite3', is_async=True)
+
+    Iterate the rows:
+
+    ::
+
+        async with db as cur:
+            await cur.execute('select * from person')
+            async for row in cur:
+                print(row)
+
+    The cursors in a task share a same connection, and the changes are
+    committed when the task leaves the first ``async with``, or rollbacked if
+    there is any exception. Different tasks use different connections, so
+    many queries are in flight at the same time.
+
+    The `getconn`, `putconn`, `getcur` and `putcur` are customizable as in
+    :class:`~mosql.db.Database`, and they may return awaitables.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, module=None, *conn_args, is_async=None, max_workers=4, **conn_kargs):
+
+        if is_async is None:
+            is_async = module is not None and (
+                asyncio.iscoroutinefunction(module.connect)
+            )
+
+        self.is_async = is_async
+        self.max_workers = max_workers
+        self._workers = None
+
+        if is_async:
+            self.getconn = lambda: module.connect(*conn_args, **conn_kargs)
+        else:
+            self.getconn = lambda: self._connect_sync(
+                partial(module.connect, *conn_args, **conn_kargs)
+            )
+        self.getcur = lambda conn: conn.cursor()
+        self.putconn = lambda conn: conn.close()
+        self.putcur = lambda cur: cur.close()
+
+        self.dialect = None
+
+        # task -> _TaskState; it is dropped when the task is done
+        self._task_states = {}
+
+    async def _connect_sync(self, connect):
+        if self._workers is None:
+            self._workers = _Workers(self.max_workers)
+        executor = self._workers.pick()
+        loop = asyncio.get_event_loop()
+        conn = await loop.run_in_executor(executor, connect)
+        return _AsyncConnection(conn, executor)
+
+    def _get_state(self):
+        task = _current_task()
+        if task is None:
+            raise RuntimeError('AsyncDatabase must be used in an asyncio task')
+        state = self._task_states.get(task)
+        if state is None:
+            state = self._task_states[task] = _TaskState()
+            task.add_done_callback(self._release)
+        return state
+
+    def _release(self, task):
+
+        # the task is done, maybe cancelled, inside an async with
+        state = self._task_states.pop(task, None)
+        if state is None or state.conn is None:
+            return
+
+        conn = state.conn
+        state.conn = None
+        del state.cur_stack[:]
+
+        # the changes are not committed
+        putting = self.putconn(conn)
+        if inspect.isawaitable(putting):
+            asyncio.ensure_future(putting)
+
+    async def __aenter__(self):
+
+        state = self._get_state()
+
+        if state.conn is None:
+            state.conn = await _maybe_await(self.getconn())
+
+        cur = await _maybe_await(self.getcur(state.conn))
+        state.cur_stack.append(cur)
+
+        return cur
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+
+        state = self._get_state()
+        conn = state.conn
+        cur_stack = state.cur_stack
+
+        cur = cur_stack.pop()
+        try:
+            await _maybe_await(self.putcur(cur))
+            if exc_type:
+                await _maybe_await(conn.rollback())
+            elif not cur_stack:
+                await _maybe_await(conn.commit())
+        finally:
+            # put the connection back even if it fails or is cancelled
+            if not cur_stack:
+                state.conn = None
+                await _maybe_await(self.putconn(conn))
+
+    def bind(self, query):
+        '''It binds the `query` to the `dialect` of this instance. If the
+        `dialect` is ``None``, the `query` is returned as it is, so a query
+        bound before keeps its dialect.
+
+        :rtype: :class:`~mosql.util.Query`
+        '''
+        if self.dialect is None:
+            return query
+        return query.bind(self.dialect)
+
+    def close(self):
+        '''It shuts down the threads for the sync driver.'''
+        if self._workers is not None:
+            self._workers.shutdown()
+            self._workers = None
+
+
+async def _aiter_rows(cur):
+    if hasattr(cur, '__aiter__'):
+        async for row in cur:
+            yield row
+    else:
+        for row in await _maybe_await(cur.fetchall()):
+            yield row
+
+
+async def one_to_dict(cur=None, row=None, col_names=None, as_row=False):
+    '''The async version of :func:`mosql.db.one_to_dict`.
+
+    :rtype: dict
+    '''
+
+    if col_names is None:
+        assert cur is not None, 'You must specify cur or col_names.'
+        col_names = extract_col_names(cur)
+
+    if row is None:
+        assert cur is not None, 'You must specify cur or row.'
+        row = await _maybe_await(cur.fetchone())
+
+    return _db.one_to_dict(row=row, col_names=col_names, as_row=as_row)
+
+
+async def all_to_dicts(cur=None, rows=None, col_names=None, as_row=False):
+    '''The async version of :func:`mosql.db.all_to_dicts`. The `rows` can be
+    an async iterable.
+
+    :rtype: dicts in list
+    '''
+
+    if col_names is None:
+        assert cur is not None, 'You must specify cur or col_names.'
+        col_names = extract_col_names(cur)
+
+    if rows is None:
+        assert cur is not None, 'You must specify cur or rows.'
+        rows = _aiter_rows(cur)
+
+    if not hasattr(rows, '__aiter__'):
+        return _db.all_to_dicts(rows=rows, col_names=col_names, as_row=as_row)
+
+    index = _db.make_index(col_names) if as_row else None
+    return [_db._to_mapping(row, col_names, index) async for row in rows]
+
+
+async def group(by_col_names, cur=None, rows=None, col_names=None, to_dict=False, as_row=False):
+    '''The async version of :func:`mosql.db.group`. The `rows` can be an async
+    iterable.
+
+    :rtype: async row generator
+    '''
+
+    if col_names is None:
+        assert cur is not None, 'You must specify cur or col_names.'
+        col_names = extract_col_names(cur)
+
+    if rows is None:
+        assert cur is not None, 'You must specify cur or rows.'
+        rows = _aiter_rows(cur)
+
+    if not hasattr(rows, '__aiter__'):
+        for row in _db.group(by_col_names, rows=rows, col_names=col_names, to_dict=to_dict, as_row=as_row):
+            yield row
+        return
+
+    key_indexes = tuple(col_names.index(name) for name in by_col_names)
+
+    # buffer a group, and let the sync group do the rest
+    buffered = []
+    buffered_key = None
+
+    async for row in rows:
+        key = tuple(row[i] for i in key_indexes)
+        if buffered and key != buffered_key:
+            for grouped in _db.group(by_col_names, rows=buffered, col_names=col_names, to_dict=to_dict, as_row=as_row):
+                yield grouped
+            buffered = []
+        buffered_key = key
+        buffered.append(row)
+
+    if buffered:
+        for grouped in _db.group(by_col_names, rows=buffered, col_names=col_names, to_dict=to_dict, as_row=as_row):
+            yield grouped
@@ -17,6 +17,7 @@ where     = Clause('where'     , where_list)
 insert    = Clause('insert into', single_identifier, alias='table')
 columns   = Clause('columns'    , column_list, hidden=True)
 values    = Clause('values'     , values_list)
+on_conflict = Clause('on conflict')
 on_duplicate_key_update = Clause('on duplicate key update', set_list)
 
 # for select statement
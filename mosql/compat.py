@@ -51,3 +51,8 @@ try:
     from itertools import izip
 except ImportError:
     izip = zip
+
+try:
+    from functools import lru_cache
+except ImportError:
+    lru_cache = None
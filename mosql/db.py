@@ -8,31 +8,131 @@ The context manager for both connection and cursor:
 .. autosummary::
     Database
 
+The connection pool which plugs into :class:`Database`:
+
+.. autosummary::
+    Pool
+
+The batch of the queries in a round trip:
+
+.. autosummary::
+    Batch
+    ResultSet
+
+The timing of the execution, see :meth:`Database.enable_timing`:
+
+.. autosummary::
+    TimingStats
+    TimingEvent
+    fingerprint
+
 The functions designed for cursor:
 
 .. autosummary::
     extract_col_names
     one_to_dict
     all_to_dicts
+    Row
+    iter_rows
+    iter_dicts
+    to_columns
     group
+    external_sort
+    executemany
+    stage_values
 
 '''
 
 
 import os
+import re
+import heapq
+import logging
+import pickle
+import weakref
+import tempfile
 import threading
-from itertools import groupby
-from collections import deque, defaultdict
+from time import time
+from timeit import default_timer
+from array import array
+from operator import itemgetter
+from itertools import groupby, islice, count, chain
+from collections import deque, OrderedDict, namedtuple
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from .compat import PY2, izip, string_types, text_type
+from .util import _LRUCache, raw, autoparam
+from . import util as _util
+from . import query as _query
+
+
+class _ThreadState(object):
+
+    __slots__ = ('box', 'cur_stack', '__weakref__')
+
+    def __init__(self):
+        # [conn, pid]; the registry keeps the box to close the conn after the
+        # state is released
+        self.box = [None, os.getpid()]
+        self.cur_stack = deque()
+
+    @property
+    def conn(self):
+        return self.box[0]
+
+    @conn.setter
+    def conn(self, conn):
+        self.box[0] = conn
+
+
+class _ThreadRegistry(object):
+    '''It keeps the per-thread states. A state is released with its thread, and
+    the kept connection of it is passed to `release`. After a fork, the states
+    inherited from the parent are dropped without releasing.'''
 
-from .compat import PY2, izip
+    def __init__(self, release):
+        self._release = release
+        self._lock = threading.Lock()
+        self._reset()
 
+    def _reset(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+        # weakref of the state -> the box of the state
+        self._boxes = {}
 
-if PY2:
-    def _get_pid_tid_pair():
-        return (os.getpid(), threading.current_thread().ident)
-else:
-    def _get_pid_tid_pair():
-        return (os.getpid(), threading.get_ident())
+    def get(self):
+
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            state = self._local.state = _ThreadState()
+            self._boxes[weakref.ref(state, self._on_released)] = state.box
+
+        return state
+
+    def _on_released(self, ref):
+        box = self._boxes.pop(ref, None)
+        if box is None:
+            return
+        conn, pid = box
+        # never touch the connections inherited from the parent process
+        if conn is not None and pid == os.getpid():
+            try:
+                self._release(conn)
+            except Exception:
+                pass
+
+    def __len__(self):
+        return len(self._boxes)
 
 
 class Database(object):
@@ -84,6 +184,8 @@ class Database(object):
         db.getcur  = lambda conn: conn.cursor('named-cusor')
         db.putcur  = lambda cur : cur.close()
 
+    The built-in :class:`Pool` plugs into the `getconn` and `putconn`.
+
     By default, the connection will be closed when you leave with-block. If you
     want to keep the connection open, set `to_keep_conn` as ``True``. It will
     be useful in single threading environment.
@@ -92,6 +194,17 @@ class Database(object):
 
         db.to_keep_conn = True
 
+    If you connect to a non-standard database, set the `dialect` and bind the
+    queries to it, so different databases can be used at the same time:
+
+    ::
+
+        import mosql.sqlite
+        from mosql.query import select
+
+        db.dialect = mosql.sqlite.dialect
+        select = db.bind(select)
+
     .. versionadded:: 0.10
         the `to_keep_conn`.
 
@@ -104,6 +217,16 @@ class Database(object):
     .. versionchanged:: 0.12.3
         When the nest with case, it only commits after exit the first with.
 
+    .. versionadded:: 0.13
+        the `dialect`.
+
+    .. versionadded:: 0.13
+        the `batch_mode`, see :meth:`execute_batch`.
+
+    .. versionchanged:: 0.13
+        The per-thread states are released with their threads, and the kept
+        connections of the dead threads are put back.
+
     '''
 
     def __init__(self, module=None, *conn_args, **conn_kargs):
@@ -115,46 +238,958 @@ class Database(object):
 
         self.to_keep_conn = False
 
-        # consider multithreading and multiprocessing environment
-        # built-in thread local doesn't have the default feature
-        self._thread_local = defaultdict(lambda: {
-            'conn': None,
-            'cur_stack': deque()
-        })
+        self.dialect = None
+
+        self.batch_mode = 'union'
+        # fingerprint -> col_names, for the union batches
+        self._batch_columns = _LRUCache(1024)
+
+        self._timing = None
+
+        # consider multithreading and multiprocessing environment; the kept
+        # connection of a dead thread is put back
+        self._thread_local = _ThreadRegistry(lambda conn: self.putconn(conn))
 
     def __enter__(self):
+        return self._enter(self.getcur)
+
+    def _enter(self, getcur):
 
-        tl = self._thread_local[_get_pid_tid_pair()]
-        conn = tl['conn']
-        cur_stack = tl['cur_stack']
+        tl = self._thread_local.get()
+        conn = tl.conn
+        cur_stack = tl.cur_stack
+
+        timing = self._timing
 
         # conn won't be cleared if nested with or to_keep_conn is True
         if conn is None:
-            conn = tl['conn'] = self.getconn()
-
-        cur = self.getcur(conn)
+            if timing is None:
+                conn = tl.conn = self.getconn()
+            else:
+                started_at = default_timer()
+                conn = tl.conn = self.getconn()
+                timing.record('getconn', None, default_timer() - started_at)
+
+        cur = getcur(conn)
         cur_stack.append(cur)
 
+        if timing is not None:
+            return InstrumentedCursor(cur, timing.record)
         return cur
 
     def __exit__(self, exc_type, exc_val, exc_tb):
 
-        tl = self._thread_local[_get_pid_tid_pair()]
-        conn = tl['conn']
-        cur_stack = tl['cur_stack']
+        tl = self._thread_local.get()
+        conn = tl.conn
+        cur_stack = tl.cur_stack
 
         cur = cur_stack.pop()
         self.putcur(cur)
 
         if exc_type:
-            conn.rollback()
+            end = conn.rollback
         # only commit when the exit of the first with
         elif not cur_stack:
-            conn.commit()
+            end = conn.commit
+        else:
+            end = None
+
+        if end is not None:
+            timing = self._timing
+            if timing is None:
+                end()
+            else:
+                started_at = default_timer()
+                end()
+                timing.record(end.__name__, None, default_timer() - started_at)
 
         if not cur_stack and not self.to_keep_conn:
             self.putconn(conn)
-            conn = tl['conn'] = None
+            conn = tl.conn = None
+
+    def cursor(self, *args, **kargs):
+        '''It returns a context manager like this instance, but the cursor is
+        created by ``conn.cursor(*args, **kargs)``. It is useful to request a
+        named or server-side cursor for :func:`iter_rows`:
+
+        ::
+
+            # psycopg2
+            with db.cursor('export') as cur:
+                cur.execute('select * from huge')
+                for row in iter_rows(cur):
+                    ...
+
+            # PyMySQL
+            with db.cursor(pymysql.cursors.SSCursor) as cur:
+                ...
+
+        .. versionadded:: 0.13
+        '''
+        return _CursorContext(self, lambda conn: conn.cursor(*args, **kargs))
+
+    def bind(self, query):
+        '''It binds the `query` to the `dialect` of this instance. If the
+        `dialect` is ``None``, the `query` is returned as it is, so a query
+        bound before keeps its dialect.
+
+        :rtype: :class:`~mosql.util.Query`
+
+        .. versionadded:: 0.13
+        '''
+        if self.dialect is None:
+            return query
+        return query.bind(self.dialect)
+
+    def executemany(self, query, rows, batch_size=1000, **clause_args):
+        '''It runs :func:`executemany` with a cursor of this instance, and the
+        `query` is bound to the `dialect`.
+
+        ::
+
+            db.executemany(insert, rows, table='person')
+
+        :rtype: the number of the rows
+
+        .. versionadded:: 0.13
+        '''
+        with self as cur:
+            return executemany(cur, self.bind(query), rows, batch_size, **clause_args)
+
+    def execute_batch(self, sqls, mode=None):
+        '''It runs the independent queries by a :class:`Batch`:
+
+        ::
+
+            person, details = db.execute_batch([
+                select('person', {'person_id': 'mosky'}),
+                select('detail', {'person_id': 'mosky'}),
+            ])
+
+        :param sqls: the SQLs, or the SQLs with the params
+        :param mode: the mode of :class:`Batch`, or ``None`` for the
+                     `batch_mode` of this instance
+        :rtype: :class:`ResultSet` in list
+
+        .. versionadded:: 0.13
+        '''
+        with self as cur:
+            batch = Batch(cur, mode or self.batch_mode, self._batch_columns)
+            for sql in sqls:
+                if isinstance(sql, tuple):
+                    batch.add(*sql)
+                else:
+                    batch.add(sql)
+            return batch.execute()
+
+    def enable_timing(self, sink=None, slow_query_threshold=None, slow_query_logger=None, slow_query_log_sql=False):
+        '''Enables the timing. The cursors are wrapped by
+        :class:`InstrumentedCursor`, and every ``execute``, ``executemany``,
+        fetching, ``commit``, ``rollback`` and ``getconn`` is passed to the
+        `sink` as a :class:`TimingEvent`.
+
+        :param sink: a function which takes a :class:`TimingEvent`, or
+                     ``None`` for a new :class:`TimingStats`
+        :param slow_query_threshold: the statements which take the seconds or
+                                     more are logged
+        :param slow_query_logger: the :class:`logging.Logger`, or ``None`` for
+                                  the ``mosql.db.slow_query`` logger
+        :param slow_query_log_sql: whether to log the whole SQL after the
+                                   :func:`fingerprint`; the values in the SQL
+                                   are logged, so it is off by default
+        :returns: the `sink`
+
+        ::
+
+            stats = db.enable_timing(slow_query_threshold=0.5)
+            ...
+            for (kind, fp), stat in stats.snapshot().items():
+                print(kind, fp, stat['count'], stat['seconds'])
+
+        .. versionadded:: 0.13
+        '''
+
+        if sink is None:
+            sink = TimingStats()
+
+        self._timing = _Timing(
+            sink, slow_query_threshold,
+            slow_query_logger or logging.getLogger('mosql.db.slow_query'),
+            slow_query_log_sql
+        )
+
+        return sink
+
+    def disable_timing(self):
+        '''Disables the timing.
+
+        .. versionadded:: 0.13
+        '''
+        self._timing = None
+
+
+class PoolTimeoutError(Exception):
+    '''The instance of it will be raised when :meth:`Pool.getconn` waits
+    longer than the `timeout`.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def __str__(self):
+        return 'no connection is available in %s seconds' % self.timeout
+
+
+def _ping(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute('select 1')
+        cur.fetchall()
+    finally:
+        cur.close()
+
+
+class Pool(object):
+    '''It is a thread-safe connection pool.
+
+    :param connect: a function which returns a new connection
+    :param maxsize: the maximum number of the connections, including the idle
+                    and the checked out ones
+    :param min_idle: the number of the idle connections opened at start; the
+                     idle eviction never goes under it
+    :param timeout: the seconds :meth:`getconn` waits for a connection; `None`
+                    means forever
+    :param max_idle_time: the idle connections older than it in seconds are
+                          closed; `None` means never
+    :param pre_ping: ping a connection before returning it from the idle ones;
+                     it can be a function which takes a connection and raises if
+                     it is broken
+
+    Plug it into a :class:`Database`:
+
+    ::
+
+        import sqlite3
+        from functools import partial
+
+        pool = Pool(partial(sqlite3.connect, 'db', check_same_thread=False))
+
+        db = Database()
+        db.getconn = pool.getconn
+        db.putconn = pool.putconn
+
+    The idle connections are reused in last-in-first-out order, so the warm
+    ones are reused and the cold ones are evicted. The :meth:`stats` tells how
+    the pool works.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, connect, maxsize=10, min_idle=0, timeout=None, max_idle_time=None, pre_ping=False):
+
+        assert maxsize >= 1, 'The maxsize must be at least 1.'
+        assert 0 <= min_idle <= maxsize, 'The min_idle must be in [0, maxsize].'
+
+        self.connect = connect
+        self.maxsize = maxsize
+        self.min_idle = min_idle
+        self.timeout = timeout
+        self.max_idle_time = max_idle_time
+
+        if pre_ping is True:
+            pre_ping = _ping
+        self.pre_ping = pre_ping or None
+
+        # (conn, the time it was put back), the newest at the right
+        self._idle = deque()
+        # the number of the opened connections
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._closed_count = 0
+
+        for _ in range(min_idle):
+            conn = self._create()
+            with self._cond:
+                self._size += 1
+                self._idle.append((conn, time()))
+
+    def _create(self):
+        conn = self.connect()
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._closed_count += 1
+
+    def _evict(self):
+        # call it with the lock held; it returns the connections to close
+        evicted = []
+        if self.max_idle_time is None:
+            return evicted
+        deadline = time() - self.max_idle_time
+        while len(self._idle) > self.min_idle and self._idle[0][1] < deadline:
+            evicted.append(self._idle.popleft()[0])
+        self._size -= len(evicted)
+        return evicted
+
+    def _checkout(self):
+
+        started_at = None
+
+        with self._cond:
+
+            if self._closed:
+                raise RuntimeError('the pool is closed')
+
+            evicted = self._evict()
+
+            while True:
+
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                    break
+
+                if self._size < self.maxsize:
+                    self._size += 1
+                    conn = None
+                    break
+
+                now = time()
+                if started_at is None:
+                    started_at = now
+                    self._waits += 1
+
+                if self.timeout is None:
+                    remaining = None
+                else:
+                    remaining = started_at + self.timeout - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += now - started_at
+                        raise PoolTimeoutError(self.timeout)
+
+                self._cond.wait(remaining)
+
+            self._checkouts += 1
+            if started_at is not None:
+                self._wait_time += time() - started_at
+
+        for evicted_conn in evicted:
+            self._close(evicted_conn)
+
+        return conn
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self):
+        '''It returns an idle connection, or a new one if the pool isn't full.
+        Otherwise, it blocks until a connection is put back.
+
+        :raises PoolTimeoutError: if it waits longer than the `timeout`.
+        '''
+
+        conn = self._checkout()
+
+        if conn is not None and self.pre_ping is not None:
+            try:
+                self.pre_ping(conn)
+            except Exception:
+                self._close(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._create()
+            except:
+                self._release_slot()
+                raise
+
+        return conn
+
+    def putconn(self, conn):
+        '''It puts the connection back. The connection is closed if the pool is
+        closed.'''
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time()))
+                self._cond.notify()
+                return
+
+        self._close(conn)
+        self._release_slot()
+
+    def discard(self, conn):
+        '''It closes a broken connection and frees its place in the pool.'''
+
+        self._close(conn)
+        self._release_slot()
+
+    def close(self):
+        '''It closes the idle connections. The checked out connections are
+        closed when they are put back.'''
+
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        '''It returns the statistics of this pool.
+
+        :rtype: dict
+
+        The keys:
+
+        - `size` -- the number of the opened connections
+        - `idle` -- the number of the idle connections
+        - `checkouts` -- the times of :meth:`getconn`
+        - `waits` -- the times :meth:`getconn` had to wait
+        - `wait_time` -- the total seconds spent in waiting
+        - `timeouts` -- the times :meth:`getconn` timed out
+        - `created` -- the number of the created connections
+        - `closed` -- the number of the closed connections
+        '''
+
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'closed': self._closed_count,
+            }
+
+
+_fingerprint_subs = [
+    # the string literals
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    # the comments
+    (re.compile(r'--[^\n]*|/\*.*?\*/', re.S), ''),
+    # the placeholders
+    (re.compile(r'%\(\w+\)s|%s|(?<![:\w]):[A-Za-z_]\w*|\$\d+'), '?'),
+    # the numbers which aren't a part of identifiers
+    (re.compile(r'(?<![\w"`\]])[-+]?\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b'), '?'),
+    # the lists of values
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+_fingerprints = _LRUCache(1024)
+
+# the longer SQLs, such as the chunks of bulk_insert, are not cached
+_fingerprint_cache_max_len = 4096
+
+def fingerprint(sql):
+    '''It normalizes the `sql` by replacing the literals and the placeholders
+    with ``?`` and the lists of them with ``(...)``, so the statements in the
+    same shape have the same fingerprint.
+
+    >>> print(fingerprint("SELECT * FROM person WHERE id IN ('a', 'b') AND age > 20"))
+    SELECT * FROM person WHERE id IN (...) AND age > ?
+
+    The bytes are decoded as UTF-8, and the other objects, such as the
+    composed SQL of a driver, are converted by :func:`str`.
+
+    .. versionadded:: 0.13
+    '''
+
+    if not isinstance(sql, string_types):
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+        else:
+            sql = text_type(sql)
+
+    cacheable = len(sql) <= _fingerprint_cache_max_len
+
+    fp = _fingerprints.get(sql) if cacheable else None
+    if fp is None:
+        fp = sql
+        for pattern, repl in _fingerprint_subs:
+            fp = pattern.sub(repl, fp)
+        fp = fp.strip()
+        if cacheable:
+            _fingerprints.set(sql, fp)
+    return fp
+
+
+TimingEvent = namedtuple('TimingEvent', 'kind sql seconds rows')
+'''The event passed to the sink of :meth:`Database.enable_timing`.
+
+- `kind` -- ``'execute'``, ``'executemany'``, ``'fetch'``, ``'commit'``,
+  ``'rollback'`` or ``'getconn'``
+- `sql` -- the SQL of the statement, or ``None``
+- `seconds` -- the time it took
+- `rows` -- the number of the rows fetched, or ``None``
+
+.. versionadded:: 0.13
+'''
+
+
+class _Timing(object):
+
+    def __init__(self, sink, slow_query_threshold, slow_query_logger, slow_query_log_sql):
+        self.sink = sink
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_query_logger = slow_query_logger
+        self.slow_query_log_sql = slow_query_log_sql
+
+    def record(self, kind, sql, seconds, rows=None):
+
+        self.sink(TimingEvent(kind, sql, seconds, rows))
+
+        if (
+            self.slow_query_threshold is not None
+            and sql is not None
+            and kind != 'fetch'
+            and seconds >= self.slow_query_threshold
+        ):
+            if self.slow_query_log_sql:
+                self.slow_query_logger.warning(
+                    'slow query: %.6fs %s -- %s', seconds, fingerprint(sql), sql
+                )
+            else:
+                self.slow_query_logger.warning(
+                    'slow query: %.6fs %s', seconds, fingerprint(sql)
+                )
+
+
+class TimingStats(object):
+    '''A sink which aggregates the :class:`TimingEvent` instances by the kind
+    and the :func:`fingerprint` of the SQL. The fetched rows count towards the
+    last executed statement of the cursor.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+
+    def __call__(self, event):
+
+        key = (event.kind, None if event.sql is None else fingerprint(event.sql))
+
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = {
+                    'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0,
+                }
+            stat['count'] += 1
+            stat['seconds'] += event.seconds
+            if event.seconds > stat['max_seconds']:
+                stat['max_seconds'] = event.seconds
+            if event.rows:
+                stat['rows'] += event.rows
+
+    def snapshot(self):
+        '''It returns the stats by (kind, fingerprint) in a dict. A stat has
+        `count`, `seconds`, `max_seconds` and `rows`.'''
+        with self._lock:
+            return OrderedDict((key, dict(stat)) for key, stat in self._stats.items())
+
+    def reset(self):
+        '''It clears the stats.'''
+        with self._lock:
+            self._stats.clear()
+
+
+class InstrumentedCursor(object):
+    '''It wraps a cursor and passes the time of the execution and fetching to
+    the `record` function. The other attributes are the same as the cursor.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, cur, record):
+        self._cur = cur
+        self._record = record
+        self._sql = None
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def _execute(self, kind, f, sql, args):
+        self._sql = sql
+        started_at = default_timer()
+        try:
+            return f(sql, *args)
+        finally:
+            self._record(kind, sql, default_timer() - started_at)
+
+    def execute(self, sql, *args):
+        return self._execute('execute', self._cur.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._execute('executemany', self._cur.executemany, sql, args)
+
+    def _fetch(self, f, *args):
+        started_at = default_timer()
+        rows = f(*args)
+        seconds = default_timer() - started_at
+        return rows, seconds
+
+    def fetchone(self):
+        row, seconds = self._fetch(self._cur.fetchone)
+        self._record('fetch', self._sql, seconds, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args):
+        rows, seconds = self._fetch(self._cur.fetchmany, *args)
+        self._record('fetch', self._sql, seconds, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows, seconds = self._fetch(self._cur.fetchall)
+        self._record('fetch', self._sql, seconds, len(rows))
+        return rows
+
+    def __iter__(self):
+        # one event for the whole iteration
+        it = iter(self._cur)
+        n = 0
+        seconds = 0.0
+        try:
+            while True:
+                started_at = default_timer()
+                try:
+                    row = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += default_timer() - started_at
+                n += 1
+                yield row
+        finally:
+            self._record('fetch', self._sql, seconds, n)
+
+
+ResultSet = namedtuple('ResultSet', 'col_names rows')
+'''The result of a query in a :class:`Batch`.
+
+.. versionadded:: 0.13
+'''
+
+# the queries which have ORDER BY are not put into the UNION ALL
+_order_by = re.compile(r'\border\s+by\b', re.I)
+
+def _execute(cur, sql, params):
+    # some drivers format the sql even if the params are empty
+    if params:
+        cur.execute(sql, params)
+    else:
+        cur.execute(sql)
+
+class Batch(object):
+    '''It collects the independent ``SELECT`` queries, and sends them in one
+    round trip.
+
+    :param cur: a cursor
+    :param mode: ``'union'`` or ``'multi'``
+    :param columns_cache: the cache of the columns of the queries for the
+                          ``'union'`` mode, or ``None`` for a new one of this
+                          batch; :class:`Database` keeps one per instance
+
+    ::
+
+        with db as cur:
+            batch = Batch(cur)
+            batch.add(select('person', {'person_id': 'mosky'}))
+            batch.add(select('detail', {'person_id': 'mosky'}))
+            person, details = batch.execute()
+
+    The ``'multi'`` mode joins the queries by ``;``, and reads the results
+    by ``cur.nextset()``. It needs a driver which runs multiple statements in
+    an ``execute``, such as PyMySQL with ``CLIENT.MULTI_STATEMENTS``, or
+    psycopg 3.
+
+    The ``'union'`` mode works with any driver. It tags the rows of every
+    query with a discriminator column, pads the columns with ``NULL``, and
+    combines the queries by ``UNION ALL``. The number of the columns of a
+    query is learned by running it alone the first time, and then it is
+    remembered by the :func:`fingerprint`. The columns in a same position of
+    the queries should have the compatible types, which is always true on
+    SQLite.
+
+    The limits of the ``'union'`` mode:
+
+    - The queries whose columns are not remembered yet, such as the ones
+      added the first time, are run one by one.
+    - The queries which have ``ORDER BY`` are run one by one, since a
+      database may ignore the order of a subquery in the ``UNION ALL``. Use
+      the ``'multi'`` mode to send them in one round trip.
+    - If the columns of a query are changed, such as by an ``ALTER TABLE``,
+      the queries are run one by one again to learn the new columns. If the
+      change makes the ``UNION ALL`` fail, the error is raised, and the
+      columns are learned again by the next :meth:`execute`.
+
+    The params must be positional, and they are concatenated in order.
+
+    .. versionadded:: 0.13
+    '''
+
+    discriminator = 'mosql_batch'
+
+    def __init__(self, cur, mode='union', columns_cache=None):
+        self.cur = cur
+        self.mode = mode
+        self.columns_cache = _LRUCache(1024) if columns_cache is None else columns_cache
+        self.queries = []
+
+    def add(self, sql, params=None):
+        '''It adds a query, and returns its index in the results.'''
+        self.queries.append((sql, tuple(params or ())))
+        return len(self.queries) - 1
+
+    def __len__(self):
+        return len(self.queries)
+
+    def execute(self):
+        '''It runs the queries added, and clears them.
+
+        :rtype: :class:`ResultSet` in list
+        '''
+
+        queries, self.queries = self.queries, []
+
+        if self.mode == 'multi':
+            return self._execute_multi(queries)
+        elif self.mode == 'union':
+            return self._execute_union(queries)
+        else:
+            raise ValueError('unknown mode: %r' % self.mode)
+
+    def _execute_multi(self, queries):
+
+        cur = self.cur
+
+        _execute(
+            cur,
+            ';\n'.join(sql for sql, _ in queries),
+            tuple(p for _, params in queries for p in params)
+        )
+
+        results = []
+        for i in range(len(queries)):
+            if i and not cur.nextset():
+                raise ValueError('the driver returned %d of %d result sets' % (i, len(queries)))
+            results.append(ResultSet(extract_col_names(cur), cur.fetchall()))
+
+        return results
+
+    def _execute_union(self, queries):
+
+        cur = self.cur
+        columns_cache = self.columns_cache
+
+        results = [None] * len(queries)
+        known = []
+
+        for i, (sql, params) in enumerate(queries):
+            fp = fingerprint(sql)
+            col_names = None if _order_by.search(fp) else columns_cache.get(fp)
+            if col_names is None:
+                results[i] = self._learn(sql, params)
+            else:
+                known.append((i, sql, params, col_names))
+
+        if len(known) == 1:
+            i, sql, params, col_names = known[0]
+            _execute(cur, sql, params)
+            if len(cur.description) != len(col_names):
+                col_names = extract_col_names(cur)
+                columns_cache.set(fingerprint(sql), col_names)
+            results[i] = ResultSet(col_names, cur.fetchall())
+
+        elif known:
+
+            width = max(len(col_names) for _, _, _, col_names in known)
+            pieces = []
+            union_params = []
+            for i, sql, params, col_names in known:
+                pieces.append('SELECT %d AS %s, q%d.*%s FROM (%s) AS q%d' % (
+                    i, self.discriminator, i,
+                    ', NULL' * (width - len(col_names)),
+                    sql, i,
+                ))
+                union_params.extend(params)
+                results[i] = ResultSet(col_names, [])
+
+            try:
+                _execute(cur, ' UNION ALL '.join(pieces), tuple(union_params))
+            except Exception:
+                # the columns may be changed, so learn them again next time
+                for _, sql, _, _ in known:
+                    columns_cache.delete(fingerprint(sql))
+                raise
+
+            if len(cur.description) != width+1:
+                # the columns are changed, so learn them again
+                cur.fetchall()
+                for i, sql, params, _ in known:
+                    columns_cache.delete(fingerprint(sql))
+                    results[i] = self._learn(sql, params)
+                return results
+
+            for row in cur.fetchall():
+                result = results[row[0]]
+                result.rows.append(tuple(row[1:len(result.col_names)+1]))
+
+        return results
+
+    def _learn(self, sql, params):
+
+        cur = self.cur
+
+        _execute(cur, sql, params)
+        col_names = extract_col_names(cur)
+        self.columns_cache.set(fingerprint(sql), col_names)
+
+        return ResultSet(col_names, cur.fetchall())
+
+class _CursorContext(object):
+
+    def __init__(self, db, getcur):
+        self._db = db
+        self._getcur = getcur
+
+    def __enter__(self):
+        return self._db._enter(self._getcur)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self._db.__exit__(exc_type, exc_val, exc_tb)
+
+
+class Row(object):
+    '''It is a read-only mapping on a row. It keeps the original row and a
+    column-name-to-index dict which is shared by all the rows from a same
+    cursor, so no data is copied.
+
+    :param row: the row from a cursor
+    :param index: the dict made by :func:`make_index`
+
+    ::
+
+        >>> index = make_index(['id', 'email'])
+        >>> row = Row(('mosky', 'mosky.tw@gmail.com'), index)
+        >>> row['id']
+        'mosky'
+        >>> row.email
+        'mosky.tw@gmail.com'
+        >>> list(row.items())
+        [('id', 'mosky'), ('email', 'mosky.tw@gmail.com')]
+
+    .. versionadded:: 0.13
+    '''
+
+    __slots__ = ('_row', '_index')
+
+    def __init__(self, row, index):
+        self._row = row
+        self._index = index
+
+    def __getitem__(self, name):
+        return self._row[self._index[name]]
+
+    def __getattr__(self, name):
+        # the slots are not set yet while copying or unpickling
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._row[self._index[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __reduce__(self):
+        return (Row, (self._row, self._index))
+
+    def get(self, name, default=None):
+        idx = self._index.get(name)
+        if idx is None:
+            return default
+        return self._row[idx]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return list(self._index)
+
+    def values(self):
+        return list(self._row)
+
+    def items(self):
+        return list(izip(self._index, self._row))
+
+    def to_dict(self):
+        '''It returns a plain dict.'''
+        return dict(izip(self._index, self._row))
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Row(%r)' % (self.items(), )
+
+Mapping.register(Row)
+
+
+def make_index(col_names):
+    '''It makes the column-name-to-index dict for :class:`Row`. The order of
+    the dict follows the `col_names`.
+
+    :rtype: dict
+
+    .. versionadded:: 0.13
+    '''
+    return OrderedDict((name, idx) for idx, name in enumerate(col_names))
+
+
+def _to_mapping(row, col_names, index):
+    # the index is made only for the rows
+    if index is not None:
+        return Row(row, index)
+    return dict(izip(col_names, row))
 
 
 def extract_col_names(cur):
@@ -165,12 +1200,16 @@ def extract_col_names(cur):
     return [desc[0] for desc in cur.description]
 
 
-def one_to_dict(cur=None, row=None, col_names=None):
+def one_to_dict(cur=None, row=None, col_names=None, as_row=False):
     '''Fetch one row from a cursor and make it as a dict.
 
-    If `col_names` or `row` is provided, it will be used first.
+    If `col_names` or `row` is provided, it will be used first. If `as_row` is
+    true, it makes a :class:`Row` instead.
 
-    :rtype: dict
+    :rtype: dict or :class:`Row`
+
+    .. versionadded:: 0.13
+        the `as_row`.
     '''
 
     if col_names is None:
@@ -181,15 +1220,21 @@ def one_to_dict(cur=None, row=None, col_names=None):
         assert cur is not None, 'You must specify cur or row.'
         row = cur.fetchone()
 
+    if as_row:
+        return Row(row, make_index(col_names))
     return dict(izip(col_names, row))
 
 
-def all_to_dicts(cur=None, rows=None, col_names=None):
+def all_to_dicts(cur=None, rows=None, col_names=None, as_row=False):
     '''Fetch all rows from a cursor and make them as dicts in a list.
 
-    If `col_names` or `rows` is provided, it will be used first.
+    If `col_names` or `rows` is provided, it will be used first. If `as_row` is
+    true, it makes :class:`Row` instances which share one index instead.
+
+    :rtype: dicts or :class:`Row` instances in list
 
-    :rtype: dicts in list
+    .. versionadded:: 0.13
+        the `as_row`.
     '''
 
     if col_names is None:
@@ -200,14 +1245,376 @@ def all_to_dicts(cur=None, rows=None, col_names=None):
         assert cur is not None, 'You must specify cur or rows.'
         rows = cur
 
+    if as_row:
+        index = make_index(col_names)
+        return [Row(row, index) for row in rows]
     return [dict(izip(col_names, row)) for row in rows]
 
 
-def group(by_col_names, cur=None, rows=None, col_names=None, to_dict=False):
-    '''Groups the rows in application-level.
+def iter_rows(cur, batch_size=1000):
+    '''Fetch the rows from a cursor by ``fetchmany(batch_size)`` lazily, so the
+    memory is bounded by the `batch_size`.
+
+    With a server-side cursor, see :meth:`Database.cursor`, the driver doesn't
+    buffer the whole result either.
+
+    :rtype: row generator
+
+    .. versionadded:: 0.13
+    '''
+
+    for rows in _fetch_batches(cur, batch_size):
+        for row in rows:
+            yield row
+
+
+def _fetch_batches(cur, batch_size):
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def iter_dicts(cur=None, rows=None, col_names=None, batch_size=1000, as_row=False):
+    '''The lazy version of :func:`all_to_dicts`. It fetches the rows by
+    :func:`iter_rows`.
+
+    If `col_names` or `rows` is provided, it will be used first. If `as_row` is
+    true, it makes :class:`Row` instances instead.
+
+    :rtype: dict or :class:`Row` generator
+
+    .. versionadded:: 0.13
+    '''
+
+    if col_names is None:
+        assert cur is not None, 'You must specify cur or col_names.'
+        col_names = extract_col_names(cur)
+
+    if rows is None:
+        assert cur is not None, 'You must specify cur or rows.'
+        rows = iter_rows(cur, batch_size)
+
+    index = make_index(col_names) if as_row else None
+    for row in rows:
+        yield _to_mapping(row, col_names, index)
+
+
+# the typecodes of the columns detected from the first row
+_typecodes = {int: 'l' if PY2 else 'q', float: 'd'}
+
+
+def _iter_batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def _new_column(typecode, size):
+    if typecode is None:
+        return [None] * size
+    return array(typecode, [0]) * size
+
+
+def _put_column(column, n, values):
+    # put the values from n, and return the column which may be a list now
+
+    cap = len(column)
+    m = max(0, min(len(values), cap - n))
+
+    try:
+        if isinstance(column, array):
+            if m:
+                column[n:n+m] = array(column.typecode, values[:m])
+            if m < len(values):
+                column.extend(values[m:])
+        else:
+            if m:
+                column[n:n+m] = values[:m]
+            if m < len(values):
+                column.extend(values[m:])
+    except (TypeError, OverflowError):
+        # the values don't fit the typecode, so fall back to a list
+        demoted = column[:n].tolist()
+        demoted.extend(values)
+        demoted.extend([None] * (cap - len(demoted)))
+        return demoted
+
+    return column
+
+
+def to_columns(cur=None, rows=None, col_names=None, typecodes=None, size=0, batch_size=1000, as_numpy=False):
+    '''Fetch the rows by ``fetchmany(batch_size)`` into per-column containers.
 
     If `col_names` or `rows` is provided, it will be used first.
 
+    :param typecodes: the :mod:`array` typecodes of the columns by name; a
+                      column which is not in it is detected from the first
+                      row: an int column is ``'q'`` (``'l'`` on Python 2), a
+                      float column is ``'d'``, and the others are lists
+    :param size: the number of the rows if it is known, to preallocate
+    :param as_numpy: convert the arrays into NumPy arrays without copying
+
+    :rtype: an ordered dict of the column names and the columns
+
+    A column falls back to a list if a value doesn't fit its typecode, e.g., a
+    ``None``.
+
+    ::
+
+        >>> columns = to_columns(rows=[(1, 0.5, 'a'), (2, 1.5, 'b')], col_names=['id', 'score', 'name'])
+        >>> columns['score']
+        array('d', [0.5, 1.5])
+        >>> columns['name']
+        ['a', 'b']
+
+    .. versionadded:: 0.13
+    '''
+
+    if col_names is None:
+        assert cur is not None, 'You must specify cur or col_names.'
+        col_names = extract_col_names(cur)
+
+    if rows is None:
+        assert cur is not None, 'You must specify cur or rows.'
+        batches = _fetch_batches(cur, batch_size)
+    else:
+        batches = _iter_batches(rows, batch_size)
+
+    typecodes = typecodes or {}
+    columns = None
+    n = 0
+
+    for batch in batches:
+
+        if columns is None:
+            columns = [
+                _new_column(
+                    typecodes[name] if name in typecodes else _typecodes.get(type(value)),
+                    size
+                )
+                for name, value in izip(col_names, batch[0])
+            ]
+
+        for i, values in enumerate(izip(*batch)):
+            columns[i] = _put_column(columns[i], n, values)
+
+        n += len(batch)
+
+    if columns is None:
+        columns = [_new_column(typecodes.get(name), 0) for name in col_names]
+
+    for column in columns:
+        del column[n:]
+
+    if as_numpy:
+        import numpy
+        columns = [
+            (
+                numpy.frombuffer(column, dtype=column.typecode) if column
+                else numpy.empty(0, dtype=column.typecode)
+            )
+            if isinstance(column, array) else column
+            for column in columns
+        ]
+
+    return OrderedDict(izip(col_names, columns))
+
+
+def _agg_list(rows, i):
+    return list(map(itemgetter(i), rows))
+
+def _agg_set(rows, i):
+    return set(map(itemgetter(i), rows))
+
+def _agg_count(rows, i):
+    return len(rows)
+
+def _agg_first(rows, i):
+    return rows[0][i]
+
+def _agg_sum(rows, i):
+    return sum(map(itemgetter(i), rows))
+
+aggregators = {
+    'list': _agg_list,
+    'set': _agg_set,
+    'count': _agg_count,
+    'first': _agg_first,
+    'sum': _agg_sum,
+}
+'''The aggregators which are available in :func:`group` by name.
+
+- `list` -- the values in a list
+- `set` -- the values in a set
+- `count` -- the number of the rows
+- `first` -- the value of the first row
+- `sum` -- the sum of the values
+
+.. versionadded:: 0.13
+'''
+
+
+def _to_aggregator(agg):
+    if callable(agg):
+        return lambda rows, i: agg(list(map(itemgetter(i), rows)))
+    return aggregators[agg]
+
+
+def _hash_groups(rows, key_func):
+    groups = OrderedDict()
+    for row in rows:
+        key = key_func(row)
+        try:
+            groups[key].append(row)
+        except KeyError:
+            groups[key] = [row]
+    return groups.items()
+
+
+# the aggregators which need only a running state, so the hash table doesn't
+# keep the rows of the groups
+_running_aggregators = ('count', 'first', 'sum')
+
+def _hash_aggregate(rows, key_func, running_aggs):
+
+    counts = [idx for idx, agg in running_aggs if agg == 'count']
+    sums = [idx for idx, agg in running_aggs if agg == 'sum']
+
+    groups = OrderedDict()
+    for row in rows:
+        key = key_func(row)
+        try:
+            states = groups[key]
+        except KeyError:
+            # the key columns and the first values are from the first row
+            states = groups[key] = list(row)
+            for idx in counts:
+                states[idx] = 1
+            for idx in sums:
+                states[idx] = 0 + row[idx]
+            continue
+        for idx in counts:
+            states[idx] += 1
+        for idx in sums:
+            states[idx] += row[idx]
+
+    return groups.values()
+
+
+def _dump_run(rows):
+    f = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    for row in rows:
+        pickler.dump(row)
+        # the memo would keep every row alive
+        pickler.clear_memo()
+    f.seek(0)
+    return f
+
+
+def _load_run(f):
+    unpickler = pickle.Unpickler(f)
+    try:
+        while True:
+            yield unpickler.load()
+    except EOFError:
+        pass
+    finally:
+        f.close()
+
+
+def _sort_key(key):
+    # None can't be compared with the others on Python 3, so sort it last
+    if isinstance(key, tuple):
+        return tuple((k is None, k) for k in key)
+    return (key is None, key)
+
+
+def _decorate(rows, key_func, seq):
+    # the seq keeps it stable and never lets the rows be compared
+    for row in rows:
+        yield (_sort_key(key_func(row)), next(seq), row)
+
+
+def external_sort(rows, key_func, buffer_size, fan_in=64):
+    '''It sorts the rows by the `key_func` with at most `buffer_size` rows in
+    memory. The sorted runs are spilled to the temporary files, and then they
+    are merged lazily. The ``None`` keys are sorted last.
+
+    :param fan_in: the maximum number of the runs which are merged at once;
+                   the runs more than it are merged into the longer runs
+                   first, so the number of the open files is bounded
+
+    :rtype: row generator
+
+    .. versionadded:: 0.13
+    '''
+
+    assert buffer_size >= 1, 'The buffer_size must be at least 1.'
+    assert fan_in >= 2, 'The fan_in must be at least 2.'
+
+    rows = iter(rows)
+    seq = count()
+    runs = []
+
+    try:
+
+        while True:
+
+            buffered = list(_decorate(islice(rows, buffer_size), key_func, seq))
+            buffered.sort()
+
+            # it fits in memory, no spill
+            if not runs and len(buffered) < buffer_size:
+                for _, _, row in buffered:
+                    yield row
+                return
+
+            if not buffered:
+                break
+
+            runs.append(_dump_run(buffered))
+            del buffered
+
+        while len(runs) > fan_in:
+            merged = _dump_run(heapq.merge(*[_load_run(f) for f in runs[:fan_in]]))
+            runs = runs[fan_in:] + [merged]
+
+        for _, _, row in heapq.merge(*[_load_run(f) for f in runs]):
+            yield row
+
+    finally:
+        for f in runs:
+            f.close()
+
+
+def group(by_col_names, cur=None, rows=None, col_names=None, to_dict=False, batch_size=1000, as_row=False, presorted=True, aggregators=None, sort_buffer=None):
+    '''Groups the rows in application-level.
+
+    If `col_names` or `rows` is provided, it will be used first. The rows of
+    the `cur` are fetched by :func:`iter_rows` with the `batch_size`. If both
+    `to_dict` and `as_row` are true, it yields :class:`Row` instances.
+
+    :param presorted: whether the rows are sorted by the `by_col_names`; if it
+                      is false, the rows are grouped by a hash table, and the
+                      groups are in the order of their first rows
+    :param aggregators: a dict of the column names and the aggregators; an
+                        aggregator is a name in :attr:`mosql.db.aggregators`
+                        or a function which takes the values in a list; the
+                        default is ``'list'``; if the rows are grouped by the
+                        hash table, and all the aggregators are ``'count'``,
+                        ``'first'`` or ``'sum'``, it keeps only the running
+                        results instead of the rows
+    :param sort_buffer: if the rows aren't `presorted`, sort them by
+                        :func:`external_sort` with at most the number of rows
+                        in memory instead of the hash table, so the groups are
+                        in the order of the keys
+
     :rtype: row generator
 
     Assume we have a cursor named ``cur`` has the data:
@@ -235,6 +1642,24 @@ def group(by_col_names, cur=None, rows=None, col_names=None, to_dict=False):
         ('alice', ['alice@gmail.com'])
         ('mosky', ['mosky.tw@gmail.com', 'mosky.liu@pinkoi.com'])
 
+    Count the emails of the unsorted rows:
+
+    ::
+
+        group(['id'], cur, presorted=False, aggregators={'email': 'count'})
+
+    Group the rows of any size in bounded memory:
+
+    ::
+
+        group(['id'], cur, presorted=False, sort_buffer=100000)
+
+    .. versionchanged:: 0.13
+        It fetches the rows by ``fetchmany``, and the `batch_size`.
+
+    .. versionadded:: 0.13
+        the `as_row`, `presorted`, `aggregators` and `sort_buffer`.
+
     '''
 
     if col_names is None:
@@ -243,25 +1668,164 @@ def group(by_col_names, cur=None, rows=None, col_names=None, to_dict=False):
 
     if rows is None:
         assert cur is not None, 'You must specify cur or rows.'
-        rows = cur
+        rows = iter_rows(cur, batch_size)
 
     name_index_map = dict((name, idx) for idx, name in enumerate(col_names))
     key_indexes = tuple(name_index_map.get(name) for name in by_col_names)
-    key_func = lambda row: tuple(row[i] for i in key_indexes)
+    key_func = itemgetter(*key_indexes)
+
+    aggregators = aggregators or {}
+    value_aggs = [
+        (idx, aggregators.get(name, 'list'))
+        for idx, name in enumerate(col_names)
+        if idx not in key_indexes
+    ]
+
+    index = make_index(col_names) if to_dict and as_row else None
+
+    if presorted:
+        groups = groupby(rows, key_func)
+    elif sort_buffer:
+        groups = groupby(external_sort(rows, key_func, sort_buffer), key_func)
+    elif all(agg in _running_aggregators for _, agg in value_aggs):
+        groups = None
+        aggregated = _hash_aggregate(rows, key_func, value_aggs)
+    else:
+        groups = _hash_groups(rows, key_func)
+
+    if groups is not None:
+        aggregated = _aggregate_groups(groups, [
+            (idx, _to_aggregator(agg)) for idx, agg in value_aggs
+        ])
+
+    for row in aggregated:
+        if to_dict:
+            yield _to_mapping(row, col_names, index)
+        else:
+            yield tuple(row)
 
-    for key_values, rows_islice in groupby(rows, key_func):
 
-        # TODO: the performance
+def _aggregate_groups(groups, value_aggs):
 
-        row = [list(col) for col in izip(*rows_islice)]
-        for key_index, key_value in izip(key_indexes, key_values):
-            row[key_index] = key_value
+    for _, group_rows in groups:
 
-        if to_dict:
-            yield one_to_dict(row=row, col_names=col_names)
+        # the key columns come from the first row as is
+        group_rows = list(group_rows)
+        row = list(group_rows[0])
+        for idx, agg in value_aggs:
+            row[idx] = agg(group_rows, idx)
+
+        yield row
+
+def executemany(cur, query, rows, batch_size=1000, **clause_args):
+    '''It renders the `query` only once with the placeholders, and then passes
+    the params of the `rows` to ``cur.executemany`` batch by batch.
+
+    ::
+
+        with db as cur:
+            executemany(cur, insert, rows, table='person')
+            executemany(cur, update, rows, table='person', where={'person_id': ___}, set={'name': ___})
+
+    :param cur: a cursor
+    :param query: a :class:`~mosql.util.Query`, such as
+                  :func:`~mosql.query.insert`
+    :param rows: any iterable of the dicts or :class:`Row`
+    :param batch_size: the number of the rows of a ``cur.executemany``
+    :param clause_args: the clause args of the `query`; the
+                        :attr:`~mosql.util.autoparam` and
+                        :class:`~mosql.util.param` values in the pairs are
+                        taken from the rows by the names
+    :rtype: the number of the rows
+
+    If there is no param, the `set` is the columns of the first row with
+    :attr:`~mosql.util.autoparam`. The `query` is rendered as
+    :meth:`~mosql.util.Query.prepare`, so the cursor must take the positional
+    params in the style of the :func:`~mosql.util.format_param` of the query.
+
+    .. versionadded:: 0.13
+    '''
+
+    rows = iter(rows)
+    try:
+        first_row = next(rows)
+    except StopIteration:
+        return 0
+
+    sql, names = query.prepare(**clause_args)
+    if not names:
+        clause_args['set'] = [(k, autoparam) for k in first_row.keys()]
+        sql, names = query.prepare(**clause_args)
+
+    if len(names) == 1:
+        name = names[0]
+        get = lambda row: (row[name], )
+    else:
+        get = itemgetter(*names)
+
+    # the values are converted as a parameterized query does
+    bind_value = query._namespace['bind_value']
+
+    n = 0
+    params = (tuple(map(bind_value, get(row))) for row in chain((first_row, ), rows))
+    for batch in _iter_batches(params, batch_size):
+        cur.executemany(sql, batch)
+        n += len(batch)
+
+    return n
+
+def stage_values(cur, values, table='mosql_staged', column='v', column_type=None, dialect=None, max_rows=1000, parameterize=False):
+    '''It inserts the `values` into a new temporary table, and returns the
+    subquery of them. It joins a huge ``IN`` list in the database instead of
+    sending it in the SQL of the query:
+
+    ::
+
+        with db as cur:
+            staged = stage_values(cur, person_ids)
+            cur.execute(select('person', {'person_id in': staged}))
+
+    :param cur: a cursor
+    :param values: any iterable of the values
+    :param table: the name of the temporary table; the temporary table of the
+                  name is dropped first by the
+                  :attr:`~mosql.util.drop_temporary_table` if it exists
+    :param column: the name of the column
+    :param column_type: the SQL type of the column, e.g., ``'integer'``; some
+                        databases, like PostgreSQL, need it
+    :param dialect: the :class:`~mosql.util.Dialect` to format
+    :param max_rows: the maximum number of the rows in an ``INSERT``
+    :param parameterize: execute the ``INSERT`` statements with params
+    :rtype: :class:`~mosql.util.raw`
+
+    .. seealso ::
+        The :attr:`~mosql.util.in_list_strategy` builds a large ``IN`` list
+        in the SQL.
+
+    .. versionadded:: 0.13
+    '''
+
+    functions = _util if dialect is None else dialect
+    identifier = functions.identifier
+
+    table = identifier(table)
+    column = identifier(column)
+
+    cur.execute(functions.drop_temporary_table % table)
+    cur.execute('CREATE TEMPORARY TABLE %s (%s)' % (
+        table, column if column_type is None else '%s %s' % (column, column_type)
+    ))
+
+    for chunk in _query.bulk_insert(
+        raw(table), ((v, ) for v in values), max_rows=max_rows,
+        parameterize=parameterize, dialect=dialect
+    ):
+        if parameterize:
+            cur.execute(*chunk)
         else:
-            yield tuple(row)
+            cur.execute(chunk)
 
+    return raw('(SELECT %s FROM %s)' % (column, table))
 
 if __name__ == '__main__':
     import doctest
@@ -16,6 +16,16 @@ If you want to patch again:
     mosql.mysql.patch()
 
 It will replace the functions in :mod:`mosql.util` with its functions.
+
+If you want to build MySQL and other SQL at the same time, use the
+:attr:`dialect` instead of the patch:
+
+::
+
+    from mosql.mysql import dialect
+    from mosql.query import select
+
+    select = select.bind(dialect)
 '''
 
 import mosql.util
@@ -81,6 +91,19 @@ def escape_identifier(s):
     '''It escapes the ````` (back-quote) in the identifier, `s`.'''
     return s.replace('`', '``')
 
+dialect = mosql.util.Dialect(
+    escape=fast_escape,
+    format_param=format_param,
+    delimit_identifier=delimit_identifier,
+    escape_identifier=escape_identifier,
+    upsert_style='on_duplicate_key_update',
+    drop_temporary_table='DROP TEMPORARY TABLE IF EXISTS %s',
+)
+'''The :class:`~mosql.util.Dialect` of MySQL.
+
+.. versionadded:: 0.13
+'''
+
 def patch():
     '''Applies the MySQL-specific functions again.
 
@@ -90,6 +113,8 @@ def patch():
     mosql.util.format_param = format_param
     mosql.util.delimit_identifier = delimit_identifier
     mosql.util.escape_identifier = escape_identifier
+    mosql.util.upsert_style = 'on_duplicate_key_update'
+    mosql.util.drop_temporary_table = 'DROP TEMPORARY TABLE IF EXISTS %s'
 
 patch() # patch it when load this module
 
@@ -6,10 +6,14 @@
 __all__ = [
     'insert', 'select', 'update', 'delete',
     'join', 'left_join', 'right_join', 'cross_join',
-    'replace'
+    'replace', 'bulk_insert', 'bulk_upsert'
 ]
 
+from itertools import chain
+
+import mosql.util
 from .util import Query
+from .compat import string_types
 from .stmt import insert, replace, select, update, delete, join
 
 insert = Query(insert, ('table', 'set'))
@@ -23,3 +27,205 @@ right_join = join.breed({'type': 'right'})
 cross_join = join.breed({'type': 'cross'})
 
 replace = Query(replace, ('table', 'set'))
+
+
+def _iter_chunks(pieces, prefix, suffix, max_rows, max_bytes, max_params):
+    '''It joins the (sql, params) `pieces` into chunks, and yields the SQL and
+    the params of each chunk. A chunk has one piece at least.'''
+
+    if max_bytes is not None:
+        empty_size = len(prefix.encode('utf-8')) + len(suffix.encode('utf-8'))
+
+    sqls = []
+    params = []
+    size = 0
+
+    for sql, piece_params in pieces:
+
+        if max_bytes is not None:
+            # the ', ' between pieces is 2 bytes
+            piece_size = len(sql.encode('utf-8')) + 2
+
+        if sqls and (
+            len(sqls) >= max_rows or
+            max_bytes is not None and size+piece_size > max_bytes or
+            max_params is not None and len(params)+len(piece_params) > max_params
+        ):
+            yield prefix + ', '.join(sqls) + suffix, params
+            sqls = []
+            params = []
+
+        if not sqls and max_bytes is not None:
+            size = empty_size - 2
+
+        sqls.append(sql)
+        params.extend(piece_params)
+        if max_bytes is not None:
+            size += piece_size
+
+    if sqls:
+        yield prefix + ', '.join(sqls) + suffix, params
+
+
+def bulk_insert(table, rows, columns=None, max_rows=1000, max_bytes=None,
+                max_params=None, parameterize=False, dialect=None,
+                **clause_args):
+    '''It yields the ``INSERT`` statements of the `rows` chunk by chunk.
+
+    :param table: the table
+    :param rows: any iterable of the tuples or dicts, including generators
+    :param columns: the columns, or the keys of the first row if it is a dict
+    :param max_rows: the maximum number of the rows in a statement
+    :param max_bytes: the maximum UTF-8 size of a statement
+    :param max_params: the maximum number of the values in a statement
+    :param parameterize: yield the SQL with the params if it is true
+    :param dialect: the :class:`~mosql.util.Dialect` to format
+    :param clause_args: the other clause args of :func:`insert`, such as
+                        `returning`
+
+    >>> for sql in bulk_insert('person', [('andy', 'Andy'), ('bob', 'Bob'), ('mosky', 'Mosky')], max_rows=2):
+    ...     print(sql)
+    INSERT INTO "person" VALUES ('andy', 'Andy'), ('bob', 'Bob')
+    INSERT INTO "person" VALUES ('mosky', 'Mosky')
+
+    The rows are consumed lazily, so the memory is bounded by a chunk. A row
+    larger than `max_bytes` is still yielded as a statement.
+
+    If `parameterize` is true, the values except :class:`~mosql.util.raw` are
+    put into the params in the positional style:
+
+    >>> rows = ({'person_id': i, 'name': 'P%d' % i} for i in range(3))
+    >>> chunks = bulk_insert('person', rows, columns=('person_id', 'name'), max_params=4, parameterize=True)
+    >>> sql, params = next(chunks)
+    >>> print(sql)
+    INSERT INTO "person" ("person_id", "name") VALUES (%s, %s), (%s, %s)
+    >>> params == [0, 'P0', 1, 'P1']
+    True
+
+    .. versionadded:: 0.13
+    '''
+
+    functions = mosql.util if dialect is None else dialect
+    value = functions.value
+    raw = mosql.util.raw
+
+    rows = iter(rows)
+    try:
+        first_row = next(rows)
+    except StopIteration:
+        return
+    rows = chain((first_row, ), rows)
+
+    if hasattr(first_row, 'keys'):
+        if columns is None:
+            columns = list(first_row.keys())
+        rows = ([row[column] for column in columns] for row in rows)
+
+    query = insert if dialect is None else insert.bind(dialect)
+    # the VALUES clause accepts a string as it is
+    prefix, _, suffix = query.format(dict(
+        clause_args, table=table, columns=columns, values=raw('\x00'),
+    )).partition('\x00')
+
+    if parameterize:
+        placeholder = functions.format_param()
+        bind_value = functions.bind_value
+        def render_row(row):
+            params = [bind_value(v) for v in row if not isinstance(v, raw)]
+            return '(%s)' % ', '.join(
+                v if isinstance(v, raw) else placeholder
+                for v in row
+            ), params
+    else:
+        def render_row(row):
+            return '(%s)' % ', '.join(value(row)), row
+
+    chunks = _iter_chunks(
+        (render_row(row) for row in rows), prefix, suffix,
+        max_rows, max_bytes, max_params
+    )
+
+    if parameterize:
+        for chunk in chunks:
+            yield chunk
+    else:
+        for sql, _ in chunks:
+            yield sql
+
+
+def bulk_upsert(table, rows, conflict_columns, update_columns=None,
+                columns=None, dialect=None, **kargs):
+    '''It yields the ``INSERT`` statements which update the conflicted rows
+    with the incoming values, chunk by chunk.
+
+    :param table: the table
+    :param rows: any iterable of the tuples or dicts, including generators
+    :param conflict_columns: the columns of the unique key
+    :param update_columns: the columns to update, or the columns except the
+                           `conflict_columns` if it is ``None``; if it is
+                           empty, the conflicted rows are left as they are
+    :param columns: the columns, or the keys of the first row if it is a dict
+    :param dialect: the :class:`~mosql.util.Dialect` to format
+    :param kargs: the other arguments of :func:`bulk_insert`, such as
+                  `max_rows` and `parameterize`
+
+    The form is decided by the :attr:`~mosql.util.upsert_style` of the
+    `dialect`:
+
+    >>> rows = [('andy', 'Andy'), ('bob', 'Bob')]
+    >>> for sql in bulk_upsert('person', rows, ['person_id'], columns=['person_id', 'name']):
+    ...     print(sql)
+    INSERT INTO "person" ("person_id", "name") VALUES ('andy', 'Andy'), ('bob', 'Bob') ON CONFLICT ("person_id") DO UPDATE SET "name"=EXCLUDED."name"
+
+    With :attr:`mosql.mysql.dialect`:
+
+    ::
+
+        INSERT INTO `person` (`person_id`, `name`) VALUES ('andy', 'Andy'), ('bob', 'Bob') ON DUPLICATE KEY UPDATE `name`=VALUES(`name`)
+
+    .. versionadded:: 0.13
+    '''
+
+    functions = mosql.util if dialect is None else dialect
+    identifier = functions.identifier
+    raw = mosql.util.raw
+
+    rows = iter(rows)
+    try:
+        first_row = next(rows)
+    except StopIteration:
+        return
+    rows = chain((first_row, ), rows)
+
+    if columns is None and hasattr(first_row, 'keys'):
+        columns = list(first_row.keys())
+
+    if isinstance(conflict_columns, string_types):
+        conflict_columns = (conflict_columns, )
+
+    if update_columns is None:
+        if columns is None:
+            raise ValueError('the columns are required to update the other columns')
+        update_columns = [c for c in columns if c not in conflict_columns]
+
+    style = functions.upsert_style
+    if style == 'on_conflict':
+        target = functions.paren(functions.concat_by_comma(identifier(conflict_columns)))
+        if update_columns:
+            kargs['on_conflict'] = raw('%s DO UPDATE SET %s' % (target, functions.build_set([
+                (c, raw('EXCLUDED.%s' % identifier(c)))
+                for c in update_columns
+            ])))
+        else:
+            kargs['on_conflict'] = raw('%s DO NOTHING' % target)
+    elif style == 'on_duplicate_key_update':
+        # assign a conflict column to itself to do nothing
+        kargs['on_duplicate_key_update'] = [
+            (c, raw('VALUES(%s)' % identifier(c)))
+            for c in update_columns
+        ] or [(c, raw(identifier(c))) for c in conflict_columns[:1]]
+    else:
+        raise ValueError('unknown upsert_style: %r' % style)
+
+    for chunk in bulk_insert(table, rows, columns=columns, dialect=dialect, **kargs):
+        yield chunk
@@ -16,6 +16,16 @@ If you want to patch again:
     mosql.sqlite.patch()
 
 It will replace the functions in :mod:`mosql.util` with its functions.
+
+If you want to build SQLite and other SQL at the same time, use the
+:attr:`dialect` instead of the patch:
+
+::
+
+    from mosql.sqlite import dialect
+    from mosql.query import select
+
+    select = select.bind(dialect)
 '''
 
 def format_param(s=''):
@@ -32,13 +42,31 @@ def stringify_bool(b):
 
 import mosql.util
 
+dialect = mosql.util.Dialect(
+    format_param=format_param,
+    stringify_bool=stringify_bool,
+    in_list_strategy='values',
+    drop_temporary_table='DROP TABLE IF EXISTS temp.%s',
+)
+'''The :class:`~mosql.util.Dialect` of SQLite. The large ``IN`` lists are
+built as ``x IN (VALUES ...)`` once the ``in_list_threshold`` is set.
+
+.. versionadded:: 0.13
+'''
+
 def patch():
     '''Applies the SQLite-specific functions again.
 
     .. versionadded:: 0.10
+
+    .. versionchanged:: 0.13
+        It also sets the ``'values'`` :attr:`~mosql.util.in_list_strategy`
+        and the :attr:`~mosql.util.drop_temporary_table`.
     '''
     mosql.util.format_param = format_param
     mosql.util.stringify_bool = stringify_bool
+    mosql.util.in_list_strategy = 'values'
+    mosql.util.drop_temporary_table = 'DROP TABLE IF EXISTS temp.%s'
 
 patch() # patch it when load this module
 
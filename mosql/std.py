@@ -22,6 +22,12 @@ It will replace the functions in :mod:`mosql.util` with original standard functi
 
 import mosql.util
 
+dialect = mosql.util.Dialect()
+'''The :class:`~mosql.util.Dialect` of the standard functions.
+
+.. versionadded:: 0.13
+'''
+
 def patch():
     '''Applies the standard functions again.'''
     mosql.util.escape = mosql.util.std_escape
@@ -29,5 +35,10 @@ def patch():
     mosql.util.delimit_identifier = mosql.util.std_delimit_identifier
     mosql.util.stringify_bool = mosql.util.std_stringify_bool
     mosql.util.escape_identifier = mosql.util.std_escape_identifier
+    mosql.util.in_list_threshold = mosql.util.std_in_list_threshold
+    mosql.util.in_list_strategy = mosql.util.std_in_list_strategy
+    mosql.util.in_list_chunk_size = mosql.util.std_in_list_chunk_size
+    mosql.util.upsert_style = mosql.util.std_upsert_style
+    mosql.util.drop_temporary_table = mosql.util.std_drop_temporary_table
 
 patch() # patch it when load this module
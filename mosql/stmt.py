@@ -5,7 +5,7 @@
 
 from .util import Statement
 from .clause import returning, where
-from .clause import insert, columns, values, on_duplicate_key_update, replace
+from .clause import insert, columns, values, on_conflict, on_duplicate_key_update, replace
 from .clause import select, from_, joins, group_by, having, order_by, limit, offset
 from .clause import for_, of, nowait
 from .clause import for_update, lock_in_share_mode
@@ -28,7 +28,7 @@ def insert_preprocessor(clause_args):
         else:
             clause_args['columns'] = clause_args['values'] = tuple()
 
-insert = Statement([insert, columns, values, returning, on_duplicate_key_update], preprocessor=insert_preprocessor)
+insert = Statement([insert, columns, values, on_conflict, returning, on_duplicate_key_update], preprocessor=insert_preprocessor)
 
 def select_preprocessor(clause_args):
 
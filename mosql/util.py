@@ -40,6 +40,15 @@ into SQL strings:
     identifier_dir
     paren
 
+The :func:`value` formats by the adapters of the types:
+
+.. autosummary::
+    ValueAdapters
+    value_adapters
+    register_adapter
+    unregister_adapter
+    bind_value
+
 The functions which are :func:`joiner` functions concatenate the SQL strings:
 
 .. autosummary::
@@ -70,6 +79,14 @@ The main classes let you combine the bricks above to create a final SQL builder:
     Clause
     Statement
     Query
+    Dialect
+    Fragment
+
+The registry of the rendering metrics:
+
+.. autosummary::
+    MetricsRegistry
+    metrics
 
 .. versionchanged:: 0.1.6
     It is rewritten and totally different from old version.
@@ -82,22 +99,43 @@ __all__ = [
     'delimit_identifier', 'escape_identifier',
     'raw', 'param', 'default', '___', 'star', 'autoparam',
     'qualifier', 'paren', 'value',
+    'ValueAdapters', 'value_adapters', 'register_adapter', 'unregister_adapter',
+    'bind_value',
     'DirectionError', 'allowed_directions',
     'identifier', 'identifier_as', 'identifier_dir',
     'joiner',
     'concat_by_comma', 'concat_by_and', 'concat_by_space', 'concat_by_or',
     'OperatorError', 'allowed_operators',
+    'in_list_threshold', 'in_list_strategy', 'in_list_chunk_size',
+    'upsert_style', 'drop_temporary_table',
     'build_values_list', 'build_where', 'build_set', 'build_on',
     'or_', 'and_', 'dot', 'as_', 'asc', 'desc', 'subq', 'in_operand',
-    'Clause', 'Statement', 'Query'
+    'Clause', 'Statement', 'Query', 'Dialect', 'Fragment',
+    'MetricsRegistry', 'metrics',
 ]
 
 import sys
+import json
+import binascii
+import threading
+from abc import ABCMeta
+from inspect import getmro
+from decimal import Decimal
+from uuid import UUID
+from collections import namedtuple, OrderedDict, deque
+from copy import copy
+from types import FunctionType
 from datetime import datetime, date, time
 from functools import wraps
+from timeit import default_timer
 
 from . import compat
 
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
 def warning(s):
     print('Warning: {}'.format(s), file=sys.stderr)
 
@@ -262,6 +300,351 @@ ___ = autoparam = object()
 '''A special token that is converted to a parameter automatically by
 :func:`value` in a prepared statement.'''
 
+class Fragment(object):
+    '''A lazy SQL fragment made by :meth:`Query.fragment`. It is rendered at
+    the first :func:`str`, and then the SQL is memoized.
+
+    >>> from mosql.query import select, left_join
+    >>> detail = left_join.fragment('detail', using='person_id')
+    >>> print(select('person', joins=detail))
+    SELECT * FROM "person" LEFT JOIN "detail" USING ("person_id")
+
+    It is embedded as it is by :class:`Clause` and :func:`concat_by_space`,
+    and as a subquery in parens by :func:`value`:
+
+    >>> ids = select.fragment('detail', {'key': 'email'}, select='person_id')
+    >>> print(select('person', {'person_id in': ids}))
+    SELECT * FROM "person" WHERE "person_id" IN (SELECT "person_id" FROM "detail" WHERE "key" = 'email')
+
+    A parameterized :class:`Query` puts the values of the fragments into its
+    params in the order of the placeholders.
+
+    .. versionadded:: 0.13
+    '''
+
+    __slots__ = ('query', 'clause_args', '_sql', '_slotted')
+
+    def __init__(self, query, clause_args):
+        self.query = query
+        self.clause_args = clause_args
+        self._sql = None
+        self._slotted = None
+
+    @property
+    def sql(self):
+        '''The SQL with the values.
+
+        :rtype: :class:`raw`
+        '''
+        sql = self._sql
+        if sql is None:
+            query = self.query
+            if query._param_style is not None:
+                query = query.breed({})
+                query._param_style = None
+            sql = self._sql = raw(query.format(self.clause_args))
+        return sql
+
+    def _slot(self, values):
+        # the slots in the fragment follow the ones in values
+
+        slotted = self._slotted
+        if slotted is None:
+            slotted = self._slotted = self.query._slot_fragment(self.clause_args)
+        shape, template, fragment_values = slotted
+
+        offset = len(values)
+        values.extend(fragment_values)
+        return shape, raw(template.render([
+            '\x00%d\x00' % (offset + i) for i in range(len(fragment_values))
+        ]))
+
+    def __unicode__(self):
+        return self.sql
+
+    if compat.PY2:
+        def __str__(self):
+            return self.sql.encode('utf-8')
+    else:
+        __str__ = __unicode__
+
+    def __repr__(self):
+        return 'Fragment(%r, %r)' % (self.query, self.clause_args)
+
+# caches
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+class _LRUCache(object):
+    '''A bounded mapping which evicts the least recently used item.
+
+    It is thread-safe enough for caching: the racing threads may compute the
+    same item twice, but never break the mapping.
+    '''
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        try:
+            item = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        try:
+            if compat.PY2:
+                self._data[key] = self._data.pop(key)
+            else:
+                self._data.move_to_end(key)
+        except KeyError:
+            # evicted by another thread
+            pass
+        return item
+
+    def set(self, key, item):
+        with self._lock:
+            self._data[key] = item
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+# metrics
+
+class _Metric(object):
+    '''The rendering metric of a name. The percentiles come from the recent
+    samples.'''
+
+    def __init__(self, samples_size):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=samples_size)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.seconds = 0.0
+            self.sql_length = 0
+            self.max_sql_length = 0
+            self._samples.clear()
+
+    def observe(self, seconds, sql_length):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.sql_length += sql_length
+            if sql_length > self.max_sql_length:
+                self.max_sql_length = sql_length
+            self._samples.append(seconds)
+
+    def to_dict(self):
+
+        with self._lock:
+            count = self.count
+            seconds = self.seconds
+            sql_length = self.sql_length
+            max_sql_length = self.max_sql_length
+            samples = sorted(self._samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return OrderedDict([
+            ('count', count),
+            ('seconds', seconds),
+            ('mean_seconds', seconds / count if count else 0.0),
+            ('p50_seconds', percentile(0.5)),
+            ('p90_seconds', percentile(0.9)),
+            ('p99_seconds', percentile(0.99)),
+            ('sql_length', sql_length),
+            ('mean_sql_length', sql_length / float(count) if count else 0.0),
+            ('max_sql_length', max_sql_length),
+        ])
+
+class MetricsRegistry(object):
+    '''It collects the rendering metrics of the :class:`Query` and
+    :class:`Statement` instances which enable the metrics.
+
+    :param samples_size: the number of the recent samples of a name to
+                         calculate the percentiles
+    :type samples_size: int
+
+    >>> from mosql.query import select
+    >>> registry = MetricsRegistry()
+    >>> select.enable_metrics(registry=registry)
+    >>> sql = select('person')
+    >>> select.disable_metrics()
+    >>> registry.snapshot()['select']['count']
+    1
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, samples_size=1024):
+        self.samples_size = samples_size
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        '''It returns the metric of the `name`, and creates it if it doesn't
+        exist.'''
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = _Metric(self.samples_size)
+        return metric
+
+    def snapshot(self):
+        '''It returns the metrics by name in a dict.
+
+        The keys of a metric are `count`, `seconds`, `mean_seconds`,
+        `p50_seconds`, `p90_seconds`, `p99_seconds`, `sql_length`,
+        `mean_sql_length` and `max_sql_length`.
+        '''
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return OrderedDict((name, metric.to_dict()) for name, metric in metrics)
+
+    to_dict = snapshot
+
+    def reset(self):
+        '''It resets all the metrics to zero.'''
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def to_prometheus(self, prefix='mosql_render'):
+        '''It exports the metrics in the Prometheus text format.
+
+        :rtype: str
+        '''
+
+        snapshot = self.snapshot()
+        lines = []
+
+        def add(suffix, type_, help_, samples):
+            name = prefix + suffix
+            lines.append('# HELP %s %s' % (name, help_))
+            lines.append('# TYPE %s %s' % (name, type_))
+            for labels, x in samples:
+                lines.append('%s{%s} %r' % (name, labels, x))
+
+        def label(name, **extra):
+            pairs = [('query', name)] + sorted(extra.items())
+            return ','.join(
+                '%s="%s"' % (k, compat.text_type(v).replace('\\', '\\\\').replace('"', '\\"'))
+                for k, v in pairs
+            )
+
+        items = list(snapshot.items())
+
+        add('_seconds', 'summary', 'The time to render the SQL.', [
+            (label(name, quantile=q), m[key])
+            for name, m in items
+            for q, key in (('0.5', 'p50_seconds'), ('0.9', 'p90_seconds'), ('0.99', 'p99_seconds'))
+        ])
+        lines.extend(
+            '%s_seconds_sum{%s} %r' % (prefix, label(name), m['seconds'])
+            for name, m in items
+        )
+        lines.extend(
+            '%s_seconds_count{%s} %d' % (prefix, label(name), m['count'])
+            for name, m in items
+        )
+        add('_sql_length_total', 'counter', 'The total length of the rendered SQL.', [
+            (label(name), m['sql_length']) for name, m in items
+        ])
+        add('_sql_length_max', 'gauge', 'The maximum length of the rendered SQL.', [
+            (label(name), m['max_sql_length']) for name, m in items
+        ])
+
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+'''The default :class:`MetricsRegistry`.
+
+.. versionadded:: 0.13
+'''
+
+identifier_cache_size = 1024
+'''The number of the identifiers memoized by each of :func:`identifier`,
+:func:`identifier_as` and :func:`identifier_dir`. It takes effect on the
+functions created after changing it.
+
+.. versionadded:: 0.13
+'''
+
+def _memoize(f):
+    '''A decorator which memoizes a qualifier function of identifier in a
+    bounded LRU cache.
+
+    The cache is keyed by the input and the active :func:`delimit_identifier`
+    and :func:`escape_identifier`, so it follows the patches, such as
+    :func:`mosql.mysql.patch`, automatically.
+    '''
+
+    # the globals of f, i.e., this module, unless f is made for a dialect
+    g = f.__globals__
+
+    if compat.lru_cache:
+        cached = compat.lru_cache(identifier_cache_size)(
+            lambda s, delimit_identifier, escape_identifier: f(s)
+        )
+        cache_info = cached.cache_info
+        cache_clear = cached.cache_clear
+    else:
+        cache = _LRUCache(identifier_cache_size)
+        def cached(s, delimit_identifier, escape_identifier):
+            key = (s, delimit_identifier, escape_identifier)
+            result = cache.get(key)
+            if result is None:
+                result = f(s)
+                cache.set(key, result)
+            return result
+        cache_info = cache.info
+        cache_clear = cache.clear
+
+    @wraps(f)
+    def memoize_wrapper(s):
+        # the subclasses, such as param, aren't memoized
+        if s.__class__ is compat.text_type:
+            return cached(s, g['delimit_identifier'], g['escape_identifier'])
+        return f(s)
+
+    # for Dialect to remake it
+    memoize_wrapper.__wrapped__ = f
+    memoize_wrapper._decorator = _memoize
+
+    memoize_wrapper.cache_info = cache_info
+    memoize_wrapper.cache_clear = cache_clear
+
+    return memoize_wrapper
+
 # qualifier functions
 
 if compat.PY2:
@@ -286,7 +669,23 @@ if compat.PY2:
             else:
                 return f(_coerce_str(x))
 
+        qualifier_wrapper.__wrapped__ = f
+        qualifier_wrapper._decorator = _qualifier
+
         return qualifier_wrapper
+
+    def _qualify_join(f, sep):
+        def qualify_join(x):
+            if isinstance(x, raw):
+                return x
+            elif _is_iterable_not_str(x):
+                return sep.join([
+                    item if isinstance(item, raw) else f(_coerce_str(item))
+                    for item in x
+                ])
+            else:
+                return f(_coerce_str(x))
+        return qualify_join
 else:
     def _is_iterable_not_str(x):
         return not isinstance(x, (str, bytes,)) and hasattr(x, '__iter__')
@@ -304,8 +703,28 @@ else:
             else:
                 return f(x)
 
+        qualifier_wrapper.__wrapped__ = f
+        qualifier_wrapper._decorator = _qualifier
+
         return qualifier_wrapper
 
+    def _qualify_join(f, sep):
+        def qualify_join(x):
+            if isinstance(x, raw):
+                return x
+            elif _is_iterable_not_str(x):
+                return sep.join([
+                    item if isinstance(item, raw) else f(item)
+                    for item in x
+                ])
+            else:
+                return f(x)
+        return qualify_join
+
+def _is_value_seq(x):
+    # a dict is a JSON value rather than the values
+    return _is_iterable_not_str(x) and not isinstance(x, dict)
+
 qualifier = _qualifier
 '''A decorator which makes all items in an `iterable` apply a qualifier
 function, `f`, or simply apply the qualifier function to the input if the input
@@ -317,7 +736,221 @@ It also makes a qualifier function returns the input without changes if the
 input is an instance of :class:`raw`.
 '''
 
-@qualifier
+# value adapters
+
+def _adapt_null(x):
+    return 'NULL'
+
+def _adapt_raw(x):
+    return x
+
+def _adapt_param(x):
+    return format_param(x)
+
+def _adapt_str(x):
+    return "'%s'" % escape(x)
+
+def _adapt_quoted(x):
+    return "'%s'" % x
+
+def _adapt_bool(x):
+    return stringify_bool(x)
+
+def _adapt_int(x):
+    # '%d' also works for the subclasses, such as IntEnum
+    return '%d' % x
+
+def _adapt_float(x):
+    return float.__repr__(x)
+
+def _adapt_text(x):
+    return compat.text_type(x)
+
+def _adapt_bytes(x):
+    return "X'%s'" % binascii.hexlify(x).decode('ascii')
+
+def _adapt_json(x):
+    return "'%s'" % escape(json.dumps(x))
+
+def _adapt_fragment(x):
+    return '(%s)' % x.sql
+
+def _adapt_items(x):
+    # the items are formatted as scalars, as the qualifier functions do
+    return [
+        item if isinstance(item, raw) else _adapt_scalar(item)
+        for item in x
+    ]
+
+def _adapt_scalar(x):
+    adapter = value_adapters.lookup(type(x))
+    if adapter is _adapt_items:
+        return compat.text_type(x)
+    return adapter(x)
+
+if compat.PY2:
+    def _adapt_binary_str(x):
+        return _adapt_str(x.decode('utf-8'))
+
+class ValueAdapters(object):
+    '''The registry of the functions which format the Python objects as SQL
+    values for :func:`value`.
+
+    An object is formatted by the adapter of its exact type. If there is no
+    such adapter, the adapter of the nearest base class in the MRO is used, and
+    then the abstract classes, such as :class:`collections.abc.Iterable`, in
+    the order of registering. The result is cached by the type.
+
+    The built-in adapters:
+
+    ==================================== ======================================
+    type                                 SQL
+    ==================================== ======================================
+    ``None``                             ``NULL``
+    :class:`raw`                         as is
+    :class:`param`                       :func:`format_param`
+    :class:`str`                         quoted by :func:`escape`
+    :class:`bool`                        :func:`stringify_bool`
+    :class:`int`, :class:`float`         the number
+    :class:`~decimal.Decimal`            the number
+    datetime, date, time                 quoted ISO format
+    :class:`~uuid.UUID`                  quoted
+    :class:`bytes`, :class:`bytearray`   ``X'hex'`` (Python 3)
+    :class:`dict`                        quoted JSON
+    the other iterables                  the items in a list
+    the others                           ``str(x)``
+    ==================================== ======================================
+
+    A parameterized :class:`Query` passes the values to the driver by
+    :func:`bind_value`, so the ones formatted as JSON are passed as the JSON
+    strings.
+
+    Register an adapter:
+
+    >>> from fractions import Fraction
+    >>> register_adapter(Fraction, lambda x: '%s' % float(x))
+    >>> print(value(Fraction(1, 4)))
+    0.25
+    >>> unregister_adapter(Fraction)
+
+    Every :class:`Dialect` has its own copy of the registry which is made when
+    the dialect is created. Register the adapters of a dialect by its
+    ``register_adapter``.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, adapters=(), abstract_adapters=()):
+        self._adapters = dict(adapters)
+        self._abstract_adapters = OrderedDict(abstract_adapters)
+        self._cache = {}
+
+    def register(self, cls, adapter):
+        '''It registers the `adapter` for the class `cls`. If the `cls` is an
+        abstract class, it also matches the classes registered to it.'''
+        if isinstance(cls, ABCMeta):
+            self._abstract_adapters[cls] = adapter
+        else:
+            self._adapters[cls] = adapter
+        self._cache = {}
+
+    def unregister(self, cls):
+        '''It removes the adapter of the class `cls`.'''
+        self._adapters.pop(cls, None)
+        self._abstract_adapters.pop(cls, None)
+        self._cache = {}
+
+    def lookup(self, cls):
+        '''It returns the adapter for the class `cls`.'''
+
+        adapter = self._cache.get(cls)
+        if adapter is not None:
+            return adapter
+
+        adapters = self._adapters
+
+        for base in getmro(cls):
+            if base is not object and base in adapters:
+                adapter = adapters[base]
+                break
+        else:
+            for abstract, abstract_adapter in self._abstract_adapters.items():
+                if issubclass(cls, abstract):
+                    adapter = abstract_adapter
+                    break
+            else:
+                adapter = adapters[object]
+
+        self._cache[cls] = adapter
+        return adapter
+
+    def copy(self, mapper=None):
+        '''It returns a copy of this registry. The adapters are passed to the
+        `mapper` if it is given.'''
+        if mapper is None:
+            mapper = lambda f: f
+        return ValueAdapters(
+            ((cls, mapper(f)) for cls, f in self._adapters.items()),
+            ((cls, mapper(f)) for cls, f in self._abstract_adapters.items()),
+        )
+
+value_adapters = ValueAdapters([
+    (type(None), _adapt_null),
+    (raw, _adapt_raw),
+    (param, _adapt_param),
+    (Fragment, _adapt_fragment),
+    (compat.text_type, _adapt_str),
+    (bool, _adapt_bool),
+    (float, _adapt_float),
+    (Decimal, _adapt_text),
+    (datetime, _adapt_quoted),
+    (date, _adapt_quoted),
+    (time, _adapt_quoted),
+    (UUID, _adapt_quoted),
+    (dict, _adapt_json),
+    (object, _adapt_text),
+] + [
+    (int_type, _adapt_int) for int_type in compat.integer_types
+] + (
+    [(str, _adapt_binary_str), (bytearray, _adapt_bytes)] if compat.PY2 else
+    [(bytes, _adapt_bytes), (bytearray, _adapt_bytes)]
+), [
+    (Iterable, _adapt_items),
+])
+'''The :class:`ValueAdapters` used by :func:`value`.
+
+.. versionadded:: 0.13
+'''
+
+def register_adapter(cls, adapter):
+    '''It registers the `adapter` for the class `cls` into
+    :attr:`value_adapters`. See :class:`ValueAdapters`.
+
+    .. versionadded:: 0.13
+    '''
+    value_adapters.register(cls, adapter)
+
+def unregister_adapter(cls):
+    '''It removes the adapter of the class `cls` from :attr:`value_adapters`.
+
+    .. versionadded:: 0.13
+    '''
+    value_adapters.unregister(cls)
+
+def bind_value(x):
+    '''It converts `x` into the param passed to the driver. The values
+    formatted as JSON by the :attr:`value_adapters` are converted into the JSON
+    strings, and the others are returned as they are.
+
+    >>> print(bind_value({'a': 1}))
+    {"a": 1}
+
+    .. versionadded:: 0.13
+    '''
+    if value_adapters.lookup(type(x)) is _adapt_json:
+        return json.dumps(x)
+    return x
+
 def value(x):
     '''A qualifier function which formats Python object as SQL value.
 
@@ -344,24 +977,25 @@ def value(x):
 
     >>> print(value(param('myparam')))
     %(myparam)s
+
+    >>> print(value(Decimal('1.10')))
+    1.10
+
+    >>> print(value({'tags': ['sql']}))
+    '{"tags": ["sql"]}'
+
+    .. versionchanged:: 0.13
+        It dispatches by the type with :attr:`value_adapters`. The
+        :class:`~decimal.Decimal`, :class:`~uuid.UUID`, bytes and dict are
+        formatted properly, and a dict is a JSON value rather than an
+        iterable.
     '''
 
-    # 1. raw and 2. param are subclasses of str, so the two types must be
-    # first than str.
-
-    if x is None:
-        return 'NULL'
-    elif isinstance(x, param):
-        return format_param(x)
-    elif isinstance(x, compat.string_types):
-        return "'%s'" % escape(x)
-    elif isinstance(x, (datetime, date, time)):
-        return "'%s'" % x
-    elif isinstance(x, bool):
-        return stringify_bool(x)
-    else:
-        # TODO: int goes here, but it will be better to handle explicitly
-        return compat.text_type(x)
+    adapters = value_adapters
+    adapter = adapters._cache.get(type(x))
+    if adapter is None:
+        adapter = adapters.lookup(type(x))
+    return adapter(x)
 
 class DirectionError(Exception):
     '''The instance of it will be raised when :func:`identifier` detects an
@@ -385,10 +1019,106 @@ A :exc:`DirectionError` will be raised if a direction not allowed is found.
     It's not disableable anymore. Use :class:`raw` instead.
 '''
 
+in_list_threshold = None
+'''The ``IN`` lists which have more items than it are built by the
+:attr:`in_list_strategy`. ``None`` means always to build ``x IN (...)``.
+
+.. versionadded:: 0.13
+'''
+
+in_list_strategy = 'chunk'
+'''The way to build a large ``IN`` list:
+
+- ``'chunk'`` -- ``(x IN (...) OR x IN (...))``, each one has at most
+  :attr:`in_list_chunk_size` items
+- ``'any'`` -- ``x = ANY(ARRAY[...])`` of PostgreSQL; a parameterized
+  :class:`Query` passes the whole list as one array param: ``x = ANY(%s)``
+- ``'values'`` -- ``x IN (VALUES (...), (...))``
+
+``NOT IN`` is built as ``AND`` of the chunks, or ``x <> ALL(...)``.
+
+Override them in a :class:`Dialect`::
+
+    pg = Dialect(in_list_threshold=1000, in_list_strategy='any')
+
+.. seealso ::
+    Stage the values into a temporary table by
+    :func:`mosql.db.stage_values`, and use it as a subquery.
+
+.. versionadded:: 0.13
+'''
+
+in_list_chunk_size = 1000
+'''The size of the chunks of the ``'chunk'`` :attr:`in_list_strategy`.
+
+.. versionadded:: 0.13
+'''
+
+upsert_style = 'on_conflict'
+'''The way :func:`mosql.query.bulk_upsert` updates the conflicted rows:
+
+- ``'on_conflict'`` -- ``ON CONFLICT (...) DO UPDATE SET x=EXCLUDED.x`` of
+  PostgreSQL and SQLite
+- ``'on_duplicate_key_update'`` -- ``ON DUPLICATE KEY UPDATE x=VALUES(x)`` of
+  MySQL
+
+.. versionadded:: 0.13
+'''
+
+drop_temporary_table = 'DROP TABLE IF EXISTS pg_temp.%s'
+'''The statement which drops a temporary table by :func:`mosql.db.stage_values`.
+The ``%s`` is the table name. It drops the temporary table only, never the
+permanent table of the same name:
+
+- ``'DROP TABLE IF EXISTS pg_temp.%s'`` -- PostgreSQL
+- ``'DROP TEMPORARY TABLE IF EXISTS %s'`` -- MySQL
+- ``'DROP TABLE IF EXISTS temp.%s'`` -- SQLite
+
+.. versionadded:: 0.13
+'''
+
+std_in_list_threshold = in_list_threshold
+std_in_list_strategy = in_list_strategy
+std_in_list_chunk_size = in_list_chunk_size
+std_upsert_style = upsert_style
+std_drop_temporary_table = drop_temporary_table
+
+def _build_in_list(k, op, v, value_qualifier):
+
+    if isinstance(v, _array_slot):
+        return '%s %s(%s)' % (k, '= ANY' if op == 'IN' else '<> ALL', v)
+
+    items = list(value_qualifier(v))
+
+    if in_list_strategy == 'chunk':
+        size = in_list_chunk_size
+        return paren((' OR ' if op == 'IN' else ' AND ').join(
+            '%s %s %s' % (k, op, paren(concat_by_comma(items[i:i+size])))
+            for i in range(0, len(items), size)
+        ))
+    elif in_list_strategy == 'any':
+        return '%s %s(ARRAY[%s])' % (
+            k, '= ANY' if op == 'IN' else '<> ALL', concat_by_comma(items)
+        )
+    elif in_list_strategy == 'values':
+        return '%s %s (VALUES %s)' % (
+            k, op, concat_by_comma('(%s)' % item for item in items)
+        )
+    else:
+        raise ValueError('unknown in_list_strategy: %r' % in_list_strategy)
+
+def _is_large_in_list(v):
+    return (
+        in_list_threshold is not None
+        and isinstance(v, (tuple, list, set, frozenset))
+        and len(v) > in_list_threshold
+    )
+
 def _is_pair(x):
     return _is_iterable_not_str(x) and len(x) == 2
 
 @qualifier
+@_memoize
 def identifier(s):
     '''A qualifier function which formats Python object as SQL identifier.
 
@@ -413,6 +1143,9 @@ def identifier(s):
         It doesn't support ``AS`` and order directon anymore. Use
         :func:`identifier_as` or :func:`identifier_dir` instead.
 
+    .. versionchanged:: 0.13
+        The results of strings are memoized. See :attr:`identifier_cache_size`.
+
     .. seealso ::
         There is also a :func:`dot` function.
     '''
@@ -437,6 +1170,7 @@ def identifier(s):
         )
 
 @qualifier
+@_memoize
 def identifier_as(s):
     '''A qualifier function which formats Python object as SQL identifiers with
     ``AS``.
@@ -468,6 +1202,9 @@ def identifier_as(s):
         There is also an :func:`as_` function.
 
     .. versionadded:: 0.10
+
+    .. versionchanged:: 0.13
+        The results of strings are memoized.
     '''
 
     # i: identifier part
@@ -492,6 +1229,7 @@ def identifier_as(s):
         )
 
 @qualifier
+@_memoize
 def identifier_dir(s):
     '''A qualifier function which formats Python object as SQL identifiers with
     order direction.
@@ -523,6 +1261,9 @@ def identifier_dir(s):
         There are also :func:`asc` and :func:`desc` functions.
 
     .. versionadded:: 0.10
+
+    .. versionchanged:: 0.13
+        The results of strings are memoized.
     '''
 
     # i: identifier part
@@ -566,6 +1307,9 @@ def joiner(f):
         else:
             return x
 
+    joiner_wrapper.__wrapped__ = f
+    joiner_wrapper._decorator = joiner
+
     return joiner_wrapper
 
 @joiner
@@ -580,8 +1324,12 @@ def concat_by_or(i):
 
 @joiner
 def concat_by_space(i):
-    '''A joiner function which concats the iterable by a space.'''
-    return ' '.join(i)
+    '''A joiner function which concats the iterable by a space.
+
+    .. versionchanged:: 0.13
+        It accepts :class:`Fragment`.
+    '''
+    return ' '.join([x.sql if isinstance(x, Fragment) else x for x in i])
 
 @joiner
 def concat_by_comma(i):
@@ -670,7 +1418,7 @@ def _build_condition(x, key_qualifier=identifier, value_qualifier=value):
 
             if not op:
                 # decide op automatically
-                if _is_iterable_not_str(v):
+                if _is_value_seq(v) or isinstance(v, _array_slot):
                     op = 'IN'
                 elif v is None:
                     op = 'IS'
@@ -691,6 +1439,12 @@ def _build_condition(x, key_qualifier=identifier, value_qualifier=value):
         # qualify the k
         k = key_qualifier(k)
 
+        if (op == 'IN' or op == 'NOT IN') and (
+            isinstance(v, _array_slot) or _is_large_in_list(v)
+        ):
+            pieces.append(_build_in_list(k, op, v, value_qualifier))
+            continue
+
         # qualify the v
         v = value_qualifier(v)
         if _is_iterable_not_str(v):
@@ -927,6 +1681,71 @@ def in_operand(x):
 
 # NOTE: To keep simple, the below classes shouldn't rely on the above functions
 
+# the fused formatters of Clause
+
+def _is_decorated_by(f, decorator):
+    # compare the code to recognise the copies made by Dialect
+    d = getattr(f, '__dict__', {}).get('_decorator')
+    return getattr(d, '__code__', None) is decorator.__code__
+
+_separators = dict(
+    (f.__wrapped__.__code__, sep)
+    for f, sep in (
+        (concat_by_and, ' AND '),
+        (concat_by_or, ' OR '),
+        (concat_by_space, ' '),
+        (concat_by_comma, ', '),
+    )
+)
+
+def _separator(f):
+    if _is_decorated_by(f, joiner):
+        return _separators.get(f.__wrapped__.__code__)
+
+def _fuse(formatters):
+    '''It fuses the `formatters` into a function which does the same as
+    applying them one by one and joining the result if it is an iterable.
+
+    A qualifier followed by a ``concat_by_*`` joiner becomes one function
+    which qualifies and joins in a pass without the intermediate list.
+    '''
+
+    steps = []
+    formatters = list(formatters)
+    while formatters:
+        f = formatters.pop(0)
+        sep = _separator(formatters[0]) if formatters else None
+        if sep is not None and _is_decorated_by(f, _qualifier):
+            formatters.pop(0)
+            f = _qualify_join(f.__wrapped__, sep)
+            f._joined = True
+        steps.append(f)
+
+    # a joiner always returns a string for an iterable
+    last = steps[-1] if steps else None
+    if last is not None and (
+        getattr(last, '_joined', False) or _is_decorated_by(last, joiner)
+    ):
+        if len(steps) == 1:
+            return last
+        elif len(steps) == 2:
+            f, g = steps
+            return lambda x: g(f(x))
+        elif len(steps) == 3:
+            f, g, h = steps
+            return lambda x: h(g(f(x)))
+
+    steps = tuple(steps)
+
+    def fused(x):
+        for f in steps:
+            x = f(x)
+        if _is_iterable_not_str(x):
+            x = ''.join(x)
+        return x
+
+    return fused
+
 class Clause(object):
     '''It represents a clause of SQL.
 
@@ -956,6 +1775,12 @@ class Clause(object):
     >>> print(values.format((raw('r'), 'b', 'c')))
     VALUES (r, 'b', 'c')
 
+    The `formatters` are fused into one function when they are set, so a
+    clause formats without walking the chain at every call.
+
+    .. versionchanged:: 0.13
+        The `formatters` are fused, and `x` can be a :class:`Fragment`.
+
     .. versionchanged:: 0.9
         Added `no_argument` and made `formatters` has default.
 
@@ -984,6 +1809,15 @@ class Clause(object):
         if lower_name != underscore_lower_name:
             self.possibles.append(lower_name)
 
+    @property
+    def formatters(self):
+        return self._formatters
+
+    @formatters.setter
+    def formatters(self, formatters):
+        self._formatters = formatters
+        self._fused = _fuse(formatters)
+
     def format(self, x):
         '''Apply `x` to this clause template.
 
@@ -993,11 +1827,10 @@ class Clause(object):
         if self.no_argument and x:
             return self.prefix
 
-        for formatter in self.formatters:
-            x = formatter(x)
+        if isinstance(x, Fragment):
+            x = x.sql
 
-        if _is_iterable_not_str(x):
-            x = ''.join(x)
+        x = self._fused(x)
 
         if self.hidden:
             return '%s' % x
@@ -1030,6 +1863,13 @@ class Statement(object):
     ... }))
     INSERT INTO "person" ("person_id", "name") VALUES ('daniel', 'Diane Leonard')
 
+    The statement is compiled when it is created. The clause args are looked
+    up in an index of the names of the clauses rather than trying every
+    name at every call.
+
+    .. versionchanged:: 0.13
+        It is compiled.
+
     .. versionchanged:: 0.6
         Added `preprocessor`.
     '''
@@ -1037,6 +1877,24 @@ class Statement(object):
     def __init__(self, clauses, preprocessor=None):
         self.clauses = clauses
         self.preprocessor = preprocessor
+        self._compile()
+
+    def _compile(self):
+
+        # the name -> the position of the clause; the first one wins, just
+        # like the order of the possibles
+        index = {}
+        for i, clause in enumerate(self.clauses):
+            for possible in clause.possibles:
+                index.setdefault(possible, i)
+
+        self._index = index
+        self._formats = tuple(clause.format for clause in self.clauses)
+        self._defaults = tuple(
+            (i, clause.default)
+            for i, clause in enumerate(self.clauses)
+            if clause.default
+        )
 
     def format(self, clause_args):
         '''Apply the `clause_args` to each clauses.
@@ -1054,50 +1912,431 @@ class Statement(object):
             ignore that argument.
         '''
 
+        # the preprocessor changes the clause_args
         if self.preprocessor:
             clause_args = clause_args.copy()
+
+        return self._format_owned(clause_args)
+
+    def _format_owned(self, clause_args):
+        # it is same as format, but the clause_args are changed in place
+
+        metric = self._metric
+        if metric is not None:
+            started_at = default_timer()
+
+        if self.preprocessor:
             self.preprocessor(clause_args)
 
+        sql = self._format(clause_args)
+
+        if metric is not None:
+            metric.observe(default_timer() - started_at, len(sql))
+
+        return sql
+
+    _metric = None
+
+    def enable_metrics(self, name, registry=None):
+        '''Enables the rendering metrics of :meth:`format`, and collects them
+        into the `registry` as `name`. The :class:`Query` instances of this
+        statement, including the cached, parameterized and dialect-bound
+        ones, are measured too.
+
+        :param registry: the registry, or ``None`` for :attr:`metrics`
+        :type registry: :class:`MetricsRegistry`
+
+        .. versionadded:: 0.13
+        '''
+        self._metric = (registry or metrics).get(name)
+
+    def disable_metrics(self):
+        '''Disables the rendering metrics.
+
+        .. versionadded:: 0.13'''
+        self._metric = None
+
+    def _format(self, clause_args):
+
+        index = self._index
+
+        # position -> arg
+        args = {}
         # it is for checking unused clause args
         # e.g., select(wehere={})
-        # ca: clause_args
-        unused_ca_count = len(clause_args)
+        unused = None
+
+        for k, arg in clause_args.items():
+            i = index.get(k)
+            # the other name of a found clause is also unused
+            if i is None or i in args:
+                if unused is None:
+                    unused = []
+                unused.append(k)
+            else:
+                args[i] = arg
+
+        if unused:
+            raise TypeError('unused clause args: {}'.format(', '.join(unused)))
+
+        # if not found and have default, use default
+        for i, default in self._defaults:
+            if args.get(i) is None:
+                args[i] = default
+
+        # if not found or len(arg) == 0
+        formats = self._formats
+        return ' '.join([
+            formats[i](args[i])
+            for i in sorted(args)
+            if args[i]
+        ])
+
+    def __repr__(self):
+        return 'Statement(%r)' % self.clauses
 
-        pieces = []
-        for clause in self.clauses:
+# the template cache of Query
 
-            # find the arg for this clause
-            arg = None
+class _Unshapable(Exception):
+    '''The clause args can't be reduced to a shape, so render them directly.'''
+
+class _slot(raw):
+    '''It marks where a value will be spliced into a template.'''
+
+class _array_slot(_slot):
+    '''It marks where a whole large ``IN`` list will be passed as one array
+    param.'''
+
+# the tags used in shapes
+_SEQ = object()
+_MAP = object()
+_SCALAR = object()
+_ARRAY = object()
+_FRAGMENT = object()
+
+# the kinds of clause args
+_FROZEN = 0
+_VALUE = 1
+_PAIRS = 2
+_VALUES = 3
+_SET = 4
+
+def _freeze(x):
+    '''It makes `x` a hashable shape which is equal only to the shapes of the
+    objects rendered in the same way.'''
+
+    if x.__class__ is compat.text_type:
+        return x
+    elif isinstance(x, (tuple, list)):
+        return (_SEQ, ) + tuple(_freeze(i) for i in x)
+    elif isinstance(x, dict):
+        return (_MAP, ) + tuple((_freeze(k), _freeze(v)) for k, v in x.items())
+    elif _is_iterable_not_str(x) or x.__class__.__hash__ is None:
+        raise _Unshapable()
+    else:
+        # 1, 1.0 and True are equal, but rendered differently
+        return (x.__class__, x)
+
+def _slot_scalar(x, values):
+
+    if isinstance(x, Fragment):
+        shape, sql = x._slot(values)
+        return shape, raw('(%s)' % sql)
+    elif x is None or x is autoparam or isinstance(x, raw) or isinstance(x, param):
+        return _freeze(x), x
+    elif _is_value_seq(x):
+        raise _Unshapable()
+    else:
+        values.append(x)
+        return _SCALAR, _slot('\x00%d\x00' % (len(values)-1))
+
+def _slot_value(x, values):
+
+    if not _is_value_seq(x):
+        return _slot_scalar(x, values)
+    elif isinstance(x, (tuple, list, set, frozenset)):
+        shapes = [_SEQ]
+        items = []
+        for item in x:
+            shape, item = _slot_scalar(item, values)
+            shapes.append(shape)
+            items.append(item)
+        return tuple(shapes), items
+    else:
+        raise _Unshapable()
+
+def _slot_frozen(x, values):
+
+    if isinstance(x, Fragment):
+        return x._slot(values)
+    elif isinstance(x, (tuple, list)) and any(isinstance(i, Fragment) for i in x):
+        shapes = [_SEQ]
+        items = []
+        for item in x:
+            shape, item = _slot_frozen(item, values)
+            shapes.append(shape)
+            items.append(item)
+        return tuple(shapes), items
+    else:
+        return _freeze(x), x
+
+def _param_name(k):
+    # the name of an autoparam, as _build_condition does
+    if isinstance(k, raw):
+        return k
+    elif _is_pair(k):
+        return k[0]
+    else:
+        return k.partition(' ')[0]
+
+def _slot_params(x, names):
+    '''It replaces the :attr:`autoparam` and :class:`param` values of the
+    pairs in `x` with slots, and appends the names to `names`.'''
+
+    if isinstance(x, compat.string_types):
+        return x
+
+    pairs = []
+    for k, v in _to_pairs(x):
+        if v is autoparam:
+            names.append(_param_name(k))
+        elif isinstance(v, param):
+            names.append(v)
+        else:
+            pairs.append((k, v))
+            continue
+        pairs.append((k, _slot('\x00%d\x00' % (len(names)-1))))
+
+    return pairs
+
+def _is_array_item(x):
+    return not (
+        x is None or x is autoparam or isinstance(x, raw) or isinstance(x, param)
+        or isinstance(x, Fragment) or _is_value_seq(x)
+    )
+
+def _slot_array(x, values):
+    values.append(list(x))
+    return _ARRAY, _array_slot('\x00%d\x00' % (len(values)-1))
+
+def _slot_pairs(x, values, arrays=False, sets=False):
+
+    if isinstance(x, compat.string_types):
+        return _freeze(x), x
+
+    if isinstance(x, dict):
+        pairs = x.items()
+    elif isinstance(x, (tuple, list)):
+        pairs = x
+    else:
+        raise _Unshapable()
+
+    shapes = [_MAP]
+    items = []
+    for pair in pairs:
+        if not isinstance(pair, (tuple, list)) or len(pair) != 2:
+            raise _Unshapable()
+        k, v = pair
+        if arrays and sets and isinstance(v, (tuple, list)):
+            # a sequence to set, such as an array column, is one param
+            shape, v = _slot_array(v, values)
+        elif (
+            arrays and in_list_strategy == 'any' and _is_large_in_list(v)
+            and all(_is_array_item(item) for item in v)
+        ):
+            shape, v = _slot_array(v, values)
+        else:
+            shape, v = _slot_value(v, values)
+        shapes.append((_freeze(k), shape))
+        items.append((k, v))
+    return tuple(shapes), items
+
+def _slot_row(row, values, arrays):
+
+    if not arrays:
+        return _slot_value(row, values)
+
+    # a sequence in a row, such as an array column, is one param
+    shapes = [_SEQ]
+    items = []
+    for item in row:
+        if isinstance(item, (tuple, list)):
+            shape, item = _slot_array(item, values)
+        else:
+            shape, item = _slot_scalar(item, values)
+        shapes.append(shape)
+        items.append(item)
+    return tuple(shapes), items
+
+def _slot_values_list(x, values, arrays=False):
+
+    if isinstance(x, compat.string_types):
+        return _freeze(x), x
+
+    if not isinstance(x, (tuple, list)) or not x:
+        raise _Unshapable()
+
+    if not _is_iterable_not_str(x[0]):
+        return _slot_row(x, values, arrays)
+
+    shapes = [_SEQ]
+    rows = []
+    for row in x:
+        if not isinstance(row, (tuple, list)):
+            raise _Unshapable()
+        shape, row = _slot_row(row, values, arrays)
+        shapes.append(shape)
+        rows.append(row)
+    return tuple(shapes), rows
+
+def _arg_kinds(statement):
+
+    kinds = statement.__dict__.get('_arg_kinds')
+
+    if kinds is None:
+        kinds = {}
+        for clause in statement.clauses:
+            formatters = clause.formatters
+            if build_set in formatters:
+                kind = _SET
+            elif build_where in formatters:
+                kind = _PAIRS
+            elif build_values_list in formatters:
+                kind = _VALUES
+            elif value in formatters:
+                kind = _VALUE
+            else:
+                kind = _FROZEN
             for possible in clause.possibles:
-                if possible in clause_args:
-                    arg = clause_args[possible]
-                    unused_ca_count -= 1
-                    break
+                kinds[possible] = kind
+        statement._arg_kinds = kinds
 
-            # if not found and have default, use default
-            if arg is None and clause.default:
-                arg = clause.default
+    return kinds
 
-            # if not found or len(arg) == 0
-            if arg:
-                pieces.append(clause.format(arg))
+_slotters = {
+    _VALUE: _slot_value,
+}
 
-        if unused_ca_count:
-            all_possibles = set(
-                p
-                for clause in self.clauses
-                for p in clause.possibles
-            )
-            raise TypeError('unused clause args: {}'.format(', '.join(
-                k
-                for k in clause_args
-                if k not in all_possibles
-            )))
+def _shape(statement, clause_args, arrays=False):
+    '''It replaces the values in the preprocessed `clause_args` with slots.
 
-        return ' '.join(pieces)
+    The args which can't be recognised are left as they are, and then the
+    shape is ``None``. If `arrays` is true, the large ``IN`` lists of the
+    ``'any'`` :attr:`in_list_strategy` and the sequences to set or insert are
+    slotted as single values.
 
-    def __repr__(self):
-        return 'Statement(%r)' % self.clauses
+    :rtype: the shape, the slotted clause args and the values
+    '''
+
+    kinds = _arg_kinds(statement)
+
+    values = []
+    shapes = []
+    slotted = {}
+    shapable = True
+
+    for k, v in clause_args.items():
+        kind = kinds.get(k)
+        slotter = _slotters.get(kind)
+        count = len(values)
+        try:
+            # the false args are skipped by Statement
+            if not v:
+                shape = _freeze(v)
+            elif kind == _PAIRS or kind == _SET:
+                # call it by the name to use the settings of the dialect
+                shape, v = _slot_pairs(v, values, arrays, kind == _SET)
+            elif kind == _VALUES:
+                shape, v = _slot_values_list(v, values, arrays)
+            elif slotter is None:
+                shape, v = _slot_frozen(v, values)
+            else:
+                shape, v = slotter(v, values)
+        except _Unshapable:
+            del values[count:]
+            shapable = False
+            shape = None
+        shapes.append((k, shape))
+        slotted[k] = v
+
+    if not shapable:
+        return None, slotted, values
+
+    return tuple(shapes), slotted, values
+
+class _Template(object):
+    '''The SQL rendered from slotted clause args.'''
+
+    __slots__ = ('literals', 'order', 'positional_sql', 'named_sql')
+
+    def __init__(self, literals, order):
+        self.literals = literals
+        self.order = order
+        self.positional_sql = None
+        self.named_sql = None
+
+    @classmethod
+    def parse(cls, sql, slot_count):
+        '''It returns ``None`` if the slots in the `sql` are ambiguous.'''
+
+        parts = sql.split('\x00')
+        literals = parts[0::2]
+        try:
+            order = [int(i) for i in parts[1::2]]
+        except ValueError:
+            return None
+
+        if len(parts) % 2 == 0 or sorted(order) != list(range(slot_count)):
+            return None
+
+        return cls(literals, order)
+
+    def render(self, pieces):
+        literals = self.literals
+        sql = [literals[0]]
+        for i, literal in zip(self.order, literals[1:]):
+            sql.append(pieces[i])
+            sql.append(literal)
+        return ''.join(sql)
+
+    def render_params(self, values, format_param, named=False):
+        '''It returns the SQL with placeholders and the params.
+
+        The positional params are in the order of the placeholders. The named
+        params are named as ``p0``, ``p1``, ... in the same order.
+        '''
+
+        order = self.order
+
+        if named:
+            names = ['p%d' % i for i in range(len(order))]
+            sql = self.named_sql
+            if sql is None:
+                pieces = [None] * len(order)
+                for i, name in zip(order, names):
+                    pieces[i] = format_param(name)
+                sql = self.named_sql = self.render(pieces)
+            return sql, dict((name, values[i]) for i, name in zip(order, names))
+
+        sql = self.positional_sql
+        if sql is None:
+            sql = self.positional_sql = self.render([format_param()] * len(order))
+        return sql, tuple(values[i] for i in order)
+
+def _dialect_key():
+    return (
+        escape, format_param, stringify_bool, delimit_identifier, escape_identifier,
+        in_list_threshold, in_list_strategy, in_list_chunk_size,
+    )
+
+def _merge_args(default, update):
+    if not update:
+        return default.copy()
+    elif not default:
+        return update.copy()
+    merged = default.copy()
+    merged.update(update)
+    return merged
 
 def _merge_dicts(default, *updates):
     result = default.copy()
@@ -1114,17 +2353,23 @@ class Query(object):
     :type positional_keys: sequence
     :param clause_args: the arguments of the clauses you want to predefine
     :type clause_args: dict
+    :param dialect: the dialect to format, or ``None`` to use the functions of
+                    this module
+    :type dialect: :class:`Dialect`
 
     You can use a :class:`Query` instance like a function:
 
     >>> from mosql.query import insert
     >>> print(insert)
-    insert(table=None, set=None, *, insert_into=None, columns=None, values=None, returning=None, on_duplicate_key_update=None)
+    insert(table=None, set=None, *, insert_into=None, columns=None, values=None, on_conflict=None, returning=None, on_duplicate_key_update=None)
 
     .. versionadded:: 0.6
+
+    .. versionchanged:: 0.13
+        Added `dialect`.
     '''
 
-    def __init__(self, statement, positional_keys=None, clause_args=None):
+    def __init__(self, statement, positional_keys=None, clause_args=None, dialect=None):
 
         self.statement = statement
         self.positional_keys = positional_keys
@@ -1134,20 +2379,357 @@ class Query(object):
         else:
             self.clause_args = clause_args
 
+        self.dialect = dialect
+        if dialect is None:
+            self._statement = statement
+            self._namespace = globals()
+        else:
+            self._statement = dialect.bind(statement)
+            self._namespace = dialect.namespace
+
+        self._templates = None
+        self._param_style = None
+        self._metric = None
+
     def breed(self, clause_args=None):
         '''It merges the `clause_args` from both this instance and the argument,
-        and then create new :class:`Query` instance by that.'''
-        return Query(
+        and then create new :class:`Query` instance by that.
+
+        .. versionchanged:: 0.13
+            The new instance shares the template cache, the param mode and the
+            metrics with this instance.
+        '''
+        query = Query(
             self.statement,
             self.positional_keys,
-            _merge_dicts(self.clause_args, clause_args)
+            _merge_dicts(self.clause_args, clause_args),
+            self.dialect
         )
+        query._templates = self._templates
+        query._param_style = self._param_style
+        query._metric = self._metric
+        return query
+
+    def bind(self, dialect):
+        '''It creates new :class:`Query` instance which formats with the
+        `dialect`.
+
+        >>> from mosql.query import select
+        >>> bracket = Dialect(delimit_identifier=lambda s: '[%s]' % s)
+        >>> print(select.bind(bracket)('person', {'name': 'Mosky'}))
+        SELECT * FROM [person] WHERE [name] = 'Mosky'
+        >>> print(select('person', {'name': 'Mosky'}))
+        SELECT * FROM "person" WHERE "name" = 'Mosky'
+
+        .. seealso ::
+            The built-in dialects --- :attr:`mosql.std.dialect`,
+            :attr:`mosql.mysql.dialect` and :attr:`mosql.sqlite.dialect`.
+
+        .. versionadded:: 0.13
+        '''
+        query = Query(
+            self.statement,
+            self.positional_keys,
+            _merge_dicts(self.clause_args),
+            dialect
+        )
+        query._templates = self._templates
+        query._param_style = self._param_style
+        query._metric = self._metric
+        return query
+
+    def parameterize(self, named=False):
+        '''It creates new :class:`Query` instance which puts the values into
+        params rather than the SQL, and returns the SQL with the params.
+
+        Every value formatted by :func:`value`, including the values in
+        :func:`build_where`, :func:`build_set` and :func:`build_values_list`,
+        becomes a placeholder built by :func:`format_param`:
+
+        >>> from mosql.query import select
+        >>> select_p = select.parameterize()
+        >>> sql, params = select_p('person', {'person_id': ('andy', 'bob')}, limit=10)
+        >>> print(sql)
+        SELECT * FROM "person" WHERE "person_id" IN (%s, %s) LIMIT %s
+        >>> params == ('andy', 'bob', 10)
+        True
+
+        If `named` is true, the params are a dict and named as ``p0``, ``p1``,
+        ..., so it requires a :func:`format_param` which supports names:
+
+        >>> sql, params = select_p.parameterize(named=True)('person', {'person_id': 'mosky'})
+        >>> print(sql)
+        SELECT * FROM "person" WHERE "person_id" = %(p0)s
+        >>> params == {'p0': 'mosky'}
+        True
+
+        A list or tuple to set or insert, such as the value of an array column,
+        is passed as one param:
+
+        >>> from mosql.query import update
+        >>> sql, params = update.parameterize()('person', {'person_id': 'mosky'}, {'tags': ['a', 'b']})
+        >>> print(sql)
+        UPDATE "person" SET "tags"=%s WHERE "person_id" = %s
+        >>> params == (['a', 'b'], 'mosky')
+        True
+
+        The ``NULL``, the :class:`raw` and the :class:`param` values are still
+        in the SQL, so don't mix :class:`param` with the positional params. The
+        values which can't be recognised, such as the values in a generator,
+        are also formatted into the SQL as usual.
+
+        The same shape of the clause args always renders the same SQL, so it
+        works well with the statement caches of both the database and the
+        driver. It also works with :meth:`enable_cache`.
+
+        .. versionadded:: 0.13
+        '''
+        query = self.breed({})
+        query._param_style = 'named' if named else 'positional'
+        return query
+
+    def fragment(self, *positional_values, **clause_args):
+        '''It is same as the :meth:`stringify`, but it returns a lazy
+        :class:`Fragment` which is rendered when it is used.
+
+        >>> from mosql.query import select
+        >>> ids = select.fragment('detail', select='person_id')
+        >>> select_p = select.parameterize()
+        >>> sql, params = select_p('person', {'person_id in': ids, 'age >': 20})
+        >>> print(sql)
+        SELECT * FROM "person" WHERE "person_id" IN (SELECT "person_id" FROM "detail") AND "age" > %s
+
+        :rtype: :class:`Fragment`
+
+        .. versionadded:: 0.13
+        '''
+
+        if self.positional_keys and positional_values:
+            for k, v in zip(self.positional_keys, positional_values):
+                clause_args.setdefault(k, v)
+
+        return Fragment(self, clause_args)
+
+    def prepare(self, *positional_values, **clause_args):
+        '''It renders the SQL once with the placeholders for the
+        :attr:`autoparam` and :class:`param` values in the pairs, such as the
+        `where` and the `set`, and returns the names of them in the order of
+        the placeholders.
+
+        >>> from mosql.query import update
+        >>> sql, names = update.prepare('person', {'person_id': ___}, {'name': ___})
+        >>> print(sql)
+        UPDATE "person" SET "name"=%s WHERE "person_id" = %s
+        >>> print(', '.join(names))
+        name, person_id
+
+        The placeholders are positional, so the params of a row are the values
+        picked by the names. It is what :func:`mosql.db.executemany` uses.
+
+        :rtype: the SQL and the names in tuple
+
+        .. versionadded:: 0.13
+        '''
+
+        if self.positional_keys and positional_values:
+            for k, v in zip(self.positional_keys, positional_values):
+                clause_args.setdefault(k, v)
+
+        clause_args = _merge_args(self.clause_args, clause_args)
+        statement = self._statement
+        ns = self._namespace
+
+        # the set of insert is also pairs before it is preprocessed
+        kinds = ns['_arg_kinds'](statement)
+        names = []
+        for k, v in list(clause_args.items()):
+            if v and (k == 'set' or kinds.get(k) in (_PAIRS, _SET)):
+                clause_args[k] = _slot_params(v, names)
+
+        template = _Template.parse(statement.format(clause_args), len(names))
+        if not template:
+            raise ValueError('unable to prepare the params: %r' % names)
+
+        return template.render_params(names, ns['format_param'])
+
+    def _slot_fragment(self, clause_args):
+        '''It returns the shape, the template and the values of a fragment.'''
+
+        statement = self._statement
+        ns = self._namespace
+
+        clause_args = _merge_args(self.clause_args, clause_args)
+        if statement.preprocessor:
+            statement.preprocessor(clause_args)
+
+        shape, slotted, values = ns['_shape'](statement, clause_args)
+        if shape is None:
+            raise _Unshapable()
+
+        templates = self._templates
+        key = (ns['_dialect_key'](), shape)
+        template = templates.get(key) if templates is not None else None
+        if template is None:
+            template = _Template.parse(statement._format(slotted), len(values))
+            if templates is not None:
+                templates.set(key, template or False)
+        if not template:
+            raise _Unshapable()
+
+        return (_FRAGMENT, statement, key), template, values
 
     def format(self, clause_args=None):
         '''It merges the `clause_args` from both this instance and the
-        arguments, and then apply to the statement.'''
-        clause_args = _merge_dicts(self.clause_args, clause_args)
-        return self.statement.format(clause_args)
+        arguments, and then apply to the statement.
+
+        .. versionchanged:: 0.13
+            It returns the SQL with the params if it is parameterized. See
+            :meth:`parameterize`.
+        '''
+        metric = self._metric
+        # the metric of the statement, which the dialect-bound copies share
+        statement_metric = self.statement._metric
+        if metric is not None or statement_metric is not None:
+            started_at = default_timer()
+
+        # it is the only copy of the clause args in a call; the statement
+        # preprocesses it in place
+        clause_args = _merge_args(self.clause_args, clause_args)
+        if self._templates is None and self._param_style is None:
+            statement = self._statement
+            if statement.preprocessor:
+                statement.preprocessor(clause_args)
+            sql = statement._format(clause_args)
+        else:
+            sql = self._format_by_template(clause_args)
+
+        if metric is not None or statement_metric is not None:
+            seconds = default_timer() - started_at
+            sql_length = len(sql[0] if self._param_style else sql)
+            if metric is not None:
+                metric.observe(seconds, sql_length)
+            if statement_metric is not None:
+                statement_metric.observe(seconds, sql_length)
+
+        return sql
+
+    def _format_by_template(self, clause_args):
+
+        statement = self._statement
+        templates = self._templates
+        param_style = self._param_style
+        ns = self._namespace
+
+        # the clause_args here is already a copy
+        if statement.preprocessor:
+            statement.preprocessor(clause_args)
+
+        shape, slotted, values = ns['_shape'](
+            statement, clause_args, arrays=param_style is not None
+        )
+
+        if shape is None:
+            if templates is not None:
+                templates.misses += 1
+            if param_style is None:
+                return statement._format(clause_args)
+            template = _Template.parse(statement._format(slotted), len(values))
+        elif templates is None:
+            template = _Template.parse(statement._format(slotted), len(values))
+        else:
+            key = (ns['_dialect_key'](), shape)
+            template = templates.get(key)
+            if template is None:
+                template = _Template.parse(statement._format(slotted), len(values))
+                # remember the ambiguous shape as False to skip parsing next time
+                templates.set(key, template or False)
+
+        if not template:
+            if param_style is None:
+                return statement._format(clause_args)
+            raise ValueError('unable to parameterize the values: %r' % values)
+
+        if param_style is None:
+            value = ns['value']
+            return template.render([value(v) for v in values])
+
+        bind_value = ns['bind_value']
+        return template.render_params(
+            [bind_value(v) for v in values],
+            ns['format_param'], param_style == 'named'
+        )
+
+    def enable_cache(self, maxsize=128):
+        '''Enables the template cache.
+
+        The cache recognises the shape of the clause args --- the table, the
+        columns, the keys and operators of the conditions, the number of the
+        values, and so on. The identifiers and operators of a shape are
+        rendered only once, and then only the values are formatted and spliced
+        into the cached template.
+
+        >>> from mosql.query import select
+        >>> person = select.breed({'table': 'person'})
+        >>> person.enable_cache()
+        >>> print(person(where={'person_id': 'mosky'}))
+        SELECT * FROM "person" WHERE "person_id" = 'mosky'
+        >>> print(person(where={'person_id': 'andy'}))
+        SELECT * FROM "person" WHERE "person_id" = 'andy'
+        >>> person.cache_info()
+        CacheInfo(hits=1, misses=1, maxsize=128, currsize=1)
+
+        The instances bred from this instance share the same cache. The
+        args which can't be recognised, such as generators, are formatted as
+        usual and counted as misses.
+
+        :param maxsize: the maximum number of the cached shapes, or ``None``
+                        for unbounded
+        :type maxsize: int
+
+        .. versionadded:: 0.13
+        '''
+        self._templates = _LRUCache(maxsize)
+
+    def disable_cache(self):
+        '''Disables the template cache.
+
+        .. versionadded:: 0.13'''
+        self._templates = None
+
+    def cache_info(self):
+        '''It returns the hits, misses, maxsize and currsize of the template
+        cache in a named tuple, or ``None`` if the cache is disabled.
+
+        .. versionadded:: 0.13'''
+        if self._templates is None:
+            return None
+        return self._templates.info()
+
+    def enable_metrics(self, name=None, registry=None):
+        '''Enables the rendering metrics, which are the calls, the time and the
+        length of the SQL, and collects them into the `registry` as `name`.
+
+        :param name: the name, or ``None`` for the name of the statement, such
+                     as ``select``
+        :type name: str
+        :param registry: the registry, or ``None`` for :attr:`metrics`
+        :type registry: :class:`MetricsRegistry`
+
+        The instances bred from this instance share the same metrics. It works
+        with :meth:`enable_echo`. When it is disabled, the overhead is only a
+        check.
+
+        .. versionadded:: 0.13
+        '''
+        if name is None:
+            name = self.statement.clauses[0].prefix.partition(' ')[0].lower()
+        self._metric = (registry or metrics).get(name)
+
+    def disable_metrics(self):
+        '''Disables the rendering metrics.
+
+        .. versionadded:: 0.13'''
+        self._metric = None
 
     def stringify(self, *positional_values, **clause_args):
         '''It is same as the :meth:`format`, but the parameters are more like a
@@ -1186,7 +2768,7 @@ class Query(object):
 
     def _format_n_echo(self, clause_args=None):
         sql = self._format(clause_args)
-        echo(sql)
+        echo(sql[0] if self._param_style else sql)
         return sql
 
     def enable_echo(self):
@@ -1201,6 +2783,133 @@ class Query(object):
         .. versionadded:: 0.10'''
         self.format = self._format
 
+# dialect
+
+_core_names = (
+    'escape', 'format_param', 'stringify_bool',
+    'delimit_identifier', 'escape_identifier',
+)
+
+_setting_names = (
+    'in_list_threshold', 'in_list_strategy', 'in_list_chunk_size',
+    'upsert_style', 'drop_temporary_table',
+)
+
+class Dialect(object):
+    '''It bundles the core functions of a SQL spec.
+
+    :param functions: the functions to replace the standard ones, such as
+                      :func:`escape` or :func:`delimit_identifier`
+
+    The functions of this module, such as :func:`value`, :func:`identifier` and
+    :func:`build_where`, always use the core functions of this module, which
+    are replaced by the patches. A :class:`Dialect` makes its own copies of
+    them, which are resolved to its core functions once, so the SQLs of
+    different specs can be built at the same time:
+
+    >>> bracket = Dialect(delimit_identifier=lambda s: '[%s]' % s)
+    >>> print(bracket.identifier('person.name'))
+    [person].[name]
+    >>> print(identifier('person.name'))
+    "person"."name"
+
+    The functions not specified are the standard ones, no matter which patch is
+    applied.
+
+    Bind it to a :class:`Query` by :meth:`Query.bind`, or to a
+    :class:`mosql.db.Database` by its `dialect`.
+
+    .. versionadded:: 0.13
+    '''
+
+    def __init__(self, **functions):
+
+        module_namespace = globals()
+
+        namespace = dict(module_namespace)
+        for name in _core_names + _setting_names:
+            namespace[name] = module_namespace['std_'+name]
+
+        for name, f in functions.items():
+            if name.startswith('_') or name not in namespace:
+                raise TypeError('unknown function: %s' % name)
+            namespace[name] = f
+
+        self.namespace = namespace
+        self._clones = {}
+        self._statements = {}
+
+        for name, f in module_namespace.items():
+            if name not in functions and self._is_clonable(f):
+                namespace[name] = self._clone(f)
+
+        namespace['value_adapters'] = value_adapters.copy(
+            lambda f: self._clone(f) if self._is_clonable(f) else f
+        )
+
+    @staticmethod
+    def _is_clonable(f):
+        return (
+            isinstance(f, FunctionType) and
+            f.__module__ == __name__ and
+            f.__name__ not in _core_names
+        )
+
+    def _clone(self, f):
+
+        clone = self._clones.get(f)
+        if clone is not None:
+            return clone
+
+        decorator = f.__dict__.get('_decorator')
+        if decorator:
+            clone = decorator(self._clone(f.__wrapped__))
+        else:
+            defaults = f.__defaults__
+            if defaults:
+                defaults = tuple(
+                    self._clone(d) if self._is_clonable(d) else d
+                    for d in defaults
+                )
+            clone = FunctionType(f.__code__, self.namespace, f.__name__, defaults, f.__closure__)
+            clone.__doc__ = f.__doc__
+            clone.__dict__.update(f.__dict__)
+
+        self._clones[f] = clone
+        return clone
+
+    def resolve(self, formatters):
+        '''It replaces the functions of this module in `formatters` with the
+        copies of this dialect.
+
+        :rtype: tuple
+        '''
+        clones = self._clones
+        return tuple(clones.get(f, f) for f in formatters)
+
+    def bind(self, statement):
+        '''It creates a :class:`Statement` which formats with this dialect.
+        The statements created are cached.'''
+
+        bound = self._statements.get(statement)
+
+        if bound is None:
+            clauses = []
+            for clause in statement.clauses:
+                clause = copy(clause)
+                clause.formatters = self.resolve(clause.formatters)
+                clauses.append(clause)
+            bound = Statement(clauses, statement.preprocessor)
+            self._statements[statement] = bound
+
+        return bound
+
+    def __getattr__(self, name):
+        namespace = self.__dict__.get('namespace')
+        if namespace is None or name.startswith('_') or name not in namespace:
+            raise AttributeError(name)
+        return namespace[name]
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -7,6 +7,9 @@ def delimit_identifier(s):
 
 import mosql.util
 
+dialect = mosql.util.Dialect(delimit_identifier=delimit_identifier)
+'''The :class:`~mosql.util.Dialect` of YQL.'''
+
 def patch():
     '''Applies the YQL-specific functions again.'''
     mosql.util.delimit_identifier = delimit_identifier
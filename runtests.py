@@ -14,6 +14,9 @@ sphinxtests = SphinxDoctest()
 
 if __name__ == '__main__':
     argv = [__file__, '--with-sphinx', '--exclude-dir=oldtests']
+    # mosql.asyncdb needs Python 3.6+
+    if sys.version_info < (3, 6):
+        argv.append('--exclude=asyncdb')
     ok = nose.run(argv=argv, plugins=[exclude, sphinxtests])
     if not ok:
         sys.exit(1)
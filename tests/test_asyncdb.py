@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import sqlite3
+import asyncio
+import tempfile
+
+from nose.tools import eq_, assert_raises
+
+from mosql.asyncdb import AsyncDatabase, one_to_dict, all_to_dicts, group
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def make_db():
+
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+
+    conn = sqlite3.connect(path)
+    conn.execute('create table person (id, email)')
+    conn.executemany('insert into person values (?, ?)', [
+        ('alice', 'alice@gmail.com'),
+        ('mosky', 'mosky.tw@gmail.com'),
+        ('mosky', 'mosky.liu@pinkoi.com'),
+    ])
+    conn.commit()
+    conn.close()
+
+    return path, AsyncDatabase(sqlite3, path, max_workers=2)
+
+
+def test_async_with_and_for():
+
+    path, db = make_db()
+
+    async def main():
+        async with db as cur:
+            await cur.execute('select * from person order by id, email')
+            return [row async for row in cur]
+
+    try:
+        eq_(run(main()), [
+            ('alice', 'alice@gmail.com'),
+            ('mosky', 'mosky.liu@pinkoi.com'),
+            ('mosky', 'mosky.tw@gmail.com'),
+        ])
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def test_async_nested_and_rollback():
+
+    path, db = make_db()
+
+    async def main():
+
+        async with db as cur1:
+            async with db as cur2:
+                eq_(cur1.connection, cur2.connection)
+
+        with assert_raises(ZeroDivisionError):
+            async with db as cur:
+                await cur.execute("delete from person")
+                1/0
+
+        async with db as cur:
+            await cur.execute('select count(*) from person')
+            return (await cur.fetchone())[0]
+
+    try:
+        eq_(run(main()), 3)
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def test_async_many_tasks():
+
+    path, db = make_db()
+
+    async def count():
+        async with db as cur:
+            await cur.execute('select count(*) from person')
+            return (await cur.fetchone())[0]
+
+    async def main():
+        return await asyncio.gather(*[count() for _ in range(20)])
+
+    try:
+        eq_(run(main()), [3]*20)
+        eq_(len(db._task_states), 0)
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def test_async_helpers():
+
+    path, db = make_db()
+
+    async def main():
+
+        async with db as cur:
+            await cur.execute("select * from person where id = 'alice'")
+            one = await one_to_dict(cur)
+
+        async with db as cur:
+            await cur.execute('select * from person order by id, email')
+            dicts = await all_to_dicts(cur)
+
+        async with db as cur:
+            await cur.execute('select * from person order by id, email')
+            groups = [row async for row in group(['id'], cur)]
+
+        return one, dicts, groups
+
+    try:
+        one, dicts, groups = run(main())
+    finally:
+        db.close()
+        os.remove(path)
+
+    eq_(one, {'id': 'alice', 'email': 'alice@gmail.com'})
+    eq_(len(dicts), 3)
+    eq_(dicts[0], one)
+    eq_(groups, [
+        ('alice', ['alice@gmail.com']),
+        ('mosky', ['mosky.liu@pinkoi.com', 'mosky.tw@gmail.com']),
+    ])
+
+
+def test_async_bind():
+
+    from mosql.query import select
+    from mosql.mysql import dialect as mysql
+    import mosql.std
+    mosql.std.patch()
+
+    db = AsyncDatabase(sqlite3, ':memory:')
+    try:
+        eq_(db.bind(select)('t'), 'SELECT * FROM "t"')
+        # the query bound before keeps its dialect
+        eq_(db.bind(select.bind(mysql))('t'), 'SELECT * FROM `t`')
+    finally:
+        db.close()
+
+
+def test_async_release_when_task_done():
+
+    path, db = make_db()
+
+    put = []
+    putconn = db.putconn
+
+    def counting_putconn(conn):
+        put.append(conn)
+        return putconn(conn)
+
+    db.putconn = counting_putconn
+
+    async def leave():
+        # the task is done without __aexit__
+        await db.__aenter__()
+
+    async def cancelled(entered):
+        async with db:
+            entered.set_result(None)
+            await asyncio.sleep(60)
+
+    async def main():
+        await asyncio.ensure_future(leave())
+        entered = asyncio.get_event_loop().create_future()
+        task = asyncio.ensure_future(cancelled(entered))
+        await entered
+        task.cancel()
+        with assert_raises(asyncio.CancelledError):
+            await task
+        # let the done callbacks run
+        await asyncio.sleep(0.1)
+
+    try:
+        run(main())
+        eq_(len(put), 2)
+        eq_(db._task_states, {})
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def test_async_no_task():
+
+    db = AsyncDatabase(sqlite3, ':memory:')
+    errors = []
+
+    def callback():
+        try:
+            db._get_state()
+        except RuntimeError as e:
+            errors.append(e)
+
+    async def main():
+        asyncio.get_event_loop().call_soon(callback)
+        await asyncio.sleep(0)
+
+    try:
+        run(main())
+        eq_(len(errors), 1)
+    finally:
+        db.close()
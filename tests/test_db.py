@@ -0,0 +1,819 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import sqlite3
+from array import array
+import threading
+from time import sleep
+from functools import partial
+
+from nose.tools import eq_, assert_raises, assert_true
+
+from mosql.db import Database, Pool, PoolTimeoutError, iter_rows, iter_dicts, group, Row, make_index, one_to_dict, all_to_dicts, to_columns, external_sort, fingerprint, TimingStats, stage_values
+
+
+connect = partial(sqlite3.connect, ':memory:', check_same_thread=False)
+
+
+def test_pool_reuse():
+
+    pool = Pool(connect, maxsize=2)
+
+    db = Database()
+    db.getconn = pool.getconn
+    db.putconn = pool.putconn
+
+    with db as cur:
+        cur.execute('select 1')
+        conn = cur.connection
+
+    with db as cur:
+        eq_(cur.connection, conn)
+
+    stats = pool.stats()
+    eq_(stats['checkouts'], 2)
+    eq_(stats['created'], 1)
+    eq_(stats['size'], 1)
+    eq_(stats['idle'], 1)
+
+
+def test_pool_min_idle():
+
+    pool = Pool(connect, maxsize=3, min_idle=2)
+    eq_(pool.stats()['created'], 2)
+    eq_(pool.stats()['idle'], 2)
+
+
+def test_pool_timeout():
+
+    pool = Pool(connect, maxsize=1, timeout=0.05)
+
+    conn = pool.getconn()
+    with assert_raises(PoolTimeoutError):
+        pool.getconn()
+
+    stats = pool.stats()
+    eq_(stats['waits'], 1)
+    eq_(stats['timeouts'], 1)
+    assert_true(stats['wait_time'] >= 0.05)
+
+    pool.putconn(conn)
+    eq_(pool.getconn(), conn)
+
+
+def test_pool_blocking():
+
+    pool = Pool(connect, maxsize=1, timeout=5)
+    conn = pool.getconn()
+
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.getconn()))
+    t.start()
+    sleep(0.05)
+    pool.putconn(conn)
+    t.join()
+
+    eq_(got, [conn])
+    eq_(pool.stats()['waits'], 1)
+
+
+def test_pool_threads():
+
+    pool = Pool(connect, maxsize=4, timeout=5)
+
+    db = Database()
+    db.getconn = pool.getconn
+    db.putconn = pool.putconn
+
+    def work():
+        for _ in range(20):
+            with db as cur:
+                cur.execute('select 1')
+
+    threads = [threading.Thread(target=work) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = pool.stats()
+    eq_(stats['checkouts'], 16*20)
+    assert_true(stats['created'] <= 4)
+
+
+def test_pool_idle_eviction():
+
+    pool = Pool(connect, maxsize=3, min_idle=1, max_idle_time=0.01)
+
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    sleep(0.02)
+
+    # the oldest idle connections are evicted, but min_idle is kept
+    eq_(pool.getconn(), conns[-1])
+    stats = pool.stats()
+    eq_(stats['closed'], 2)
+    eq_(stats['size'], 1)
+
+
+def test_pool_pre_ping():
+
+    pool = Pool(connect, pre_ping=True)
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.close()
+
+    new_conn = pool.getconn()
+    assert_true(new_conn is not conn)
+    new_conn.execute('select 1')
+    eq_(pool.stats()['created'], 2)
+
+
+def test_pool_close():
+
+    pool = Pool(connect, min_idle=1)
+    conn = pool.getconn()
+    pool.close()
+    pool.putconn(conn)
+
+    stats = pool.stats()
+    eq_(stats['size'], 0)
+    eq_(stats['closed'], 1)
+    with assert_raises(sqlite3.ProgrammingError):
+        conn.execute('select 1')
+
+
+def test_thread_states_released():
+
+    db = Database(sqlite3, ':memory:')
+    db.to_keep_conn = True
+
+    closed = []
+    putconn = db.putconn
+    db.putconn = lambda conn: closed.append(putconn(conn))
+
+    def work():
+        with db as cur:
+            cur.execute('select 1')
+
+    n = 2000
+    for i in range(0, n, 100):
+        threads = [threading.Thread(target=work) for _ in range(100)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    eq_(len(closed), n)
+    eq_(len(db._thread_local), 0)
+
+
+def test_thread_states_after_fork():
+
+    import os
+
+    if not hasattr(os, 'fork'):
+        return
+
+    db = Database(sqlite3, ':memory:')
+    db.to_keep_conn = True
+
+    closed = []
+    db.putconn = lambda conn: closed.append(conn)
+
+    with db as cur:
+        parent_conn = cur.connection
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            with db as cur:
+                reused = cur.connection is parent_conn
+            os.write(w, b'1' if not reused and not closed else b'0')
+        finally:
+            os._exit(0)
+
+    os.close(w)
+    result = os.read(r, 1)
+    os.close(r)
+    os.waitpid(pid, 0)
+
+    eq_(result, b'1')
+    with db as cur:
+        eq_(cur.connection, parent_conn)
+
+
+class RecordingCursor(sqlite3.Cursor):
+
+    def __init__(self, *args):
+        sqlite3.Cursor.__init__(self, *args)
+        self.batches = []
+
+    def fetchmany(self, size):
+        rows = sqlite3.Cursor.fetchmany(self, size)
+        self.batches.append(len(rows))
+        return rows
+
+
+def test_iter_rows_by_batch():
+
+    db = Database(sqlite3, ':memory:')
+
+    with db.cursor(RecordingCursor) as cur:
+
+        cur.execute('create table t (id, v)')
+        cur.executemany('insert into t values (?, ?)', [(i, i*2) for i in range(10)])
+
+        cur.execute('select * from t')
+        eq_(list(iter_rows(cur, batch_size=4)), [(i, i*2) for i in range(10)])
+        eq_(cur.batches, [4, 4, 2, 0])
+
+        cur.execute('select * from t')
+        dicts = iter_dicts(cur, batch_size=3)
+        eq_(next(dicts), {'id': 0, 'v': 0})
+        eq_(cur.batches[4:], [3])
+        eq_(len(list(dicts)), 9)
+
+
+def test_group_by_batch():
+
+    db = Database(sqlite3, ':memory:')
+
+    with db.cursor(RecordingCursor) as cur:
+        cur.execute('create table t (k, v)')
+        cur.executemany('insert into t values (?, ?)', [(i//3, i) for i in range(7)])
+        cur.execute('select * from t order by k, v')
+        eq_(list(group(['k'], cur, batch_size=2)), [
+            (0, [0, 1, 2]), (1, [3, 4, 5]), (2, [6]),
+        ])
+        eq_(cur.batches, [2, 2, 2, 1, 0])
+
+
+def test_database_cursor_shares_conn():
+
+    db = Database(sqlite3, ':memory:')
+
+    with db as cur1, db.cursor(RecordingCursor) as cur2:
+        assert_true(isinstance(cur2, RecordingCursor))
+        eq_(cur1.connection, cur2.connection)
+
+    eq_(len(db._thread_local.get().cur_stack), 0)
+    eq_(db._thread_local.get().conn, None)
+
+
+def test_row():
+
+    col_names = ['id', 'email']
+    rows = [
+        ('alice', 'alice@gmail.com'),
+        ('mosky', 'mosky.tw@gmail.com'),
+    ]
+
+    dicts = all_to_dicts(rows=rows, col_names=col_names, as_row=True)
+    row = dicts[1]
+
+    assert_true(isinstance(row, Row))
+    eq_(row._index, dicts[0]._index)
+    assert_true(row._index is dicts[0]._index)
+    assert_true(row._row is rows[1])
+
+    eq_(row['id'], 'mosky')
+    eq_(row.email, 'mosky.tw@gmail.com')
+    eq_(row.keys(), col_names)
+    eq_(row.items(), list(zip(col_names, rows[1])))
+    eq_(row.get('age', 20), 20)
+    eq_(row, {'id': 'mosky', 'email': 'mosky.tw@gmail.com'})
+    eq_(dict(row), row.to_dict())
+
+    with assert_raises(KeyError):
+        row['age']
+    with assert_raises(AttributeError):
+        row.age
+
+
+def test_row_copy_and_pickle():
+    import copy
+    import pickle
+
+    row = Row(('mosky', 'mosky.tw@gmail.com'), make_index(['id', 'email']))
+
+    copied = copy.copy(row)
+    eq_(copied, row)
+    assert_true(copied._index is row._index)
+    eq_(copy.deepcopy(row), row)
+
+    for protocol in range(pickle.HIGHEST_PROTOCOL+1):
+        unpickled = pickle.loads(pickle.dumps(row, protocol))
+        assert_true(isinstance(unpickled, Row))
+        eq_(unpickled.items(), row.items())
+
+    with assert_raises(AttributeError):
+        Row.__new__(Row)._row
+
+
+def test_row_from_one_to_dict_and_group():
+
+    col_names = ['id', 'email']
+    rows = [
+        ('mosky', 'mosky.tw@gmail.com'),
+        ('mosky', 'mosky.liu@pinkoi.com'),
+    ]
+
+    row = one_to_dict(row=rows[0], col_names=col_names, as_row=True)
+    eq_(row.id, 'mosky')
+
+    grouped = list(group(['id'], rows=rows, col_names=col_names, to_dict=True, as_row=True))
+    eq_(grouped[0].email, ['mosky.tw@gmail.com', 'mosky.liu@pinkoi.com'])
+    eq_(grouped[0], {'id': 'mosky', 'email': ['mosky.tw@gmail.com', 'mosky.liu@pinkoi.com']})
+
+
+def test_to_columns():
+
+    db = Database(sqlite3, ':memory:')
+
+    with db.cursor(RecordingCursor) as cur:
+        cur.execute('create table t (id, score, name)')
+        cur.executemany('insert into t values (?, ?, ?)', [
+            (i, i/2.0, 'n%d' % i) for i in range(7)
+        ])
+        cur.execute('select * from t order by id')
+        columns = to_columns(cur, batch_size=3)
+        eq_(cur.batches, [3, 3, 1, 0])
+
+    eq_(list(columns), ['id', 'score', 'name'])
+    assert_true(isinstance(columns['id'], array))
+    eq_(columns['id'].tolist(), list(range(7)))
+    eq_(columns['score'], array('d', [i/2.0 for i in range(7)]))
+    eq_(columns['name'], ['n%d' % i for i in range(7)])
+
+
+def test_to_columns_fallback_and_size():
+
+    col_names = ['a', 'b']
+    rows = [(1, 1), (2, None), (3, 3)]
+
+    for size in (0, 2, 3, 10):
+        columns = to_columns(rows=rows, col_names=col_names, size=size, batch_size=1)
+        assert_true(isinstance(columns['a'], array))
+        eq_(columns['a'].tolist(), [1, 2, 3])
+        eq_(columns['b'], [1, None, 3])
+
+    columns = to_columns(rows=rows, col_names=col_names, typecodes={'a': 'd', 'b': 'd'})
+    eq_(columns['a'], array('d', [1, 2, 3]))
+    eq_(columns['b'], [1, None, 3])
+
+    columns = to_columns(rows=[], col_names=col_names, typecodes={'a': 'd'})
+    eq_(columns['a'], array('d'))
+    eq_(columns['b'], [])
+
+
+def test_group_unsorted_with_aggregators():
+
+    col_names = ['id', 'email', 'score']
+    rows = [
+        ('mosky', 'mosky.tw@gmail.com', 1),
+        ('alice', 'alice@gmail.com', 2),
+        ('mosky', 'mosky.liu@pinkoi.com', 3),
+        ('mosky', 'mosky.tw@gmail.com', 4),
+    ]
+
+    eq_(list(group(['id'], rows=rows, col_names=col_names, presorted=False)), [
+        ('mosky', ['mosky.tw@gmail.com', 'mosky.liu@pinkoi.com', 'mosky.tw@gmail.com'], [1, 3, 4]),
+        ('alice', ['alice@gmail.com'], [2]),
+    ])
+
+    eq_(list(group(['id'], rows=rows, col_names=col_names, presorted=False, aggregators={
+        'email': 'set', 'score': 'sum',
+    })), [
+        ('mosky', set(['mosky.tw@gmail.com', 'mosky.liu@pinkoi.com']), 8),
+        ('alice', set(['alice@gmail.com']), 2),
+    ])
+
+    eq_(list(group(['id'], rows=rows, col_names=col_names, presorted=False, to_dict=True, aggregators={
+        'email': 'first', 'score': max,
+    })), [
+        {'id': 'mosky', 'email': 'mosky.tw@gmail.com', 'score': 4},
+        {'id': 'alice', 'email': 'alice@gmail.com', 'score': 2},
+    ])
+
+    # the aggregators without a running state take all the rows
+    import mosql.db
+    mosql.db.aggregators['last'] = lambda rows, i: rows[-1][i]
+    try:
+        eq_(list(group(['id'], rows=rows, col_names=col_names, presorted=False, aggregators={
+            'email': 'last', 'score': 'count',
+        })), [
+            ('mosky', 'mosky.tw@gmail.com', 3),
+            ('alice', 'alice@gmail.com', 1),
+        ])
+    finally:
+        del mosql.db.aggregators['last']
+
+    # the hash table keeps the running states of the groups
+    eq_(list(group(['id'], rows=iter(rows), col_names=col_names, presorted=False, aggregators={
+        'email': 'count', 'score': 'first',
+    })), [
+        ('mosky', 3, 1),
+        ('alice', 1, 2),
+    ])
+
+
+def test_group_multiple_keys():
+
+    col_names = ['a', 'b', 'v']
+    rows = [(1, 1, 'x'), (1, 1, 'y'), (1, 2, 'z')]
+
+    eq_(list(group(['a', 'b'], rows=rows, col_names=col_names, aggregators={'v': 'count'})), [
+        (1, 1, 2), (1, 2, 1),
+    ])
+
+
+def test_external_sort():
+
+    import random
+    random.seed(0)
+
+    rows = [(random.randint(0, 50), i) for i in range(1000)]
+    key_func = lambda row: row[0]
+    expected = sorted(rows, key=key_func)
+
+    for buffer_size in (1, 7, 999, 1000, 5000):
+        eq_(list(external_sort(rows, key_func, buffer_size)), expected)
+
+    eq_(list(external_sort([], key_func, 10)), [])
+
+    # merge the runs in passes
+    for fan_in in (2, 3):
+        eq_(list(external_sort(rows, key_func, 7, fan_in)), expected)
+
+
+def test_external_sort_none_key():
+
+    rows = [(None, 0), (2, 1), (1, 2), (None, 3), (1, 4)]
+    expected = [(1, 2), (1, 4), (2, 1), (None, 0), (None, 3)]
+
+    for buffer_size in (1, 2, 10):
+        eq_(list(external_sort(rows, lambda row: row[0], buffer_size)), expected)
+
+    rows = [(1, None, 0), (1, 2, 1), (None, 1, 2), (1, 1, 3)]
+    eq_(list(external_sort(rows, lambda row: row[:2], 2)), [
+        (1, 1, 3), (1, 2, 1), (1, None, 0), (None, 1, 2),
+    ])
+
+    col_names = ['id', 'v']
+    eq_(list(group(['id'], rows=[(None, 0), (1, 1), (None, 2)], col_names=col_names, presorted=False, sort_buffer=2)), [
+        (1, [1]), (None, [0, 2]),
+    ])
+
+
+def test_group_with_sort_buffer():
+
+    col_names = ['id', 'v']
+    rows = [(i % 3, i) for i in range(10)]
+
+    eq_(list(group(['id'], rows=rows, col_names=col_names, presorted=False, sort_buffer=4)), [
+        (0, [0, 3, 6, 9]), (1, [1, 4, 7]), (2, [2, 5, 8]),
+    ])
+
+
+def test_stage_values():
+
+    from mosql.query import select
+    from mosql.sqlite import dialect
+    import mosql.std
+    mosql.std.patch()
+
+    conn = connect()
+    conn.execute('create table person (id integer)')
+    conn.executemany('insert into person values (?)', [(i, ) for i in range(10)])
+    cur = conn.cursor()
+
+    for parameterize in (False, True):
+        staged = stage_values(cur, iter(range(3, 7)), dialect=dialect, max_rows=3, parameterize=parameterize)
+        eq_(staged, '(SELECT "v" FROM "mosql_staged")')
+        cur.execute(select('person', {'id in': staged}, order_by='id'))
+        eq_(cur.fetchall(), [(3, ), (4, ), (5, ), (6, )])
+
+    # the permanent table of the same name is never dropped
+    conn.execute('create table person_ids (v integer)')
+    conn.execute('insert into person_ids values (100)')
+    for _ in range(2):
+        staged = stage_values(cur, [1, 2], table='person_ids', dialect=dialect)
+        cur.execute(select('person', {'id in': staged}, order_by='id'))
+        eq_(cur.fetchall(), [(1, ), (2, )])
+    conn.execute('drop table temp.person_ids')
+    eq_(conn.execute('select * from main.person_ids').fetchall(), [(100, )])
+
+    import mosql.mysql
+    mosql.std.patch()
+    eq_(mosql.mysql.dialect.drop_temporary_table % 't', 'DROP TEMPORARY TABLE IF EXISTS t')
+    eq_(mosql.std.dialect.drop_temporary_table % 't', 'DROP TABLE IF EXISTS pg_temp.t')
+
+
+def test_fingerprint():
+    eq_(fingerprint("select * from t1 where a = 1 and b = 'it''s' -- x"), 'select * from t1 where a = ? and b = ?')
+    eq_(fingerprint("insert into t values (1, 'a--b'), (2, 'b')"), 'insert into t values (...)')
+    eq_(fingerprint(b'select * from t where id = 1'), 'select * from t where id = ?')
+
+    class Composed(object):
+        def __str__(self):
+            return 'select * from t where id = %s'
+    eq_(fingerprint(Composed()), 'select * from t where id = ?')
+
+    # the long SQL isn't cached
+    import mosql.db
+    sql = 'insert into t values ' + ', '.join(['(1)'] * 5000)
+    eq_(fingerprint(sql), 'insert into t values (...)')
+    assert_true(mosql.db._fingerprints.get(sql) is None)
+    eq_(fingerprint('select x::int from t where id in (%s, %s) and y = :name'), 'select x::int from t where id in (...) and y = ?')
+
+
+def test_timing():
+
+    import logging
+
+    class Handler(logging.Handler):
+        def __init__(self):
+            logging.Handler.__init__(self)
+            self.messages = []
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    handler = Handler()
+    logger = logging.getLogger('mosql.tests.slow_query')
+    logger.addHandler(handler)
+
+    db = Database(sqlite3, ':memory:')
+    db.to_keep_conn = True
+    stats = db.enable_timing(slow_query_threshold=0, slow_query_logger=logger)
+    assert_true(isinstance(stats, TimingStats))
+
+    with db as cur:
+        cur.execute('create table t (id)')
+        cur.executemany('insert into t values (?)', [(i, ) for i in range(5)])
+
+    with db as cur:
+        cur.execute('select * from t where id > 1')
+        eq_(len(cur.fetchall()), 3)
+        cur.execute('select * from t where id > 2')
+        eq_(len(list(cur)), 2)
+        cur.execute('select * from t where id > 3')
+        eq_(cur.fetchone(), (4, ))
+
+    db.disable_timing()
+    with db as cur:
+        cur.execute('select 1')
+
+    snapshot = stats.snapshot()
+    eq_(snapshot[('getconn', None)]['count'], 1)
+    eq_(snapshot[('commit', None)]['count'], 2)
+    eq_(snapshot[('execute', 'select * from t where id > ?')]['count'], 3)
+    eq_(snapshot[('fetch', 'select * from t where id > ?')]['rows'], 6)
+    eq_(snapshot[('executemany', 'insert into t values (...)')]['count'], 1)
+    assert_true(('execute', 'select ?') not in snapshot)
+
+    eq_(len(handler.messages), 5)
+    assert_true(handler.messages[0].startswith('slow query: '))
+    assert_true(handler.messages[0].endswith('s create table t (id)'))
+    # the values are not logged by default
+    assert_true(handler.messages[2].endswith('s select * from t where id > ?'))
+
+    # log the whole SQL
+    del handler.messages[:]
+    db.enable_timing(slow_query_threshold=0, slow_query_logger=logger, slow_query_log_sql=True)
+    with db as cur:
+        cur.execute('select * from t where id > 3')
+    eq_(len(handler.messages), 1)
+    assert_true(handler.messages[0].endswith('select * from t where id > ? -- select * from t where id > 3'))
+    db.disable_timing()
+
+    logger.removeHandler(handler)
+
+
+def test_timing_stats():
+
+    from mosql.db import TimingEvent
+
+    stats = TimingStats()
+    stats(TimingEvent('execute', 'select * from t where id = 1', 0.5, None))
+    stats(TimingEvent('execute', 'select * from t where id = 2', 1.5, None))
+    stats(TimingEvent('fetch', 'select * from t where id = 2', 0.25, 3))
+    stats(TimingEvent('commit', None, 0.125, None))
+
+    eq_(stats.snapshot(), {
+        ('execute', 'select * from t where id = ?'): {'count': 2, 'seconds': 2.0, 'max_seconds': 1.5, 'rows': 0},
+        ('fetch', 'select * from t where id = ?'): {'count': 1, 'seconds': 0.25, 'max_seconds': 0.25, 'rows': 3},
+        ('commit', None): {'count': 1, 'seconds': 0.125, 'max_seconds': 0.125, 'rows': 0},
+    })
+
+    # the snapshot is a copy
+    stats.snapshot()[('commit', None)]['count'] = 100
+    eq_(stats.snapshot()[('commit', None)]['count'], 1)
+
+    stats.reset()
+    eq_(stats.snapshot(), {})
+
+    # the SQL which is not str doesn't break the execute
+    from mosql.db import InstrumentedCursor, _Timing
+    import logging
+
+    class Cursor(object):
+        def execute(self, sql):
+            return 'executed'
+
+    timing = _Timing(stats, 0, logging.getLogger('mosql.tests.slow_query'), False)
+    cur = InstrumentedCursor(Cursor(), timing.record)
+    eq_(cur.execute(b'select * from t where id = 1'), 'executed')
+    eq_(list(stats.snapshot()), [('execute', 'select * from t where id = ?')])
+
+
+def test_executemany():
+
+    from mosql.query import insert, update, delete
+    from mosql.sqlite import dialect
+    from mosql.util import ___
+    import mosql.std
+    mosql.std.patch()
+
+    db = Database(sqlite3, ':memory:')
+    db.to_keep_conn = True
+    db.dialect = dialect
+
+    with db as cur:
+        cur.execute('create table person (id integer primary key, name text, age integer)')
+
+    rows = ({'id': i, 'name': 'P%d' % i, 'age': i % 7} for i in range(25))
+    eq_(db.executemany(insert, rows, batch_size=10, table='person'), 25)
+
+    rows = [{'id': i, 'name': 'Q%d' % i} for i in range(0, 25, 5)]
+    eq_(db.executemany(update, rows, table='person', where={'id': ___}, set={'name': ___}), 5)
+
+    eq_(db.executemany(delete, [Row((3, ), {'id': 0})], table='person', where={'id >': ___}), 1)
+    eq_(db.executemany(insert, [], table='person'), 0)
+
+    with db as cur:
+        cur.execute('select id, name, age from person order by id')
+        eq_(cur.fetchall(), [(0, 'Q0', 0), (1, 'P1', 1), (2, 'P2', 2), (3, 'P3', 3)])
+
+    # the query bound before keeps its dialect
+    db.dialect = None
+    eq_(db.executemany(insert.bind(dialect), [{'id': 10, 'name': 'R', 'age': 1}], table='person'), 1)
+
+    # the JSON values are passed as a parameterized query does
+    import json
+    db.dialect = dialect
+    with db as cur:
+        cur.execute('create table detail (id integer, data text)')
+    eq_(db.executemany(insert, [{'id': 1, 'data': {'a': [1, 2]}}], table='detail'), 1)
+    with db as cur:
+        cur.execute('select data from detail')
+        eq_(json.loads(cur.fetchone()[0]), {'a': [1, 2]})
+
+
+def test_bind():
+
+    from mosql.query import select
+    from mosql.mysql import dialect as mysql
+    from mosql.sqlite import dialect as sqlite
+    import mosql.std
+    mosql.std.patch()
+
+    db = Database(sqlite3, ':memory:')
+    eq_(db.bind(select)('t'), 'SELECT * FROM "t"')
+    eq_(db.bind(select.bind(mysql))('t'), 'SELECT * FROM `t`')
+
+    db.dialect = sqlite
+    eq_(db.bind(select.bind(mysql)).parameterize()('t', {'id': 1}), ('SELECT * FROM "t" WHERE "id" = ?', (1, )))
+
+
+def test_batch_union():
+
+    from mosql.db import Batch, ResultSet
+    from mosql.util import _LRUCache
+    from mosql.query import select
+    from mosql.sqlite import dialect
+    import mosql.std
+    mosql.std.patch()
+
+    conn = connect()
+    conn.execute('create table person (id integer, name text)')
+    conn.execute('create table detail (person_id integer, key text, val text)')
+    conn.executemany('insert into person values (?, ?)', [(i, 'P%d' % i) for i in range(5)])
+    conn.executemany('insert into detail values (?, ?, ?)', [(i % 3, 'k', 'v%d' % i) for i in range(6)])
+    cur = conn.cursor()
+
+    select_p = select.bind(dialect).parameterize()
+    queries = [
+        select('person', {'id': 1}),
+        select('detail', {'person_id': 0}, order_by='val'),
+        select('person', {'id >': 2}, select='name', order_by='id'),
+        select_p('detail', {'person_id': 2}, select=('val', 'key')),
+        select('person', {'id': 100}),
+    ]
+    expected = []
+    for query in queries:
+        if isinstance(query, tuple):
+            cur.execute(*query)
+        else:
+            cur.execute(query)
+        expected.append(ResultSet([d[0] for d in cur.description], cur.fetchall()))
+
+    class CountingCursor(object):
+
+        def __init__(self, cur):
+            self.cur = cur
+            self.count = 0
+
+        def execute(self, *args):
+            self.count += 1
+            return self.cur.execute(*args)
+
+        def __getattr__(self, name):
+            return getattr(self.cur, name)
+
+    counting_cur = CountingCursor(cur)
+    columns_cache = _LRUCache(16)
+    # learn the columns one by one, and then run in one round trip, except
+    # the two ordered queries
+    for n in (len(queries), 1+2):
+        counting_cur.count = 0
+        batch = Batch(counting_cur, columns_cache=columns_cache)
+        for query in queries:
+            if isinstance(query, tuple):
+                batch.add(*query)
+            else:
+                batch.add(query)
+        eq_(batch.execute(), expected)
+        eq_(len(batch), 0)
+        eq_(counting_cur.count, n)
+
+    # the columns are changed
+    conn.execute('alter table person add column age integer')
+    expected[0] = ResultSet(['id', 'name', 'age'], [(1, 'P1', None)])
+    expected[4] = ResultSet(['id', 'name', 'age'], [])
+    batch = Batch(counting_cur, columns_cache=columns_cache)
+    for query in queries:
+        if isinstance(query, tuple):
+            batch.add(*query)
+        else:
+            batch.add(query)
+    # the union fails once, and then the columns are learned again
+    assert_raises(sqlite3.OperationalError, batch.execute)
+    for query in queries:
+        if isinstance(query, tuple):
+            batch.add(*query)
+        else:
+            batch.add(query)
+    eq_(batch.execute(), expected)
+    counting_cur.count = 0
+    batch = Batch(counting_cur, columns_cache=columns_cache)
+    batch.add(queries[0])
+    batch.add(queries[4])
+    eq_(batch.execute(), [expected[0], expected[4]])
+    eq_(counting_cur.count, 1)
+
+    # the widths are not changed, but the union is wider than remembered
+    columns_cache.set(fingerprint(queries[0]), ['id'])
+    columns_cache.set(fingerprint(queries[4]), ['id'])
+    batch = Batch(cur, columns_cache=columns_cache)
+    batch.add(queries[0])
+    batch.add(queries[4])
+    eq_(batch.execute(), [expected[0], expected[4]])
+
+    db = Database(sqlite3, ':memory:')
+    eq_(db.execute_batch(['select 1 as a', 'select 2 as b, 3 as c']), [
+        ResultSet(['a'], [(1, )]), ResultSet(['b', 'c'], [(2, 3)]),
+    ])
+    eq_(db.execute_batch(['select 1 as a', 'select 2 as b, 3 as c']), [
+        ResultSet(['a'], [(1, )]), ResultSet(['b', 'c'], [(2, 3)]),
+    ])
+
+    # the columns are remembered per database
+    eq_(len(db._batch_columns), 2)
+    eq_(len(Database(sqlite3, ':memory:')._batch_columns), 0)
+    assert_true(Batch(cur).columns_cache is not Batch(cur).columns_cache)
+
+
+def test_batch_multi():
+
+    from mosql.db import Batch, ResultSet
+
+    class Cursor(object):
+        # a fake driver which runs multiple statements
+        def execute(self, sql, params=()):
+            self.results = [[(s, )] for s in sql.split(';\n')]
+            self.description = [('sql', )]
+        def fetchall(self):
+            return self.results[0]
+        def nextset(self):
+            self.results.pop(0)
+            return True if self.results else None
+
+    batch = Batch(Cursor(), mode='multi')
+    batch.add('select 1')
+    batch.add('select 2')
+    eq_(batch.execute(), [ResultSet(['sql'], [('select 1', )]), ResultSet(['sql'], [('select 2', )])])
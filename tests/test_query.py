@@ -4,10 +4,11 @@
 
 from collections import OrderedDict
 
-from nose.tools import eq_, assert_raises
+from nose.tools import eq_, assert_raises, assert_true
 
-from mosql.query import select, insert, replace
+from mosql.query import select, insert, replace, bulk_insert
 from mosql.util import param, ___, raw, DirectionError, OperatorError, autoparam
+from mosql.compat import PY2, text_type
 
 
 def test_select_customize():
@@ -78,3 +79,419 @@ def test_replace():
     exp = ('REPLACE INTO "person" ("person_id", "name") '
            'VALUES (\'mosky\', \'Mosky Liu\')')
     eq_(gen, exp)
+
+
+def test_select_cache():
+    person = select.breed({'table': 'person'})
+    person.enable_cache()
+    for person_id, age in (('mosky', 20), ('andy', 30), ("o'neil", 40)):
+        where = OrderedDict([('person_id', person_id), ('age >', age)])
+        eq_(person(where=where), select('person', where))
+    eq_(person.cache_info().hits, 2)
+    eq_(person.cache_info().misses, 1)
+
+
+def test_select_cache_shape():
+    person = select.breed({'table': 'person'})
+    person.enable_cache()
+    eq_(person(where={'person_id': ('andy', 'bob')}),
+        'SELECT * FROM "person" WHERE "person_id" IN (\'andy\', \'bob\')')
+    eq_(person(where={'person_id': ('andy', 'bob', 'mosky')}),
+        'SELECT * FROM "person" WHERE "person_id" IN (\'andy\', \'bob\', \'mosky\')')
+    eq_(person(where={'person_id': None}),
+        'SELECT * FROM "person" WHERE "person_id" IS NULL')
+    eq_(person(where={'person_id': ()}),
+        'SELECT * FROM "person" WHERE FALSE')
+    eq_(person(where={'person_id': raw('ANY(%s)')}),
+        'SELECT * FROM "person" WHERE "person_id" = ANY(%s)')
+    eq_(person.cache_info().hits, 0)
+    eq_(person.cache_info().currsize, 5)
+
+
+def test_insert_cache():
+    person = insert.breed({'table': 'person'})
+    person.enable_cache()
+    for row in (('mosky', True), ('andy', None), ('bob', 1)):
+        gen = person(set=OrderedDict(zip(('person_id', 'is_active'), row)))
+        eq_(gen, insert('person', OrderedDict(zip(('person_id', 'is_active'), row))))
+    eq_(person.cache_info().misses, 2)
+
+
+def test_cache_unshapable():
+    person = select.breed({'table': 'person'})
+    person.enable_cache()
+    gen = person(where={'person_id': (x for x in ('andy', 'bob'))})
+    eq_(gen, 'SELECT * FROM "person" WHERE "person_id" IN (\'andy\', \'bob\')')
+    eq_(person.cache_info().currsize, 0)
+
+
+def test_cache_maxsize():
+    person = select.breed({'table': 'person'})
+    person.enable_cache(maxsize=2)
+    for limit in (1, 2, 3):
+        person(where={'person_id': 'mosky'}, order_by=('age', ) * limit)
+    eq_(person.cache_info().currsize, 2)
+    person.disable_cache()
+    eq_(person.cache_info(), None)
+
+
+def test_select_parameterize():
+    select_p = select.parameterize()
+    sql, params = select_p('person', OrderedDict([
+        ('person_id', ('andy', 'bob')), ('name', None), ('age >', 20),
+    ]), limit=10)
+    exp = ('SELECT * FROM "person" WHERE "person_id" IN (%s, %s) '
+           'AND "name" IS NULL AND "age" > %s LIMIT %s')
+    eq_(sql, exp)
+    eq_(params, ('andy', 'bob', 20, 10))
+
+
+def test_insert_parameterize():
+    insert_p = insert.parameterize(named=True)
+    sql, params = insert_p('person', OrderedDict([
+        ('person_id', 'mosky'), ('name', 'Mosky Liu'), ('created', raw('now()')),
+    ]))
+    exp = ('INSERT INTO "person" ("person_id", "name", "created") '
+           'VALUES (%(p0)s, %(p1)s, now())')
+    eq_(sql, exp)
+    eq_(params, {'p0': 'mosky', 'p1': 'Mosky Liu'})
+
+
+def test_insert_parameterize_json():
+    import sqlite3
+    import json
+    from mosql.sqlite import dialect
+    import mosql.std
+    mosql.std.patch()
+
+    data = OrderedDict([('a', 1), ('b', [1, 2])])
+
+    sql, params = insert.parameterize()('person', OrderedDict([('person_id', 'mosky'), ('data', data)]))
+    eq_(params, ('mosky', '{"a": 1, "b": [1, 2]}'))
+
+    # it is same as the inline one
+    inline = insert('person', OrderedDict([('person_id', 'mosky'), ('data', data)]))
+    assert_true(inline.endswith("'mosky', '{\"a\": 1, \"b\": [1, 2]}')"))
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table person (person_id text, data text)')
+    insert_p = insert.bind(dialect).parameterize()
+    conn.execute(*insert_p('person', {'person_id': 'mosky', 'data': data}))
+    conn.execute(inline)
+    eq_([json.loads(stored) for stored, in conn.execute('select data from person')], [data, data])
+
+
+def test_parameterize_sequence_to_set():
+    from mosql.query import update
+
+    update_p = update.parameterize()
+    sql, params = update_p('person', {'id': [1, 2]}, {'tags': ['a', 'b']})
+    eq_(sql, 'UPDATE "person" SET "tags"=%s WHERE "id" IN (%s, %s)')
+    eq_(params, (['a', 'b'], 1, 2))
+
+    insert_p = insert.parameterize()
+    sql, params = insert_p('person', OrderedDict([('id', 1), ('tags', ('a', ))]))
+    eq_(sql, 'INSERT INTO "person" ("id", "tags") VALUES (%s, %s)')
+    eq_(params, (1, ['a']))
+
+    sql, params = insert_p('person', values=[(1, ['a']), (2, [])])
+    eq_(sql, 'INSERT INTO "person" VALUES (%s, %s), (%s, %s)')
+    eq_(params, (1, ['a'], 2, []))
+
+
+def test_parameterize_cache():
+    select_p = select.parameterize().breed({'table': 'person'})
+    select_p.enable_cache()
+    sql_1, params_1 = select_p(where={'person_id': 'mosky'})
+    sql_2, params_2 = select_p(where={'person_id': 'andy'})
+    assert_true(sql_1 is sql_2)
+    eq_(params_1, ('mosky', ))
+    eq_(params_2, ('andy', ))
+    eq_(select_p.cache_info().hits, 1)
+
+
+def test_parameterize_unshapable():
+    select_p = select.parameterize()
+    sql, params = select_p('person', {'person_id': (x for x in ('andy', ))},
+                           order_by=(x for x in ('age', )))
+    exp = 'SELECT * FROM "person" WHERE "person_id" IN (\'andy\') ORDER BY "age"'
+    eq_(sql, exp)
+    eq_(params, ())
+
+
+def test_parameterize_array_param():
+    from mosql.util import Dialect
+    select_p = select.bind(Dialect(in_list_threshold=2, in_list_strategy='any')).parameterize()
+    select_p.enable_cache()
+
+    sql, params = select_p('person', {'person_id': ['andy', 'bob', 'mosky']})
+    eq_(sql, 'SELECT * FROM "person" WHERE "person_id" = ANY(%s)')
+    eq_(params, (['andy', 'bob', 'mosky'], ))
+
+    # any length shares the template
+    sql_2, params = select_p('person', {'person_id': ['andy', 'bob', 'mosky', 'tom']})
+    assert_true(sql is sql_2)
+    eq_(params, (['andy', 'bob', 'mosky', 'tom'], ))
+
+    sql, params = select_p('person', {'person_id not in': ['andy', 'bob', None]})
+    eq_(sql, 'SELECT * FROM "person" WHERE "person_id" <> ALL(ARRAY[%s, %s, NULL])')
+    eq_(params, ('andy', 'bob'))
+
+
+def test_bind_dialect():
+    from mosql.mysql import dialect as mysql
+    from mosql.sqlite import dialect as sqlite
+    import mosql.std
+    mosql.std.patch()
+
+    where = OrderedDict([('name', "Mosky's"), ('is_active', True)])
+    eq_(select.bind(mysql)('person', where),
+        'SELECT * FROM `person` WHERE `name` = \'Mosky\\\'s\' AND `is_active` = TRUE')
+    eq_(select.bind(sqlite)('person', where),
+        'SELECT * FROM "person" WHERE "name" = \'Mosky\'\'s\' AND "is_active" = 1')
+    eq_(select('person', where),
+        'SELECT * FROM "person" WHERE "name" = \'Mosky\'\'s\' AND "is_active" = TRUE')
+
+    sql, params = select.bind(sqlite).parameterize()('person', where)
+    eq_(sql, 'SELECT * FROM "person" WHERE "name" = ? AND "is_active" = ?')
+    eq_(params, ("Mosky's", True))
+
+
+def test_bulk_insert():
+    rows = (('p%d' % i, 'Person %d' % i) for i in range(5))
+    gen = list(bulk_insert('person', rows, columns=('person_id', 'name'), max_rows=2))
+    eq_(len(gen), 3)
+    eq_(gen[2], 'INSERT INTO "person" ("person_id", "name") VALUES (\'p4\', \'Person 4\')')
+
+
+def test_bulk_insert_max_bytes():
+    rows = [OrderedDict([('person_id', 'p%d' % i)]) for i in range(100)]
+    gen = list(bulk_insert('person', rows, max_rows=1000, max_bytes=200))
+    assert_true(len(gen) > 1)
+    assert_true(all(len(sql.encode('utf-8')) <= 200 for sql in gen))
+    eq_(sum(sql.count('(') - 1 for sql in gen), 100)
+
+
+def test_bulk_insert_sqlite():
+    import sqlite3
+    from mosql.sqlite import dialect
+
+    conn = sqlite3.connect(':memory:')
+    cur = conn.cursor()
+    cur.execute('create table person (person_id, name)')
+    rows = ({'person_id': i, 'name': 'Person %d' % i} for i in range(2500))
+    chunks = bulk_insert('person', rows, parameterize=True, max_params=999,
+                         dialect=dialect)
+    count = 0
+    for sql, params in chunks:
+        assert_true(len(params) <= 999)
+        cur.execute(sql, params)
+        count += 1
+    cur.execute('select count(*), max(person_id) from person')
+    eq_(cur.fetchone(), (2500, 2499))
+    eq_(count, 6)
+
+
+def test_bulk_insert_json():
+    import sqlite3
+    import json
+    from mosql.sqlite import dialect
+    import mosql.std
+    mosql.std.patch()
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table person (person_id, data)')
+    rows = [(i, {'n': i}) for i in range(3)]
+    for parameterize in (True, False):
+        for chunk in bulk_insert('person', rows, columns=('person_id', 'data'), parameterize=parameterize, dialect=dialect):
+            conn.execute(*(chunk if parameterize else (chunk, )))
+    eq_([(person_id, json.loads(stored)) for person_id, stored in conn.execute('select * from person order by rowid')], rows * 2)
+
+
+def test_metrics():
+    from mosql.util import MetricsRegistry
+
+    registry = MetricsRegistry()
+    person = select.breed({'table': 'person'})
+    person.enable_metrics('person', registry)
+    person.enable_echo()
+    try:
+        person(where={'id': 1})
+        person.breed({'limit': 1})()
+        param_sql, _ = person.parameterize()(where={'id': 1})
+    finally:
+        person.disable_echo()
+        person.disable_metrics()
+    person()
+
+    m = registry.snapshot()['person']
+    eq_(m['count'], 3)
+    eq_(m['max_sql_length'], len(param_sql))
+    assert_true(m['seconds'] > 0)
+    assert_true(m['p50_seconds'] <= m['p99_seconds'])
+
+    text = registry.to_prometheus()
+    assert_true('mosql_render_seconds{query="person",quantile="0.5"}' in text)
+    assert_true('mosql_render_seconds_count{query="person"} 3' in text)
+    assert_true('mosql_render_sql_length_max{query="person"} %d' % len(param_sql) in text)
+
+    registry.reset()
+    eq_(registry.to_dict()['person']['count'], 0)
+
+
+def test_statement_metrics():
+    from mosql.util import MetricsRegistry, Dialect
+
+    registry = MetricsRegistry()
+    select.statement.enable_metrics('select statement', registry)
+    try:
+        select('person')
+        sql = select('person', {'id': 1})
+        # the template, param and dialect paths count too
+        select_c = select.breed({})
+        select_c.enable_cache()
+        select_c('person', {'id': 1})
+        select_c('person', {'id': 2})
+        param_sql, _ = select.parameterize()('person', {'id': 1})
+        select.bind(Dialect(delimit_identifier=lambda s: '[%s]' % s))('person')
+    finally:
+        select.statement.disable_metrics()
+
+    m = registry.snapshot()['select statement']
+    eq_(m['count'], 6)
+    eq_(m['max_sql_length'], max(len(sql), len(param_sql)))
+
+
+def test_clause_args_untouched():
+    person = insert.breed({'table': 'person'})
+    defaults = person.clause_args.copy()
+    clause_args = {'set': {'person_id': 'mosky'}}
+    exp = 'INSERT INTO "person" ("person_id") VALUES (\'mosky\')'
+    eq_(person.format(clause_args), exp)
+    eq_(person.format(clause_args), exp)
+    eq_(clause_args, {'set': {'person_id': 'mosky'}})
+    eq_(person.clause_args, defaults)
+
+    from mosql.stmt import select as select_stat
+    clause_args = {'from_': 'person'}
+    eq_(select_stat.format(clause_args), 'SELECT * FROM "person"')
+    eq_(clause_args, {'from_': 'person'})
+
+
+def test_fragment():
+    from mosql.query import left_join
+    from mosql.util import Fragment
+
+    ids = select.fragment('detail', {'key': 'email'}, select='person_id')
+    detail = left_join.fragment('detail', using='person_id')
+    assert_true(isinstance(ids, Fragment))
+    assert_true(ids._sql is None)
+
+    eq_(select('person', {'person_id in': ids}, joins=[detail, detail]),
+        'SELECT * FROM "person" LEFT JOIN "detail" USING ("person_id") LEFT JOIN "detail" USING ("person_id") '
+        'WHERE "person_id" IN (SELECT "person_id" FROM "detail" WHERE "key" = \'email\')')
+    # memoized
+    assert_true(ids._sql is not None)
+    eq_(text_type(ids), ids.sql)
+
+    name = select.fragment('detail', {'name': u'安'}, select='person_id')
+    eq_(text_type(name), u'SELECT "person_id" FROM "detail" WHERE "name" = \'安\'')
+    if PY2:
+        eq_(str(name), text_type(name).encode('utf-8'))
+    else:
+        eq_(str(name), text_type(name))
+
+
+def test_fragment_parameterize():
+    select_p = select.parameterize()
+    select_p.enable_cache()
+
+    for key in ('email', 'phone'):
+        # the orders of the conditions are fixed, so are the params
+        ids = select.fragment('detail', OrderedDict([('key', key), ('val like', '%@%')]), select='person_id')
+        sql, params = select_p('person', OrderedDict([('age >', 20), ('person_id in', ids), ('name', 'Mosky')]))
+        eq_(sql, 'SELECT * FROM "person" WHERE "age" > %s AND "person_id" IN '
+                 '(SELECT "person_id" FROM "detail" WHERE "key" = %s AND "val" LIKE %s) AND "name" = %s')
+        eq_(params, (20, key, '%@%', 'Mosky'))
+
+    eq_(select_p.cache_info().hits, 1)
+
+
+def test_bulk_upsert():
+    import sqlite3
+    from mosql.query import bulk_upsert
+    from mosql.util import Dialect
+    from mosql.mysql import dialect as mysql
+    from mosql.sqlite import dialect as sqlite
+    import mosql.std
+    mosql.std.patch()
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table person (person_id text primary key, name text, age integer)')
+    conn.execute("insert into person values ('andy', 'A', 1)")
+
+    rows = ({'person_id': 'p%d' % i, 'name': 'P%d' % i, 'age': i} for i in range(5))
+    for sql, params in bulk_upsert('person', rows, 'person_id', max_rows=2, parameterize=True, dialect=sqlite):
+        conn.execute(sql, params)
+
+    rows = [('andy', 'Andy', 10), ('p1', 'Pone', 11)]
+    gen = list(bulk_upsert('person', rows, ['person_id'], ['name'], columns=('person_id', 'name', 'age'), dialect=sqlite))
+    eq_(gen, [
+        'INSERT INTO "person" ("person_id", "name", "age") VALUES (\'andy\', \'Andy\', 10), (\'p1\', \'Pone\', 11) '
+        'ON CONFLICT ("person_id") DO UPDATE SET "name"=EXCLUDED."name"'
+    ])
+    for sql in gen:
+        conn.execute(sql)
+
+    for sql in bulk_upsert('person', [('p2', 'X', 0)], 'person_id', [], columns=('person_id', 'name', 'age')):
+        conn.execute(sql)
+
+    eq_(conn.execute('select * from person order by person_id').fetchall(), [
+        ('andy', 'Andy', 1), ('p0', 'P0', 0), ('p1', 'Pone', 1), ('p2', 'P2', 2), ('p3', 'P3', 3), ('p4', 'P4', 4),
+    ])
+
+    eq_(list(bulk_upsert('person', [('andy', 'Andy')], 'person_id', columns=('person_id', 'name'), returning='person_id')), [
+        'INSERT INTO "person" ("person_id", "name") VALUES (\'andy\', \'Andy\') '
+        'ON CONFLICT ("person_id") DO UPDATE SET "name"=EXCLUDED."name" RETURNING "person_id"'
+    ])
+
+    eq_(list(bulk_upsert('person', [{'person_id': 'andy', 'name': 'Andy'}], 'person_id', dialect=mysql)), [
+        'INSERT INTO `person` (`person_id`, `name`) VALUES (\'andy\', \'Andy\') '
+        'ON DUPLICATE KEY UPDATE `name`=VALUES(`name`)'
+    ])
+    eq_(list(bulk_upsert('person', [('andy', 'Andy')], 'person_id', [], dialect=mysql)), [
+        'INSERT INTO `person` VALUES (\'andy\', \'Andy\') ON DUPLICATE KEY UPDATE `person_id`=`person_id`'
+    ])
+
+    assert_raises(ValueError, lambda: list(bulk_upsert('person', [('andy', 'Andy')], 'person_id')))
+    assert_raises(ValueError, lambda: list(bulk_upsert('person', [('andy', 'Andy')], 'person_id', [], dialect=Dialect(upsert_style='merge'))))
+
+def test_bulk_upsert_dialect_after_patch():
+    import subprocess
+    import sys
+    code = (
+        'import mosql.mysql, mosql.sqlite\n'
+        'from mosql.query import bulk_upsert\n'
+        'print(mosql.sqlite.dialect.upsert_style)\n'
+        'print(list(bulk_upsert("t", [(1, 2)], "a", columns=("a", "b"), dialect=mosql.sqlite.dialect))[0])\n'
+    )
+    # import the mosql of this repo wherever the tests run from
+    import os
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output([sys.executable, '-c', code], env=env).decode('utf-8').splitlines()
+    eq_(out, [
+        'on_conflict',
+        'INSERT INTO "t" ("a", "b") VALUES (1, 2) ON CONFLICT ("a") DO UPDATE SET "b"=EXCLUDED."b"',
+    ])
+
+    import mosql.mysql
+    import mosql.std
+    mosql.mysql.patch()
+    try:
+        from mosql.util import Dialect
+        eq_(Dialect().upsert_style, 'on_conflict')
+        eq_(Dialect(upsert_style='on_duplicate_key_update').upsert_style, 'on_duplicate_key_update')
+    finally:
+        mosql.std.patch()
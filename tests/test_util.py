@@ -1,11 +1,12 @@
 from collections import OrderedDict
 from datetime import date
 
-from nose.tools import eq_, assert_true, assert_false
+from nose.tools import eq_, assert_true, assert_false, assert_raises
 
 from mosql.compat import binary_type, text_type
 from mosql.util import (
-    autoparam, build_set, build_where, param, ___,
+    autoparam, build_set, build_where, param, ___, raw,
+    identifier, identifier_as, identifier_dir,
     _is_iterable_not_str,
 )
 
@@ -61,3 +62,180 @@ def test_build_set_prepared():
         ('custom_param', param('myparam')), ('auto_param', autoparam),
     ]))
     eq_(gen, '"custom_param"=%(myparam)s, "auto_param"=%(auto_param)s')
+
+
+def test_identifier_memoize():
+    identifier.cache_clear()
+    eq_(identifier_as('person.person_id as id'), '"person"."person_id" AS "id"')
+    eq_(identifier_as('person.person_id as id'), '"person"."person_id" AS "id"')
+    assert_true(identifier_as.cache_info().hits >= 1)
+    # the raw in pair must not hit the cache of the str
+    eq_(identifier_as([(raw('count(person_id)'), 'c')]), ['count(person_id) AS "c"'])
+    eq_(identifier_as([('count(person_id)', 'c')]), ['"count(person_id)" AS "c"'])
+
+
+def test_identifier_memoize_patch():
+    eq_(identifier('person'), '"person"')
+    import mosql.mysql
+    mosql.mysql.patch()
+    try:
+        eq_(identifier('person'), '`person`')
+        eq_(identifier_dir('person.age desc'), '`person`.`age` DESC')
+    finally:
+        import mosql.std
+        mosql.std.patch()
+    eq_(identifier('person'), '"person"')
+    eq_(identifier_dir('person.age desc'), '"person"."age" DESC')
+
+
+def test_dialect():
+    from mosql.util import Dialect
+    bracket = Dialect(delimit_identifier=lambda s: '[%s]' % s)
+    eq_(bracket.identifier_as('person.name as n'), '[person].[name] AS [n]')
+    eq_(bracket.build_where({'person.name': ('a', 'b')}),
+        '[person].[name] IN (\'a\', \'b\')')
+    eq_(identifier_as('person.name as n'), '"person"."name" AS "n"')
+    eq_(bracket.resolve((build_where, len)), (bracket.build_where, len))
+
+
+def test_value_adapters():
+    from decimal import Decimal
+    from uuid import UUID
+    from mosql.util import value
+
+    eq_(value(1), '1')
+    eq_(value(0.1 + 0.2), repr(0.1 + 0.2))
+    eq_(value(Decimal('1.10')), '1.10')
+    eq_(value(UUID(int=1)), "'00000000-0000-0000-0000-000000000001'")
+    eq_(value(bytearray(b'\x00\xff')), "X'00ff'")
+    eq_(value({'name': "Mosky's"}), '\'{"name": "Mosky\'\'s"}\'')
+    eq_(value([1, 'a', None]), ['1', "'a'", 'NULL'])
+    eq_(value(raw('now()')), 'now()')
+    eq_(value(i for i in (True, False)), ['TRUE', 'FALSE'])
+
+    class Name(text_type):
+        pass
+
+    eq_(value(Name("it's")), "'it''s'")
+
+
+def test_value_adapters_register():
+    from fractions import Fraction
+    from mosql.util import value, register_adapter, unregister_adapter
+    import mosql.sqlite
+    import mosql.std
+    # importing mosql.sqlite patches mosql.util at the first time
+    mosql.std.patch()
+
+    register_adapter(Fraction, lambda x: '(%s.0/%s)' % (x.numerator, x.denominator))
+    try:
+        eq_(value(Fraction(1, 2)), '(1.0/2)')
+        eq_(value([Fraction(1, 2)]), ['(1.0/2)'])
+    finally:
+        unregister_adapter(Fraction)
+    eq_(value(Fraction(1, 2)), '1/2')
+
+    dialect = mosql.sqlite.dialect
+    dialect.register_adapter(Fraction, lambda x: repr(float(x)))
+    try:
+        eq_(dialect.value(Fraction(1, 2)), '0.5')
+        eq_(value(Fraction(1, 4)), '1/4')
+        # the built-in adapters of a dialect use its core functions
+        eq_(dialect.value(True), '1')
+        eq_(dialect.value([True]), ['1'])
+    finally:
+        dialect.value_adapters.unregister(Fraction)
+
+
+def test_build_where_json():
+    eq_(build_where({'data': {'a': 1}}), '"data" = \'{"a": 1}\'')
+    eq_(build_set({'data': {'a': 1}}), '"data"=\'{"a": 1}\'')
+
+
+def test_build_where_large_in_list():
+    from mosql.util import Dialect
+
+    ids = [1, 2, 3, 4, 5]
+
+    dialect = Dialect(in_list_threshold=3, in_list_chunk_size=2)
+    eq_(dialect.build_where({'id': ids}), '("id" IN (1, 2) OR "id" IN (3, 4) OR "id" IN (5))')
+    eq_(dialect.build_where({'id not in': ids}), '("id" NOT IN (1, 2) AND "id" NOT IN (3, 4) AND "id" NOT IN (5))')
+    eq_(dialect.build_where({'id': ids[:3]}), '"id" IN (1, 2, 3)')
+
+    dialect = Dialect(in_list_threshold=3, in_list_strategy='any')
+    eq_(dialect.build_where({'id': ids}), '"id" = ANY(ARRAY[1, 2, 3, 4, 5])')
+    eq_(dialect.build_where({'id not in': ids}), '"id" <> ALL(ARRAY[1, 2, 3, 4, 5])')
+
+    dialect = Dialect(in_list_threshold=3, in_list_strategy='values')
+    eq_(dialect.build_where({'id': ids}), '"id" IN (VALUES (1), (2), (3), (4), (5))')
+
+    # the module is untouched
+    eq_(build_where({'id': ids}), '"id" IN (1, 2, 3, 4, 5)')
+
+
+def test_in_list_settings_of_dialect_after_patch():
+    import mosql.util
+    import mosql.sqlite
+    import mosql.std
+    from mosql.util import Dialect
+
+    mosql.util.in_list_threshold = 3
+    mosql.sqlite.patch()
+    try:
+        eq_(mosql.util.in_list_strategy, mosql.sqlite.dialect.in_list_strategy)
+        # a dialect takes the standard settings, not the patched ones
+        dialect = Dialect()
+        eq_(dialect.in_list_threshold, None)
+        eq_(dialect.in_list_strategy, 'chunk')
+        eq_(dialect.build_where({'id': [1, 2, 3, 4]}), '"id" IN (1, 2, 3, 4)')
+    finally:
+        mosql.std.patch()
+    eq_(mosql.util.in_list_threshold, None)
+    eq_(mosql.util.in_list_strategy, 'chunk')
+
+
+def test_build_where_large_in_list_on_sqlite():
+    import sqlite3
+    import mosql.sqlite
+    import mosql.std
+    from mosql.util import Dialect
+    # importing mosql.sqlite patches mosql.util at the first time
+    mosql.std.patch()
+    from mosql.query import select
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table t (id integer)')
+    conn.executemany('insert into t values (?)', [(i, ) for i in range(10)])
+
+    for strategy in ('chunk', 'values'):
+        dialect = Dialect(
+            format_param=mosql.sqlite.format_param,
+            stringify_bool=mosql.sqlite.stringify_bool,
+            in_list_threshold=3, in_list_strategy=strategy, in_list_chunk_size=2,
+        )
+        select_d = select.bind(dialect)
+        for args in (
+            ('t', {'id': [1, 3, 5, 7]}),
+            ('t', {'id not in': [1, 3, 5, 7]}),
+        ):
+            expected = conn.execute(select(*args)).fetchall()
+            eq_(conn.execute(select_d(*args)).fetchall(), expected)
+            eq_(conn.execute(*select_d.parameterize()(*args)).fetchall(), expected)
+
+
+def test_clause_fused_formatters():
+    from mosql.util import Clause, Statement, paren, concat_by_comma, value
+
+    columns = Clause('columns', (identifier, concat_by_comma, paren), hidden=True)
+    eq_(columns.format(('a', raw('b'))), '("a", b)')
+    eq_(columns.format('a'), '("a")')
+    eq_(columns.format(raw('a, b')), 'a, b')
+
+    columns.formatters = (value, concat_by_comma)
+    eq_(columns.format(('a', 1)), "'a', 1")
+
+    stat = Statement((Clause('select', (identifier, concat_by_comma), default=raw('*')), Clause('from', (identifier, ), alias='table')))
+    eq_(stat.format({'table': 't'}), 'SELECT * FROM "t"')
+    eq_(stat.format({'from': 't', 'select': ('a', 'b')}), 'SELECT "a", "b" FROM "t"')
+    assert_raises(TypeError, stat.format, {'table': 't', 'from': 't'})
+    assert_raises(TypeError, stat.format, {'table': 't', 'wehere': {}})